@@ -1,31 +1,56 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import SystemMessage, AIMessage
 
-from langchain_core.messages import HumanMessage
 from langgraph.graph import START, StateGraph, END
-from typing import TypedDict, Annotated, Optional
+from typing import TypedDict, Annotated
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
-from IPython.display import Image, display
 
 
 from print_messages import pretty_print_messages
-from financials_tool import get_technical_indicators, get_order_book, get_stock_price, get_finance_news, get_earnings_data
-from image_description_tool import capture_screenshot, describe_image
-from extract_EDGAR_tool import get_income_statement_from_edgar, parse_income_statement
-
+from history import ConversationWindow
+from llm_cache import cached_invoke, cached_ainvoke
+from actions import extract_actions, run_actions, arun_actions, format_observation
+from tool_registry import LazyTools
+from tracing import get_tracer, serve_metrics, span, traced
+
+import asyncio
+import contextlib
+import contextvars
 import os
 import sys
+import threading
+from functools import lru_cache
 OPENAI_API_KEY = "your_API_key"
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+LLM_MODEL = "gpt-4"
+LLM_MAX_TOKENS = 2048*2    # completion tokens; the history window leaves room for them in the context
+
+# Render the graph (mermaid PNG through a remote service) on launch; also --draw-graph.
+DRAW_GRAPH = os.environ.get("AGENT_DRAW_GRAPH", "0") == "1"
+# Serve the span metrics as OpenMetrics text on this port (GET /metrics) while the CLI runs.
+METRICS_PORT = int(os.environ.get("AGENT_METRICS_PORT", "0"))
+
+
+_llm = None
+_llm_lock = threading.Lock()
 
 
-llm = ChatOpenAI(
-    model="gpt-4",
-    openai_api_key=OPENAI_API_KEY,
-    temperature=0.0,
-    max_tokens=2048*2,
-    stop_sequences=["Observation:"])
+def get_llm():
+    # langchain_openai (and the openai SDK under it) is the slowest import; only the
+    # first LLM call pays for it.
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_openai import ChatOpenAI
+
+                _llm = ChatOpenAI(
+                    model=LLM_MODEL,
+                    openai_api_key=OPENAI_API_KEY,
+                    temperature=0.0,
+                    max_tokens=LLM_MAX_TOKENS,
+                    stop_sequences=["Observation:"])
+    return _llm
 
 
 
@@ -34,6 +59,7 @@ SYSTEM_PROMPT = """Answer the following questions as best you can. You have acce
 
 The way you use the tools is by specifying a json blob.
 Specifically, this json should have an `action` key (with the name of the tool to use) and an `action_input` key (with the input to the tool going here).
+When several actions do not depend on each other's results (e.g. price, indicators and news for one ticker), put them in a JSON list in one blob; they run at the same time and come back in one Observation, numbered in the same order.
 
 The only values that should be in the "action" field are:
 {tool_descriptions_action}
@@ -42,13 +68,14 @@ example use :
 
 ALWAYS use the following format:
 
-Thought: you should always think about one action to take. Only one action at a time in this format:
+Thought: you should always think about the next action(s) to take, in this format:
 Action:
 
-$JSON_BLOB (inside markdown cell)
+$JSON_BLOB (inside markdown cell: one action, or a list of independent actions)
 
 Observation: the result of the action. This Observation is unique, complete, and the source of truth.
-... (this Thought/Action/Observation can repeat N times, you should take several steps when needed. The $JSON_BLOB must be formatted as markdown and only use a SINGLE action at a time.)
+Large values in an Observation (images, filing text, tables) are replaced by {{"artifact": "artifact:<id>", ...}} with a short preview; pass the "artifact:<id>" string as the tool argument instead of the data, or open it with read_artifact.
+... (this Thought/Action/Observation can repeat N times, you should take several steps when needed. The $JSON_BLOB must be formatted as markdown. Only combine actions whose inputs are already known; an action that needs another's result goes in a later turn.)
 
 You must always end your output with the following format:
 
@@ -58,45 +85,70 @@ Final Answer: the final answer to the original input question
 Now begin! Reminder to ALWAYS use the exact characters `Final Answer:` when you provide a definitive answer. """
 
 
+# Each session builds its prompts through its own window (see session_scope), so turn and
+# token stats are per conversation; this one serves callers that do not open a session.
+history_window = ConversationWindow(model=LLM_MODEL, max_tokens=LLM_MAX_TOKENS)
+_session_window = contextvars.ContextVar("session_window", default=None)
+
+
+def session_window() -> ConversationWindow:
+    return _session_window.get() or history_window
+
+
+@contextlib.contextmanager
+def session_scope(window: ConversationWindow = None):
+    """Give the graph runs inside this block (and the tasks they start) their own window."""
+    window = window or ConversationWindow(history_window.budget, counter=history_window.counter)
+    token = _session_window.set(window)
+    try:
+        yield window
+    finally:
+        _session_window.reset(token)
+
+
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
 
 
-def tool_node(state: AgentState):
-    tools = {
-        "get_earnings_data": get_earnings_data,
-        "get_finance_news": get_finance_news,
-        "get_stock_price": get_stock_price,
-        "get_technical_indicators": get_technical_indicators,
-        "get_order_book": get_order_book,
-        "capture_screenshot": capture_screenshot,
-        "describe_image": describe_image,
-        "get_financials": get_income_statement_from_edgar,
-        "parse_income_statement": parse_income_statement
-    }
+# Tool modules are imported on the first call to one of their tools.
+TOOLS = LazyTools({
+    "get_earnings_data": "financials_tool:get_earnings_data",
+    "get_finance_news": "financials_tool:get_finance_news",
+    "get_stock_price": "financials_tool:get_stock_price",
+    "get_technical_indicators": "financials_tool:get_technical_indicators",
+    "get_batch_indicators": "financials_tool:get_batch_indicators",
+    "get_order_book": "financials_tool:get_order_book",
+    "get_order_book_analytics": "financials_tool:get_order_book_analytics",
+    "capture_screenshot": "image_description_tool:capture_screenshot",
+    "describe_image": "image_description_tool:describe_image",
+    "get_financials": "extract_EDGAR_tool:get_financials",
+    "parse_income_statement": "extract_EDGAR_tool:parse_income_statement",
+    "read_artifact": "artifact_store:read_artifact"
+})
+
+# Native coroutine versions used by the async runtime; every other tool is run on a
+# worker thread from there (yfinance has no async client).
+ASYNC_TOOLS = LazyTools({
+    "get_financials": "extract_EDGAR_tool:aget_financials",
+    "get_finance_news": "financials_tool:aget_finance_news",
+    "get_order_book": "financials_tool:aget_order_book",
+    "get_order_book_analytics": "financials_tool:aget_order_book_analytics",
+})
 
+
+def tool_node(state: AgentState):
     last_message = state["messages"][-1].content
-    filtered_messages = [msg for msg in state["messages"] if isinstance(msg, (HumanMessage, SystemMessage))]
 
     try:
-        
-        tool_result = extract_action(last_message)
-        tool_name = tool_result["action"]
-        tool_args = tool_result["action_input"]
-
-        print(f"Executing tool: {tool_name} with args: {tool_args}")
-
-        if tool_name not in tools:
-            raise ValueError(f"Unknown tool: {tool_name}")
-        
-        # result = tools[tool_name](tool_args)
-        if tool_name == "get_financials":
-            ticker = tool_args["tickers"][0]
-            result = tools[tool_name](ticker)
-        else:
-            result = tools[tool_name](tool_args)
-        ai_answer = f"Observation: {result}"
-        filtered_messages = [AIMessage(content=ai_answer)]
+        # One turn may request several independent actions; they run concurrently.
+        actions = extract_actions(last_message)
+        for action in actions:
+            print(f"Executing tool: {action['action']} with args: {action['action_input']}")
+
+        results = run_actions(TOOLS, actions)
+        # Large payloads (images, filing text, tables) are stored out of band; the
+        # observation carries their artifact handles and a bounded summary.
+        filtered_messages = [AIMessage(content=format_observation(actions, results))]
 
     except Exception as e:
         print(f"Error executing tool: {e}")
@@ -105,6 +157,20 @@ def tool_node(state: AgentState):
     return {"messages": filtered_messages}
 
 
+async def atool_node(state: AgentState):
+    last_message = state["messages"][-1].content
+
+    try:
+        actions = extract_actions(last_message)
+        results = await arun_actions(TOOLS, actions, async_tools=ASYNC_TOOLS)
+        filtered_messages = [AIMessage(content=format_observation(actions, results))]
+
+    except Exception as e:
+        filtered_messages = [AIMessage(content=f"Observation: Error - {str(e)}")]
+
+    return {"messages": filtered_messages}
+
+
 def is_final_asnwer_node(state: AgentState) -> bool:
     """
     Check if the last message in the conversation contains a final answer.
@@ -119,34 +185,17 @@ def is_final_asnwer_node(state: AgentState) -> bool:
     return 'tools'
 
 
-def extract_action(content: str) -> dict:
-    import re, json
-
-    # Try to extract JSON from markdown or raw content
-    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL)
-    if match:
-        json_blob = match.group(1)
-    else:
-        # Remove any trailing comments, whitespace, or text
-        json_blob = content.strip().split("\n")[0] if content.strip().startswith("{") else content.strip()
-
-    try:
-        return json.loads(json_blob)
-    except json.JSONDecodeError as e:
-        raise ValueError("Could not parse action JSON: " + str(e))
-
-
-
-def assistant(state: AgentState):
-    # System message
+@lru_cache(maxsize=None)
+def system_message() -> SystemMessage:
     tool_descriptions = """
     get_earnings_data(input: dict) -> dict:
         Fetches the most recent annual earnings for a list of S&P 500 companies.
         Input should be: {"tickers": ["AAPL", "MSFT", "GOOGL", ...]}
 
     get_finance_news(input: dict) -> list:
-        Searches recent financial news using NewsData.io.
-        Input: {"query": "Nvidia earnings", "max_results": 5}
+        Searches recent financial news using NewsData.io. Several related searches can go in one call
+        with "queries"; syndicated copies of the same article are returned once.
+        Input: {"query": "Nvidia earnings", "max_results": 5} or {"queries": ["Nvidia earnings", "AMD earnings"], "max_results": 10}
 
     get_stock_price(input: dict) -> dict:
         Fetches the latest stock price, open price, volume, and change for a given ticker symbol.
@@ -156,28 +205,49 @@ def assistant(state: AgentState):
         Fetches the technical indicators for a given ticker symbol.
         Input: {"ticker": "NVDA"}
 
+    get_batch_indicators(input: dict) -> dict:
+        Computes SMA, EMA, RSI, MACD, Bollinger bands, ATR and volatility for many tickers in one call.
+        Use it instead of repeated get_technical_indicators calls when screening several tickers.
+        Input: {"tickers": ["AAPL", "MSFT", "NVDA"]}
+
     get_order_book(input: dict) -> dict:
-        Retrieves top N bid/ask levels from Binance for a crypto symbol.
+        Retrieves top N bid/ask levels from Binance for a crypto symbol as [price, quantity] floats.
+        Pass "follow": true to keep a live local book for the symbol so later calls are served from memory,
+        and "record": true to append the returned book to the order book log for later replay.
         Input: {"symbol": "BTCUSDT", "depth": 5}
 
+    get_order_book_analytics(input: dict) -> dict:
+        Summarizes order books instead of listing levels: spread, mid, bid/ask imbalance, quote depth
+        within 10/50/100 bps of the mid, and the VWAP and slippage of a market order of the given size.
+        Prefer it over get_order_book for any question about liquidity, spread or execution cost.
+        Input: {"symbols": ["BTCUSDT", "ETHUSDT"], "order_size": 0.5} or {"symbols": [...], "notional": 25000}
+
     capture_screenshot(input: dict) -> dict:
-        Takes a screenshot of the current screen and returns the image encoded in base64.
-        Input: {}
+        Takes a screenshot of the screen, a region of it or one window and returns an image handle
+        ("artifact:<id>") plus the captured size and the (downsampled) stored size. The image is stored
+        ready for describe_image.
+        Input: {} or {"region": [left, top, width, height]} or {"window": "window title"}
 
     describe_image(input: dict) -> dict:
         Sends an image to GPT-4 Vision and returns its description.
         Input should include either:
-        - 'image_path': str (path to image file)
+        - 'image': str (artifact handle, e.g. from capture_screenshot)
+        - or 'image_path': str (path to image file)
         - or 'image_bytes': raw bytes
         - optionally: 'prompt': str
 
     get_financials(tickers: List[str]) -> Dict:
-        Retrieves financial data for the given list of ticker symbols.
-        Attempts to pull the latest EDGAR filing (10-K), extract an income statement from it,
-        and fallbacks to Yahoo Finance if EDGAR is unavailable or incomplete.
+        Retrieves financial data for the given list of ticker symbols, all in one call.
+        Uses SEC XBRL company facts and falls back to the latest EDGAR filing (10-K) when a
+        line item is missing. Returns {"results": {ticker: ...}, "errors": {ticker: ...}}.
 
     parse_income_statement(raw_data: str, ticker: str) -> dict:
         Parses the raw EDGAR financials financial statements into a dictionary for the given ticker.
+        raw_data may be the artifact handle of the statement text returned by get_financials.
+
+    read_artifact(input: dict) -> dict:
+        Opens an artifact handle from an earlier Observation. JSON artifacts (e.g. a long
+        result stored as one) return the value at "path"; text returns lines from "offset".
     """
 
     # Tool format for LLM
@@ -199,28 +269,44 @@ def assistant(state: AgentState):
     "ticker": "NVDA"
     }
 
+    get_batch_indicators: Indicators for many tickers at once, args: {
+    "tickers": ["AAPL", "MSFT", "NVDA"]
+    }
+
     get_order_book: Get order book for a crypto asset, args: {
     "symbol": "BTCUSDT",
     "depth": 5
     }
 
-    capture_screenshot: Capture current screen and return base64-encoded image, args: {}
+    get_order_book_analytics: Spread, imbalance, depth and slippage for crypto order books, args: {
+    "symbols": ["BTCUSDT", "ETHUSDT"],
+    "order_size": 0.5
+    }
+
+    capture_screenshot: Capture the screen (or a region / window) and return an image handle, args: {
+    "region": [0, 0, 1280, 720]  # optional; or "window": "title"
+    }
 
     describe_image: Describe an image using GPT-4 Vision, args: {
-    "image_path": "screenshot.png",
+    "image": "artifact:<id from capture_screenshot>",
     "prompt": "Explain what's in this screenshot"
     }
 
-    get_financials: Fetch financial data for one or more companies. 
+    get_financials: Fetch financial data for one or more companies. Pass every ticker in a single call.
     args: {
         "tickers": [str]  # List of ticker symbols, e.g. ["AAPL", "TSLA", "ZTNO"]
     }
 
     parse_income_statement: Parse the raw financials data.
     args: {
-        "raw_data": "...the raw EDGAR text..."
+        "raw_data": "...the raw EDGAR text, or its artifact:<id> handle..."
         "ticker": AAPL
     }
+
+    read_artifact: Open an artifact from an Observation, args: {
+    "artifact": "artifact:<id>",
+    "path": ["results", "AAPL"]  # optional, JSON artifacts; or "offset": 0 for text
+    }
     """
 
     example_use = """Examples:
@@ -266,6 +352,13 @@ def assistant(state: AgentState):
         "depth": 10
     }
     }
+
+    6. Several independent actions in one turn:
+    [
+    {"action": "get_stock_price", "action_input": {"ticker": "NVDA"}},
+    {"action": "get_technical_indicators", "action_input": {"ticker": "NVDA"}},
+    {"action": "get_finance_news", "action_input": {"query": "Nvidia", "max_results": 3}}
+    ]
     
 
     {
@@ -276,7 +369,7 @@ def assistant(state: AgentState):
     {
     "action": "describe_image",
     "action_input": {
-        "image_path": "screenshot.png",
+        "image": "artifact:3f9a0c1d2e4b5a69",
         "prompt": "What do you see?"
     }
     }
@@ -284,81 +377,179 @@ def assistant(state: AgentState):
     {
     "action": "get_financials",
     "action_input": {
-        "ticker_or_cik": "AAPL"
+        "tickers": ["AAPL", "MSFT"]
     }
     }
 
     {
     "action": "parse_income_statement",
     "action_input": {
-        "raw_text": "...the raw EDGAR text...",
+        "raw_text": "artifact:8c2e51d07a9b4f13",
         "ticker": Company Ticker
     }
     }
     """
 
     
-    sys_msg = SystemMessage(content=SYSTEM_PROMPT.format(
+    return SystemMessage(content=SYSTEM_PROMPT.format(
     tool_descriptions=tool_descriptions,
     tool_descriptions_action=tool_descriptions_action,
     example_use=example_use
 ))
-    
-    response = llm.invoke([sys_msg] + state["messages"])
-    return {"messages": [response]} 
 
 
+def build_graph(model=None, asynchronous: bool = False, name: str = "repair_shop_agent", checkpointer=None):
+    """
+    Compile the assistant/tools graph around `model` (default: get_llm(), created on the
+    first turn). With asynchronous=True both nodes are coroutines, for ainvoke/astream:
+    many sessions can then share one event loop, each awaiting the LLM and its tools
+    without a thread. A checkpointer persists each thread's state after every step.
+    """
+    # Only a token-budgeted window of the history is sent; older observations are compacted.
+    if asynchronous:
+        async def assistant(state: AgentState):
+            response = await cached_ainvoke(model or get_llm(),
+                                            session_window().build(system_message(), state["messages"]))
+            return {"messages": [response]}
+    else:
+        def assistant(state: AgentState):
+            response = cached_invoke(model or get_llm(), session_window().build(system_message(), state["messages"]))
+            return {"messages": [response]}
 
+    # Build the math graph
+    graph = StateGraph(AgentState)
 
-# Build the math graph
-graph = StateGraph(AgentState)
+    # Define nodes
+    graph.add_node("assistant", traced("node", "assistant")(assistant))
+    graph.add_node("tools", traced("node", "tools")(atool_node if asynchronous else tool_node))
 
-# Define nodes
-graph.add_node("assistant", assistant)
-graph.add_node("tools", tool_node)
+    # Define edges
+    graph.add_edge(START, "assistant")
+    graph.add_conditional_edges(
+        "assistant",
+        is_final_asnwer_node,
+        {"tools": "tools", "end": END}
+    )
 
-# Define edges
-graph.add_edge(START, "assistant")
-graph.add_conditional_edges(
-    "assistant",
-    is_final_asnwer_node,
-    {"tools": "tools", "end": END}
-)
+    graph.add_edge("tools", "assistant")
 
-graph.add_edge("tools", "assistant")
+    return graph.compile(name=name, checkpointer=checkpointer)
 
-repair_shop_agent = graph.compile(name="repair_shop_agent")
-display(Image(repair_shop_agent.get_graph(xray=True).draw_mermaid_png()))
 
+repair_shop_agent = build_graph()
+async_agent = build_graph(asynchronous=True)
 
-ticker = sys.argv[1] if len(sys.argv) > 1 else None
-if not ticker:
-    print("Usage: python cli.py <TICKER>")
-    sys.exit(1)
 
-prompt = f"Do the following: 1) Can you pull the latest income statements for {ticker}? 2) Parse the income statements."
+def income_statement_prompt(ticker: str) -> str:
+    return f"Do the following: 1) Can you pull the latest income statements for {ticker}? 2) Parse the income statements."
+
+
+def _final_content(chunk: dict):
+    # stream()/astream() chunks map the node that ran to its state update.
+    for update in chunk.values():
+        if update and update.get("messages"):
+            return update["messages"][-1].content
+    return None
 
-all_chunks = []
-for chunk in repair_shop_agent.stream(
-    {"messages": [{"role": "user", "content": prompt}]} 
-):
-    all_chunks.append(chunk)
-    
-    # Stream and print the assistant's response as it comes
-    pretty_print_messages(chunk)
 
+async def arun_session(prompt: str, agent=None, window: ConversationWindow = None):
+    """Run one conversation on the async graph; returns the last assistant message."""
+    final_response = None
+    # One trace per session: node, tool, HTTP and LLM spans nest under it.
+    with span("session", "agent"), session_scope(window):
+        async for chunk in (agent or async_agent).astream({"messages": [{"role": "user", "content": prompt}]}):
+            final_response = _final_content(chunk) or final_response
+    return final_response
 
-# Optional: print final full message content if needed
-final_response = None
-for chunk in reversed(all_chunks):
-    if "messages" in chunk and chunk["messages"]:
-        final_response = chunk["messages"][-1].content
-        break
 
-if final_response:
-    print("\nFinal Response:")
-    print(final_response)
-else:
-    print("No valid assistant response found.")
+async def arun_sessions(prompts: list, agent=None, concurrency: int = 100) -> list:
+    """Run many sessions on the current event loop, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(prompt):
+        async with semaphore:
+            return await arun_session(prompt, agent)
+
+    try:
+        return await asyncio.gather(*(run(prompt) for prompt in prompts), return_exceptions=True)
+    finally:
+        from async_http import aclose_async_http
+
+        await aclose_async_http()
+
+
+def run_sessions(prompts: list, agent=None, concurrency: int = 100) -> list:
+    return asyncio.run(arun_sessions(prompts, agent, concurrency))
+
+
+def draw_graph(agent=None, path: str = "agent_graph.png"):
+    """Show the graph inline under IPython, otherwise write it to `path` (rendered by mermaid.ink)."""
+    png = (agent or repair_shop_agent).get_graph(xray=True).draw_mermaid_png()
+    try:
+        from IPython import get_ipython
+        from IPython.display import Image, display
+    except ImportError:
+        get_ipython = lambda: None
+    if get_ipython() is not None:
+        display(Image(png))
+        return
+    with open(path, "wb") as f:
+        f.write(png)
+    print(f"Graph written to {path}")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    tickers = [a for a in args if not a.startswith("--")]
+    if not tickers:
+        print("Usage: python Agent.py [--draw-graph] [--preload-tools] <TICKER> [<TICKER> ...]")
+        return 1
+
+    if DRAW_GRAPH or "--draw-graph" in args:
+        draw_graph()
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    if "--preload-tools" in args:
+        TOOLS.preload()
+
+    if len(tickers) > 1:
+        # Several tickers: one session each, run concurrently on the async graph.
+        for ticker, response in zip(tickers, run_sessions([income_statement_prompt(t) for t in tickers])):
+            print(f"\n=== {ticker} ===")
+            print(response if not isinstance(response, Exception) else f"Session failed: {response}")
+        print("\n" + get_tracer().summary())
+        return 0
+
+    all_chunks = []
+    with span("session", "agent"), session_scope() as window:
+        for chunk in repair_shop_agent.stream(
+            {"messages": [{"role": "user", "content": income_statement_prompt(tickers[0])}]}
+        ):
+            all_chunks.append(chunk)
+
+            # Stream and print the assistant's response as it comes
+            pretty_print_messages(chunk)
+
+
+    # Optional: print final full message content if needed
+    final_response = None
+    for chunk in reversed(all_chunks):
+        final_response = _final_content(chunk)
+        if final_response:
+            break
+
+    if final_response:
+        print("\nFinal Response:")
+        print(final_response)
+    else:
+        print("No valid assistant response found.")
+
+    usage = window.stats()
+    print(f"\nLLM turns: {usage['turns']}, prompt tokens sent: {usage['tokens_sent']} "
+          f"(full history would have been {usage['tokens_full_history']})")
+    print("\n" + get_tracer().summary())
+    return 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
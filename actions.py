@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import json
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from artifact_store import get_artifact_store
+from tracing import span
+
+# Parsing and execution of the actions in one assistant turn.
+#
+# A turn may contain one action blob or a JSON list of independent actions (or several
+# fenced blobs). They run concurrently on a shared pool, each bounded by its tool's
+# timeout, and their results come back as one combined observation. A thread cannot be
+# stopped, so a tool that times out while running keeps its worker until it returns;
+# the pool it runs on is then replaced, so stuck tools never use up the workers that
+# later actions get.
+
+MAX_ACTIONS_PER_TURN = 8
+DEFAULT_TOOL_TIMEOUT = 60.0
+TOOL_TIMEOUTS = {
+    "get_financials": 180.0,
+    "get_earnings_data": 120.0,
+    "parse_income_statement": 120.0,
+    "describe_image": 90.0,
+}
+
+_FENCED = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+
+class ToolPool:
+    """A thread pool for tool calls that is swapped for a fresh one when a timed-out call is still running."""
+
+    def __init__(self, workers: int, thread_name_prefix: str):
+        self.workers = workers
+        self.thread_name_prefix = thread_name_prefix
+        self.replaced = 0
+        self._lock = threading.Lock()
+        self._executor = self._new()
+        self._owner = weakref.WeakKeyDictionary()   # future -> the executor it was submitted to
+
+    def _new(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.thread_name_prefix)
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            future = self._executor.submit(fn, *args)
+            self._owner[future] = self._executor
+        return future
+
+    def abandon(self, future: Future):
+        """Give up on a timed-out call: drop it if it has not started, else stop counting its worker."""
+        if future.cancel() or future.done():
+            return
+        with self._lock:
+            if self._owner.get(future) is not self._executor:
+                return      # its pool has already been replaced
+            old, self._executor = self._executor, self._new()
+            self.replaced += 1
+        # Calls already on the old pool (the stuck one included) finish there, then its threads exit.
+        old.shutdown(wait=False)
+
+
+_pool = ToolPool(MAX_ACTIONS_PER_TURN, "tool")
+# Sync tools called from the async runtime share this larger pool across all sessions.
+ASYNC_OFFLOAD_WORKERS = 64
+_offload_pool = ToolPool(ASYNC_OFFLOAD_WORKERS, "tool-offload")
+
+
+def extract_actions(content: str) -> list:
+    """
+    Every {"action", "action_input"} in an assistant message: from ```json fences
+    (each holding one action or a list of them) or, without fences, from the first
+    JSON value after "Action:".
+    """
+    blobs = _FENCED.findall(content)
+    if not blobs:
+        text = content.split("Action:", 1)[-1]
+        starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+        if not starts:
+            raise ValueError("Could not parse action JSON: no JSON found")
+        blobs = [text[min(starts):]]
+
+    actions = []
+    decoder = json.JSONDecoder()
+    for blob in blobs:
+        try:
+            value, _ = decoder.raw_decode(blob.strip())
+        except json.JSONDecodeError as e:
+            raise ValueError("Could not parse action JSON: " + str(e))
+        for action in value if isinstance(value, list) else [value]:
+            if not isinstance(action, dict) or "action" not in action:
+                raise ValueError(f"Not an action: {str(action)[:200]}")
+            action.setdefault("action_input", {})
+            actions.append(action)
+    if len(actions) > MAX_ACTIONS_PER_TURN:
+        raise ValueError(f"At most {MAX_ACTIONS_PER_TURN} actions per turn, got {len(actions)}")
+    return actions
+
+
+def _traced_call(tool, name: str, tool_input):
+    with span("tool", name, bytes_in=len(json.dumps(tool_input, default=str))) as s:
+        result = tool(tool_input)
+        if isinstance(result, dict) and "error" in result:
+            s.fail(str(result["error"])[:200])
+        return result
+
+
+async def _atraced_call(tool, name: str, tool_input):
+    with span("tool", name, bytes_in=len(json.dumps(tool_input, default=str))) as s:
+        result = await tool(tool_input)
+        if isinstance(result, dict) and "error" in result:
+            s.fail(str(result["error"])[:200])
+        return result
+
+
+def _lookup(tools, name: str):
+    """(tool, None), or (None, error result): an unknown name, or a tool module that fails to import."""
+    try:
+        tool = tools.get(name)
+    except Exception as e:
+        return None, {"error": f"Could not load tool {name}: {type(e).__name__}: {e}"}
+    return (tool, None) if tool is not None else (None, {"error": f"Unknown tool: {name}"})
+
+
+def run_actions(tools: dict, actions: list, timeouts: dict = None) -> list:
+    """Run actions concurrently; returns one result (or {"error": ...}) per action, in order."""
+    timeouts = dict(TOOL_TIMEOUTS, **(timeouts or {}))
+    started = time.monotonic()
+    futures = []
+    for action in actions:
+        name = action["action"]
+        tool, error = _lookup(tools, name)
+        if error is not None:
+            futures.append(error)
+            continue
+        # Run in a copy of the caller's context so the tool's span nests under the current node.
+        futures.append(_pool.submit(contextvars.copy_context().run, _traced_call,
+                                    tool, name, action["action_input"]))
+
+    results = []
+    for action, future in zip(actions, futures):
+        name = action["action"]
+        if isinstance(future, dict):
+            results.append(future)
+            continue
+        timeout = timeouts.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            results.append(future.result(timeout=max(0.0, started + timeout - time.monotonic())))
+        except FutureTimeout:
+            _pool.abandon(future)
+            results.append({"error": f"{name} timed out after {timeout:g}s"})
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+async def arun_actions(tools: dict, actions: list, async_tools: dict = None, timeouts: dict = None) -> list:
+    """
+    run_actions() for the async runtime: tools with an entry in async_tools are awaited
+    on the event loop, the rest run on the offload pool. Same results and timeouts.
+    """
+    timeouts = dict(TOOL_TIMEOUTS, **(timeouts or {}))
+    async_tools = async_tools or {}
+
+    async def run(action):
+        name = action["action"]
+        timeout = timeouts.get(name, DEFAULT_TOOL_TIMEOUT)
+        tool, error = _lookup(async_tools, name) if name in async_tools else _lookup(tools, name)
+        if error is not None:
+            return error
+        future = None
+        if name in async_tools:
+            call = _atraced_call(tool, name, action["action_input"])
+        else:
+            future = _offload_pool.submit(contextvars.copy_context().run, _traced_call,
+                                          tool, name, action["action_input"])
+            call = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            if future is not None:
+                _offload_pool.abandon(future)
+            return {"error": f"{name} timed out after {timeout:g}s"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    return list(await asyncio.gather(*(run(action) for action in actions)))
+
+
+def format_observation(actions: list, results: list) -> str:
+    """One observation for the whole turn; large values are replaced by artifact handles."""
+    store = get_artifact_store()
+    if len(actions) == 1:
+        return f"Observation: {store.summarize(results[0])}"
+    lines = ["Observation:"]
+    for i, (action, result) in enumerate(zip(actions, results), 1):
+        args = json.dumps(action["action_input"], default=str)
+        lines.append(f"[{i}] {action['action']} {args} -> {store.summarize(result)}")
+    return "\n".join(lines)
@@ -0,0 +1,292 @@
+import base64
+import binascii
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from cache_paths import cache_path
+
+# Content-addressed storage for large tool outputs (screenshots, filing text, tables).
+#
+# A payload is written once under the hash of its bytes and referred to by a short
+# handle such as "artifact:3f9a0c1d2e4b5a69". Tool observations carry the handle and a
+# bounded summary instead of the payload, and tools that consume payloads
+# (describe_image, parse_income_statement) accept the handle in place of the data;
+# read_artifact lets the model open any other one.
+
+HANDLE_PREFIX = "artifact:"
+INLINE_CHARS = 600          # strings longer than this are moved out of the observation
+PREVIEW_CHARS = 200
+OBSERVATION_CHARS = 4000    # hard cap on the observation text sent back to the LLM
+STUB_CHARS = 80             # room for a bare {"artifact": ..., "kind": ...} stub
+READ_CHARS = 3000           # text returned by one read_artifact call
+MEMORY_ITEMS = 32           # recently used payloads kept in memory
+
+_HANDLE = re.compile(r"^artifact:([0-9a-f]{16})$")
+_BASE64 = re.compile(r"^[A-Za-z0-9+/]+={0,2}$")
+_IMAGE_MAGIC = {b"\x89PNG": "image/png", b"\xff\xd8\xff": "image/jpeg", b"GIF8": "image/gif"}
+
+
+def is_handle(value) -> bool:
+    return isinstance(value, str) and _HANDLE.match(value.strip()) is not None
+
+
+def _is_frame(value) -> bool:
+    # A DataFrame can only exist once pandas has been imported; checking sys.modules keeps
+    # pandas out of the agent's startup (the tools that build frames import it).
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(value, pandas.DataFrame)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _image_type(data: bytes):
+    for magic, media_type in _IMAGE_MAGIC.items():
+        if data.startswith(magic):
+            return media_type
+    return None
+
+
+class ArtifactStore:
+    """Payloads on disk (one file per hash plus a .json of metadata), newest few in memory."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.dirname(cache_path("artifacts", "_"))
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.directory, artifact_id)
+
+    def put(self, data, kind: str = None, media_type: str = None, **meta) -> str:
+        """Store bytes, text, a DataFrame or JSON-able data; returns the handle."""
+        if _is_frame(data):
+            payload = data.to_json(orient="split").encode("utf-8")
+            kind, media_type = "frame", "application/json"
+            meta.setdefault("shape", list(data.shape))
+        elif isinstance(data, str):
+            payload = data.encode("utf-8")
+            kind, media_type = kind or "text", media_type or "text/plain"
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            payload = bytes(data)
+            media_type = media_type or _image_type(payload) or "application/octet-stream"
+            kind = kind or ("image" if media_type.startswith("image/") else "bytes")
+        else:
+            payload = json.dumps(data, default=str).encode("utf-8")
+            kind, media_type = "json", "application/json"
+
+        artifact_id = hashlib.sha256(payload).hexdigest()[:16]
+        path = self._path(artifact_id)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump(dict(meta, kind=kind, media_type=media_type, size=len(payload), created=time.time()), f)
+        self._remember(artifact_id, payload)
+        return HANDLE_PREFIX + artifact_id
+
+    def _remember(self, artifact_id: str, payload: bytes):
+        with self._lock:
+            self._memory[artifact_id] = payload
+            self._memory.move_to_end(artifact_id)
+            while len(self._memory) > MEMORY_ITEMS:
+                self._memory.popitem(last=False)
+
+    def _id(self, handle: str) -> str:
+        match = _HANDLE.match(handle.strip())
+        if not match:
+            raise ValueError(f"Not an artifact handle: {handle[:40]!r}")
+        return match.group(1)
+
+    def get(self, handle: str) -> bytes:
+        artifact_id = self._id(handle)
+        with self._lock:
+            payload = self._memory.get(artifact_id)
+        if payload is None:
+            try:
+                with open(self._path(artifact_id), "rb") as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                raise KeyError(f"Unknown artifact {handle}") from None
+            self._remember(artifact_id, payload)
+        return payload
+
+    def meta(self, handle: str) -> dict:
+        with open(self._path(self._id(handle)) + ".json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_text(self, handle: str) -> str:
+        return self.get(handle).decode("utf-8")
+
+    def get_frame(self, handle: str):
+        import pandas as pd
+
+        return pd.read_json(io.StringIO(self.get_text(handle)), orient="split")
+
+    def resolve_text(self, value) -> str:
+        """The text behind a handle, or `value` itself when it is not a handle."""
+        return self.get_text(value) if is_handle(value) else value
+
+    def resolve_bytes(self, value) -> bytes:
+        return self.get(value) if is_handle(value) else value
+
+    def summarize(self, result, inline_chars: int = INLINE_CHARS,
+                  observation_chars: int = OBSERVATION_CHARS) -> str:
+        """
+        Observation text for a tool result: large strings, bytes and DataFrames anywhere
+        in it are stored and replaced by {"artifact": handle, ...} stubs. A text still longer
+        than observation_chars is shrunk field by field (see _fit), so every handle and
+        every key stays in the observation instead of behind one truncated preview.
+        """
+        value = self._externalize(result, inline_chars)
+        text = _dumps(value)
+        if len(text) <= observation_chars:
+            return text
+        return _dumps(self._fit(value, observation_chars))
+
+    def _fit(self, value, budget: int):
+        """
+        Shrink `value` to about `budget` characters of JSON. Each field of a container gets
+        a fair share (smaller fields first, what they leave over goes to the larger ones);
+        stubs lose their previews, and a field that still does not fit is stored as a JSON
+        artifact. Entries that do not fit even as stubs are stored together in one trailing
+        artifact so the count of what was left out stays visible.
+        """
+        text = _dumps(value)
+        if len(text) <= budget:
+            return value
+        if isinstance(value, dict) and "artifact" in value:
+            return {k: v for k, v in value.items() if k not in ("preview", "columns")}
+        if not isinstance(value, (dict, list)) or not value:
+            return {"artifact": self.put(text, kind="text", media_type="application/json"),
+                    "kind": "json", "chars": len(text)}
+
+        keys = list(value) if isinstance(value, dict) else list(range(len(value)))
+        sizes = {key: len(_dumps(value[key])) for key in keys}
+        remaining = budget - len(_dumps(dict.fromkeys(map(str, keys), 0) if isinstance(value, dict) else [0] * len(keys)))
+        fitted = {}
+        for n, key in enumerate(sorted(keys, key=sizes.get)):
+            share = max(remaining // (len(keys) - n), STUB_CHARS)
+            fitted[key] = self._fit(value[key], share)
+            remaining -= len(_dumps(fitted[key])) - 1
+
+        out = {key: fitted[key] for key in keys} if isinstance(value, dict) else [fitted[key] for key in keys]
+        if len(_dumps(out)) <= budget:
+            return out
+
+        kept, used = [], 2
+        for key in keys:
+            used += len(_dumps(fitted[key])) + (len(_dumps(str(key))) + 4 if isinstance(value, dict) else 2)
+            if used > budget - STUB_CHARS:
+                break
+            kept.append(key)
+        rest = keys[len(kept):]
+        count = {"keys" if isinstance(value, dict) else "items": len(rest)}
+        if not kept:
+            return {"artifact": self.put(value), "kind": "json", **count}
+        if isinstance(value, dict):
+            out = {key: fitted[key] for key in kept}
+            out["_more"] = {"artifact": self.put({key: value[key] for key in rest}), "kind": "json", **count}
+        else:
+            out = [fitted[key] for key in kept]
+            out.append({"artifact": self.put([value[key] for key in rest]), "kind": "json", **count})
+        return out
+
+    def _externalize(self, value, inline_chars: int):
+        if isinstance(value, dict):
+            return {k: self._externalize(v, inline_chars) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._externalize(v, inline_chars) for v in value]
+        if _is_frame(value):
+            return {"artifact": self.put(value), "kind": "frame", "shape": list(value.shape),
+                    "columns": [str(c) for c in value.columns[:10]],
+                    "preview": value.head(5).to_string()[:PREVIEW_CHARS]}
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self._binary_stub(bytes(value))
+        if isinstance(value, str) and len(value) > inline_chars:
+            if len(value) % 4 == 0 and _BASE64.match(value):
+                # Only base64 that decodes to an image; other strings of that alphabet stay text.
+                try:
+                    data = base64.b64decode(value, validate=True)
+                except (binascii.Error, ValueError):
+                    data = b""
+                if _image_type(data):
+                    return self._binary_stub(data)
+            return {"artifact": self.put(value), "kind": "text", "chars": len(value),
+                    "preview": value[:PREVIEW_CHARS]}
+        return value
+
+    def _binary_stub(self, data: bytes) -> dict:
+        handle = self.put(data)
+        stub = {"artifact": handle, "kind": "image" if _image_type(data) else "bytes", "bytes": len(data)}
+        if stub["kind"] == "image":
+            try:
+                from PIL import Image
+
+                with Image.open(io.BytesIO(data)) as img:
+                    stub["width"], stub["height"] = img.size
+            except Exception:
+                pass
+        return stub
+
+
+
+def read_artifact(tool_args: dict) -> dict:
+    """
+    Open a stored artifact. JSON artifacts return the value at "path" (keys / list indexes);
+    handles nested in it are visible again in the observation. Text artifacts return whole
+    lines from "offset", about READ_CHARS at a time, with the offset to continue from.
+    Input: {"artifact": "artifact:<id>", "path": ["results", "AAPL"]} or {"artifact": ..., "offset": 40}
+    """
+    handle = tool_args.get("artifact") or tool_args.get("handle")
+    if not is_handle(handle):
+        return {"error": "Missing or invalid 'artifact' handle"}
+    store = get_artifact_store()
+    try:
+        meta, payload = store.meta(handle), store.get(handle)
+    except (KeyError, OSError):
+        return {"error": f"Unknown artifact {handle}"}
+    if meta.get("kind") in ("image", "bytes"):
+        return {"error": f"{handle} holds {meta['kind']} data; pass the handle to the tool that takes it"}
+
+    text = payload.decode("utf-8")
+    if meta.get("media_type") == "application/json":
+        value, path = json.loads(text), tool_args.get("path") or []
+        try:
+            for key in path:
+                value = value[int(key)] if isinstance(value, list) else value[str(key)]
+        except (KeyError, IndexError, ValueError, TypeError):
+            return {"error": f"No value at path {path} in {handle}"}
+        return {"artifact": handle, "path": path, "value": value}
+
+    # Lines longer than INLINE_CHARS are split so none of them is stored away again.
+    lines = [line[i:i + INLINE_CHARS] for line in text.splitlines() for i in range(0, max(len(line), 1), INLINE_CHARS)]
+    offset = max(0, int(tool_args.get("offset", 0)))
+    end, chars = offset, 0
+    while end < len(lines) and (end == offset or chars + len(lines[end]) <= READ_CHARS):
+        chars += len(lines[end]) + 1
+        end += 1
+    return {"artifact": handle, "offset": offset, "next_offset": end if end < len(lines) else None,
+            "total_lines": len(lines), "lines": lines[offset:end]}
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ArtifactStore()
+    return _default_store
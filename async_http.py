@@ -0,0 +1,91 @@
+import asyncio
+import contextlib
+import functools
+import itertools
+import threading
+import weakref
+
+import httpx
+
+from tracing import span, host_of
+
+# Shared async HTTP client for the async tool paths (Binance, newsdata, EDGAR).
+#
+# An httpx.AsyncClient belongs to the event loop it was first used on, so there is one
+# AsyncHTTP per running loop. It spreads requests round-robin over several small httpx
+# pools rather than one large one: httpcore rescans every connection of a pool each
+# time a request is assigned, which at a few hundred in-flight requests costs more CPU
+# than the requests themselves. Each shard admits only as many requests as it has
+# connections, so none queue inside httpcore.
+
+SHARDS = 16
+CONNECTIONS_PER_SHARD = 4
+DEFAULT_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+
+
+class AsyncHTTP:
+    def __init__(self, shards: int = SHARDS, connections: int = CONNECTIONS_PER_SHARD):
+        self._limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        self._clients = [None] * shards   # created on first use: a few sessions need only a few
+        self._slots = [asyncio.Semaphore(connections) for _ in range(shards)]
+        self._next = itertools.count()
+
+    def _client(self, i: int) -> httpx.AsyncClient:
+        if self._clients[i] is None:
+            self._clients[i] = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=self._limits,
+                                                 verify=_ssl_context())
+        return self._clients[i]
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        i = next(self._next) % len(self._clients)
+        with span("http", host_of(url)) as s:
+            async with self._slots[i]:
+                response = await self._client(i).get(url, **kwargs)
+            s.set(status=response.status_code, bytes_in=len(response.content),
+                  cache_hit=response.status_code == 304)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url: str, **kwargs):
+        """GET without reading the body; the connection is released when the block exits."""
+        i = next(self._next) % len(self._clients)
+        async with self._slots[i]:
+            client = self._client(i)
+            with span("http", host_of(url), stream=True) as s:
+                response = await client.send(client.build_request("GET", url, **kwargs), stream=True)
+                s.set(status=response.status_code)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+    async def aclose(self):
+        await asyncio.gather(*(client.aclose() for client in self._clients if client is not None))
+
+
+_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _ssl_context():
+    # Building one loads the CA bundle; it is not tied to a loop, so every client shares one.
+    return httpx.create_ssl_context()
+
+
+def get_async_http() -> AsyncHTTP:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = _clients[loop] = AsyncHTTP()
+    return client
+
+
+async def aclose_async_http():
+    """Close the running loop's client (call before the loop shuts down)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,215 @@
+"""
+Run the income-statement workflow for a list of tickers.
+
+    python batch_runner.py tickers.txt --out results.jsonl --workers 8
+
+Tickers are read one per line (commas also separate; "#" starts a comment). Each
+ticker is one graph thread (thread_id "income:<TICKER>") checkpointed to SQLite after
+every step, and each finished ticker is appended to the JSONL output as soon as it is
+done. Rerunning the same command skips tickers already in the output, resumes
+interrupted ones from their last checkpoint and retries failed ones (an "error"
+record in the output) from the start, on a new thread ("income:<TICKER>:2", then
+":3", ...).
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import Agent
+from tracing import get_tracer, serve_metrics, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+RECURSION_LIMIT = 40    # graph steps per ticker before it is recorded as failed
+
+
+def read_tickers(path: str) -> list:
+    tickers = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            for ticker in line.split("#", 1)[0].split(","):
+                if ticker.strip():
+                    tickers.append(ticker.strip().upper())
+    return list(dict.fromkeys(tickers))
+
+
+def _records(out_path: str):
+    """The output file's records (a torn last line is ignored)."""
+    if not os.path.exists(out_path):
+        return
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def completed_tickers(out_path: str) -> set:
+    """Tickers with an "ok" record in the output file."""
+    return {record["ticker"] for record in _records(out_path) if record.get("status") == "ok"}
+
+
+def failed_attempts(out_path: str) -> dict:
+    """Ticker -> the latest attempt recorded as an error in the output file."""
+    failed = {}
+    for record in _records(out_path):
+        if record.get("status") == "error":
+            failed[record["ticker"]] = max(failed.get(record["ticker"], 0), record.get("attempt", 1))
+    return failed
+
+
+def thread_id(ticker: str, attempt: int = 1) -> str:
+    return f"income:{ticker}" if attempt == 1 else f"income:{ticker}:{attempt}"
+
+
+def _answered(values: dict) -> bool:
+    messages = values.get("messages", [])
+    return bool(messages) and "Final Answer:" in (messages[-1].content or "")
+
+
+class BatchRunner:
+    def __init__(self, out_path: str, checkpoint_path: str = None, workers: int = DEFAULT_WORKERS,
+                 prompt: str = None, model=None, keep_checkpoints: bool = False):
+        self.out_path = out_path
+        self.checkpoint_path = checkpoint_path or out_path + ".checkpoints.sqlite"
+        self.workers = workers
+        self.prompt = prompt
+        self.keep_checkpoints = keep_checkpoints
+        self._conn = sqlite3.connect(self.checkpoint_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.checkpointer = SqliteSaver(self._conn)
+        self.agent = Agent.build_graph(model, checkpointer=self.checkpointer)
+        self._out_lock = threading.Lock()
+        self._failed = {}
+        self._stats = {"ok": 0, "error": 0, "skipped": 0, "resumed": 0, "retried": 0}
+
+    def _prompt(self, ticker: str) -> str:
+        return self.prompt.format(ticker=ticker) if self.prompt else Agent.income_statement_prompt(ticker)
+
+    def _config(self, ticker: str, attempt: int) -> dict:
+        return {"configurable": {"thread_id": thread_id(ticker, attempt)}, "recursion_limit": RECURSION_LIMIT}
+
+    def _last_attempt(self, ticker: str):
+        """(attempt, state) of the ticker's latest thread; (1, empty state) if it has none."""
+        attempt, state = 1, self.agent.get_state(self._config(ticker, 1))
+        while state.values:
+            following = self.agent.get_state(self._config(ticker, attempt + 1))
+            if not following.values:
+                break
+            attempt, state = attempt + 1, following
+        return attempt, state
+
+    def run_ticker(self, ticker: str) -> dict:
+        start = time.perf_counter()
+        attempt, state = self._last_attempt(ticker)
+        if state.values and (attempt <= self._failed.get(ticker, 0) or not (state.next or _answered(state.values))):
+            # This attempt failed (an error record, or it ended without an answer): start over on a fresh thread.
+            attempt, state = attempt + 1, None
+            with self._out_lock:
+                self._stats["retried"] += 1
+        config = self._config(ticker, attempt)
+        if not state or not state.values:
+            graph_input = {"messages": [{"role": "user", "content": self._prompt(ticker)}]}
+        elif state.next:
+            # Interrupted mid-run: continue from the last completed step.
+            graph_input = None
+            with self._out_lock:
+                self._stats["resumed"] += 1
+        else:
+            # Finished before the result reached the output file.
+            graph_input = False
+
+        if graph_input is not False:
+            # Nothing is kept from the stream; the history lives in the checkpoint.
+            with span("session", "batch", ticker=ticker), Agent.session_scope():
+                for _ in self.agent.stream(graph_input, config, stream_mode="updates"):
+                    pass
+        values = self.agent.get_state(config).values
+        messages = values.get("messages", [])
+        final_response = messages[-1].content if messages else None
+        return {
+            "ticker": ticker,
+            "status": "ok" if _answered(values) else "error",
+            "final_answer": final_response.split("Final Answer:", 1)[-1].strip() if final_response else None,
+            "messages": len(messages),
+            "attempt": attempt,
+            "elapsed_s": round(time.perf_counter() - start, 3),
+        }
+
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._out_lock:
+            with open(self.out_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._stats[record["status"]] += 1
+        if record["status"] == "ok" and not self.keep_checkpoints:
+            # The result is on disk; the ticker's checkpoints (failed attempts included) are no longer needed.
+            for attempt in range(1, record["attempt"] + 1):
+                self.checkpointer.delete_thread(thread_id(record["ticker"], attempt))
+
+    def _run_and_write(self, ticker: str) -> dict:
+        try:
+            record = self.run_ticker(ticker)
+        except Exception as e:
+            logger.exception("ticker %s failed", ticker)
+            record = {"ticker": ticker, "status": "error", "error": f"{type(e).__name__}: {e}",
+                      "attempt": self._last_attempt(ticker)[0]}
+        self._write(record)
+        return record
+
+    def run(self, tickers: list) -> dict:
+        done = completed_tickers(self.out_path)
+        self._failed = failed_attempts(self.out_path)
+        pending = [t for t in tickers if t not in done]
+        self._stats["skipped"] = len(tickers) - len(pending)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            futures = {pool.submit(self._run_and_write, ticker): ticker for ticker in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                logger.info("[%d/%d] %s %s", i, len(pending), record["ticker"], record["status"])
+        return self.stats()
+
+    def stats(self) -> dict:
+        with self._out_lock:
+            return dict(self._stats)
+
+    def close(self):
+        self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("tickers", help="file with one ticker per line")
+    parser.add_argument("--out", default="batch_results.jsonl")
+    parser.add_argument("--checkpoints", help="SQLite checkpoint file (default: <out>.checkpoints.sqlite)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--prompt", help="prompt template with {ticker} (default: the income-statement prompt)")
+    parser.add_argument("--keep-checkpoints", action="store_true", help="keep finished tickers' checkpoints")
+    parser.add_argument("--metrics-port", type=int, help="serve span metrics (OpenMetrics) on this port while running")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    runner = BatchRunner(args.out, args.checkpoints, args.workers, args.prompt,
+                         keep_checkpoints=args.keep_checkpoints)
+    try:
+        stats = runner.run(read_tickers(args.tickers))
+    finally:
+        runner.close()
+    print(get_tracer().summary())
+    print(json.dumps(stats))
+    return 0 if stats["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+"""
+Concurrent agent sessions: the async graph on one event loop vs the sync graph on threads.
+
+Each session is two LLM turns around one tool turn (order book, order book analytics,
+news and the EDGAR income statement of a fixture company, run concurrently). The LLM
+is a scripted stand-in with a fixed latency, and Binance, newsdata and EDGAR (the
+synthetic 10-K of benchmarks.fixtures) are served by a local HTTP stand-in with a fixed
+latency, so the numbers measure the runtime, not the network. The sync graph is capped by its
+thread count; the async one by the CPU each session costs the event loop.
+
+    python -m benchmarks.bench_async_sessions [--sessions 1 10 100 300 1000] [--threads 32]
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from langchain_core.messages import AIMessage
+
+from benchmarks import fixtures
+
+HTTP_LATENCY_S = 0.05
+LLM_LATENCY_S = 0.2
+
+
+def _respond(directory: str, target: str):
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    if url.path == "/api/v3/depth":
+        limit = int(query.get("limit", ["100"])[0])
+        body = {"lastUpdateId": 1,
+                "bids": [[f"{100 - 0.01 * i:.2f}", "1.5"] for i in range(limit)],
+                "asks": [[f"{100.01 + 0.01 * i:.2f}", "1.2"] for i in range(limit)]}
+    elif url.path.startswith("/news"):
+        q = query.get("q", [""])[0]
+        body = {"status": "success", "results": [
+            {"title": f"{q} story {i}", "link": f"https://news.example/{q.replace(' ', '-')}/{i}",
+             "pubDate": "2026-01-01 00:00:00", "description": "..."} for i in range(5)]}
+    else:
+        # EDGAR: ticker index, submissions, filing index and 10-K from the fixture directory.
+        return fixtures._respond(directory, target)
+    return 200, json.dumps(body).encode("utf-8")
+
+
+async def _handle(directory, reader, writer):
+    # Minimal HTTP/1.1 keep-alive server: GET requests only, no bodies.
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            target = head.split(b" ", 2)[1].decode("latin-1")
+            await asyncio.sleep(HTTP_LATENCY_S)
+            status, payload = _respond(directory, target)
+            writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n" % (status, b"OK" if status == 200 else b"Not Found",
+                                                          len(payload)) + payload)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _serve(directory, port_queue):
+    async def serve():
+        server = await asyncio.start_server(functools.partial(_handle, directory), "127.0.0.1", 0,
+                                            backlog=4096)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def start_server(directory: str) -> str:
+    """Serve from a child process so the stand-in does not compete with the agent for the GIL."""
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve, args=(directory, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+
+
+def load_agent(base_url: str):
+    """Import Agent against the stand-in; the tool modules read these settings at import time."""
+    os.environ.setdefault("BINANCE_API_URL", base_url)
+    os.environ.setdefault("NEWSDATA_URL", base_url + "/news")
+    os.environ.setdefault("SEC_WWW_URL", base_url)
+    os.environ.setdefault("SEC_DATA_URL", base_url)
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["ORDER_BOOK_RECORD"] = "0"
+    os.environ.setdefault("FINANCIAL_AGENT_CACHE", tempfile.mkdtemp(prefix="bench_async_"))
+
+    import Agent
+    from edgar_client import TokenBucket, get_edgar_client
+
+    # The stand-in is not sec.gov: time the runtime, not the 10 req/s fair-access limit.
+    get_edgar_client().rate_limiter = TokenBucket(1e9)
+    return Agent
+
+
+# The smallest fixture 10-K: every session streams it up to the income statement.
+TICKER = fixtures.COMPANIES[0][1]
+
+ACTIONS = """Thought: I need the book, its liquidity, the news and the income statement.
+Action:
+```json
+[{{"action": "get_order_book", "action_input": {{"symbol": "{symbol}", "depth": 5}}}},
+ {{"action": "get_order_book_analytics", "action_input": {{"symbols": ["{symbol}"], "depth": 50, "order_size": 2}}}},
+ {{"action": "get_finance_news", "action_input": {{"query": "{symbol} session {session}", "max_results": 3}}}},
+ {{"action": "get_financials", "action_input": {{"tickers": ["{ticker}"]}}}}]
+```"""
+
+
+class ScriptedLLM:
+    """First turn asks for four tools, the turn after the observation answers."""
+
+    model_name = "scripted"
+    temperature = 0.0
+    max_tokens = None
+    stop = None
+
+    def _reply(self, messages):
+        user = next(m.content for m in messages if m.type == "human")
+        if messages[-1].content.startswith("Observation:"):
+            return AIMessage(content="Thought: I now know the final answer\nFinal Answer: done")
+        symbol, session = user.split()[:2]
+        return AIMessage(content=ACTIONS.format(symbol=symbol, session=session, ticker=TICKER))
+
+    def invoke(self, messages):
+        time.sleep(LLM_LATENCY_S)
+        return self._reply(messages)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LLM_LATENCY_S)
+        return self._reply(messages)
+
+
+def prompts(n: int) -> list:
+    return [f"{('BTCUSDT', 'ETHUSDT', 'SOLUSDT')[i % 3]} {i}" for i in range(n)]
+
+
+def bench_async(Agent, agent, n: int) -> dict:
+    start = time.perf_counter()
+    # The fixture company files no XBRL, and the fallback to the 10-K is printed.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = Agent.run_sessions(prompts(n), agent=agent, concurrency=n)
+    elapsed = time.perf_counter() - start
+    return {"elapsed_s": elapsed, "failed": sum(1 for r in results if isinstance(r, Exception) or r is None)}
+
+
+def bench_sync(agent, n: int, threads: int) -> dict:
+    def run(prompt):
+        return agent.invoke({"messages": [{"role": "user", "content": prompt}]})["messages"][-1].content
+
+    start = time.perf_counter()
+    # The sync tool node prints each call; keep the table readable.
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, prompts(n)))
+    elapsed = time.perf_counter() - start
+    return {"elapsed_s": elapsed, "failed": sum(1 for r in results if "Final Answer" not in r)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 300, 1000])
+    parser.add_argument("--threads", type=int, default=32, help="worker threads for the sync baseline")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp(prefix="bench_async_fixtures_")
+    fixtures.generate(fixture_dir)
+    Agent = load_agent(start_server(fixture_dir))
+    llm = ScriptedLLM()
+    # Measure the runtime, not the first-use imports of the tool modules.
+    Agent.TOOLS.preload()
+    Agent.ASYNC_TOOLS.preload()
+    async_agent = Agent.build_graph(llm, asynchronous=True)
+    sync_agent = Agent.build_graph(llm)
+    # One untimed session each: the first run pays for lazy imports in httpx and langgraph.
+    bench_async(Agent, async_agent, 1)
+    bench_sync(sync_agent, 1, 1)
+
+    print(f"LLM latency {LLM_LATENCY_S * 1000:.0f} ms, HTTP latency {HTTP_LATENCY_S * 1000:.0f} ms, "
+          f"sync baseline on {args.threads} threads")
+    print(f"{'sessions':>8} {'async s':>9} {'async/s':>9} {'sync s':>9} {'sync/s':>9} {'speedup':>8}")
+    for n in args.sessions:
+        a = bench_async(Agent, async_agent, n)
+        s = bench_sync(sync_agent, n, args.threads)
+        print(f"{n:>8} {a['elapsed_s']:>9.2f} {n / a['elapsed_s']:>9.1f} {s['elapsed_s']:>9.2f} "
+              f"{n / s['elapsed_s']:>9.1f} {s['elapsed_s'] / a['elapsed_s']:>7.1f}x"
+              + (f"  failed async={a['failed']} sync={s['failed']}" if a["failed"] or s["failed"] else ""))
+
+
+if __name__ == "__main__":
+    main()
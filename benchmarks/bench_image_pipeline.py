@@ -0,0 +1,109 @@
+"""
+Screenshot -> describe_image preparation: the single-pass pipeline vs the previous one.
+
+Synthetic screen-like PIL images (flat panels, text-like detail, a photo-like area) stand
+in for the screen grab, so this runs headless. "previous" is the old path: a lossless
+full-resolution PNG, then decode, thumbnail, JPEG, reopen and verify, then base64.
+"single-pass" is capture_screenshot's encode_image plus describe_image's image_for_model;
+"region" grabs a 1280x720 window of the screen first. The API call itself is not made.
+
+    python -m benchmarks.bench_image_pipeline [--sizes 1920x1080 2560x1440 3840x2160] [--repeat 5]
+"""
+import argparse
+import base64
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+REGION = (0, 0, 1280, 720)
+
+
+def synthetic_screen(width: int, height: int, seed: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[:] = np.linspace(235, 250, width, dtype=np.uint8)[None, :, None]
+    for _ in range(12):
+        # Windows and panels in flat colours.
+        x, y = rng.integers(0, width * 3 // 4), rng.integers(0, height * 3 // 4)
+        w, h = rng.integers(width // 8, width // 3), rng.integers(height // 8, height // 3)
+        pixels[y:y + h, x:x + w] = rng.integers(0, 255, 3, dtype=np.uint8)
+    for row in range(40, height - 40, 18):
+        # Lines of "text": short dark runs of varying length.
+        if rng.random() < 0.6:
+            x0 = int(rng.integers(20, width // 2))
+            runs = rng.integers(2, 9, size=width // 10)
+            mask = np.repeat(np.arange(len(runs)) % 2 == 0, runs)[:width - x0 - 20]
+            pixels[row:row + 9, x0:x0 + len(mask)][:, mask] = 30
+    ph, pw = height // 3, width // 3
+    pixels[-ph:, -pw:] = rng.integers(0, 255, (ph, pw, 3), dtype=np.uint8)  # a photo / chart area
+    return Image.fromarray(pixels, "RGB")
+
+
+def previous_pipeline(screenshot: Image.Image, store) -> bytes:
+    buffered = io.BytesIO()
+    screenshot.save(buffered, format="PNG")
+    handle = store.put(buffered.getvalue(), kind="image", media_type="image/png")
+
+    img = Image.open(io.BytesIO(store.get(handle))).convert("RGB")
+    img.thumbnail((256, 256))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=40)
+    compressed = buffer.getvalue()
+    Image.open(io.BytesIO(compressed)).verify()
+    base64.b64encode(compressed)
+    return compressed
+
+
+def single_pass(screenshot: Image.Image, store) -> bytes:
+    from image_description_tool import encode_image, image_for_model
+
+    handle = store.put(encode_image(screenshot), kind="image", media_type="image/jpeg")
+    compressed = image_for_model(store.get(handle))
+    base64.b64encode(compressed)
+    return compressed
+
+
+def region_pass(screenshot: Image.Image, store) -> bytes:
+    # pyautogui grabs only the region; the crop stands in for that smaller grab.
+    return single_pass(screenshot.crop((REGION[0], REGION[1], REGION[0] + REGION[2], REGION[1] + REGION[3])), store)
+
+
+def bench(fn, screenshot: Image.Image, store, repeat: int) -> tuple:
+    out = fn(screenshot, store)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(screenshot, store)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "2560x1440", "3840x2160"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("FINANCIAL_AGENT_CACHE", tempfile.mkdtemp(prefix="bench_image_"))
+    from artifact_store import ArtifactStore
+
+    store = ArtifactStore(tempfile.mkdtemp(prefix="bench_image_artifacts_"))
+    print(f"{'screen':>10} {'previous ms':>12} {'single-pass ms':>15} {'region ms':>10} {'speedup':>8} "
+          f"{'previous B':>11} {'single-pass B':>14}")
+    for size in args.sizes:
+        width, height = map(int, size.lower().split("x"))
+        screenshot = synthetic_screen(width, height)
+        old_ms, old_bytes = bench(previous_pipeline, screenshot, store, args.repeat)
+        new_ms, new_bytes = bench(single_pass, screenshot, store, args.repeat)
+        region_ms, _ = bench(region_pass, screenshot, store, args.repeat)
+        print(f"{size:>10} {old_ms:>12.1f} {new_ms:>15.1f} {region_ms:>10.1f} {old_ms / new_ms:>7.1f}x "
+              f"{old_bytes:>11} {new_bytes:>14}")
+
+
+if __name__ == "__main__":
+    main()
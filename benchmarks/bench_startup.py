@@ -0,0 +1,109 @@
+"""
+Cold-start profile of the agent: import time, time to a first answer, first-use cost of each tool module.
+
+Every measurement runs in a fresh interpreter. Import time comes from `python -X importtime`
+(the modules Agent imports directly, by cumulative time); the first answer is one query
+through the graph with a scripted LLM, so no API key or network is needed.
+
+    python -m benchmarks.bench_startup [--repeat 5] [--top 12]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+FIRST_ANSWER = """
+import time
+start = time.perf_counter()
+import Agent
+from langchain_core.messages import AIMessage
+
+class ScriptedLLM:
+    model_name, temperature, max_tokens, stop = "scripted", 0.0, None, None
+
+    def invoke(self, messages):
+        return AIMessage(content="Thought: I now know the final answer\\nFinal Answer: ok")
+
+imported = time.perf_counter()
+result = Agent.build_graph(ScriptedLLM()).invoke({"messages": [{"role": "user", "content": "ping"}]})
+assert "Final Answer" in result["messages"][-1].content
+print(imported - start, time.perf_counter() - start)
+"""
+
+TOOL_IMPORT = """
+import time, Agent
+start = time.perf_counter()
+Agent.TOOLS[{name!r}]
+print(time.perf_counter() - start)
+"""
+
+
+def _run(code: str, *flags) -> subprocess.CompletedProcess:
+    env = dict(os.environ, LLM_CACHE_MODE="off",
+               FINANCIAL_AGENT_CACHE=os.environ.get("FINANCIAL_AGENT_CACHE") or tempfile.mkdtemp(prefix="bench_startup_"))
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def import_profile(repeat: int) -> tuple:
+    """(median total ms, {direct import of Agent: median cumulative ms})."""
+    totals, children = [], {}
+    for _ in range(repeat):
+        stderr = _run("import Agent", "-X", "importtime").stderr
+        for line in stderr.splitlines():
+            match = _IMPORTTIME.match(line)
+            if not match:
+                continue
+            cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+            if name == "Agent":
+                totals.append(cumulative / 1000)
+            elif depth == 1:
+                # Direct imports of Agent appear at depth 1 (the first importer of a module pays for it).
+                children.setdefault(name, []).append(cumulative / 1000)
+    return statistics.median(totals), {name: statistics.median(ms) for name, ms in children.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    total_ms, children = import_profile(args.repeat)
+    print(f"import Agent: {total_ms:.0f} ms (median of {args.repeat})")
+    for name, ms in sorted(children.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<40} {ms:>8.1f} ms")
+
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        imported, answered = map(float, _run(FIRST_ANSWER).stdout.split())
+        runs.append((time.perf_counter() - start, imported, answered))
+    process_s, imported_s, answered_s = (statistics.median(r[i] for r in runs) for i in range(3))
+    print(f"\nfirst answer (scripted LLM): {answered_s * 1000:.0f} ms after start of script "
+          f"(imports {imported_s * 1000:.0f} ms), {process_s * 1000:.0f} ms process wall time")
+
+    print("\nfirst call of a tool (module import):")
+    sys.path.insert(0, ROOT)
+    from Agent import TOOLS
+
+    modules = {}
+    for name in TOOLS:
+        modules.setdefault(TOOLS.spec(name).split(":")[0], name)
+    for module, name in modules.items():
+        try:
+            seconds = statistics.median(float(_run(TOOL_IMPORT.format(name=name)).stdout) for _ in range(args.repeat))
+            print(f"  {module:<40} {seconds * 1000:>8.1f} ms")
+        except subprocess.CalledProcessError as e:
+            print(f"  {module:<40} failed: {e.stderr.strip().splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Offline benchmark for the rule-based income statement parser.
+
+Point it at saved filings: *.htm / *.html files go through the streaming locator
+first, *.txt files are treated as already-extracted table text.
+
+    python -m benchmarks.bench_statement_parser path/to/filings [--repeat 5]
+"""
+import argparse
+import glob
+import os
+import time
+
+from filing_stream import locate_statement_table
+from statement_parser import parse_statement_table, CONFIDENCE_THRESHOLD
+
+
+def bench_file(path: str, repeat: int) -> dict:
+    with open(path, "rb") as f:
+        body = f.read()
+
+    locate_s = 0.0
+    if path.lower().endswith((".htm", ".html")):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            text = locate_statement_table([body])
+        locate_s = (time.perf_counter() - start) / repeat
+    else:
+        text = body.decode("utf-8", errors="replace")
+
+    if not text:
+        return {"file": os.path.basename(path), "bytes": len(body), "error": "statement not found"}
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parsed = parse_statement_table(text)
+    parse_s = (time.perf_counter() - start) / repeat
+
+    return {
+        "file": os.path.basename(path),
+        "bytes": len(body),
+        "locate_ms": round(locate_s * 1000, 2),
+        "parse_ms": round(parse_s * 1000, 3),
+        "rows": len(parsed.frame),
+        "years": ",".join(parsed.years),
+        "confidence": round(parsed.confidence, 2),
+        "llm_fallback": parsed.confidence < CONFIDENCE_THRESHOLD,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(p for ext in ("*.htm", "*.html", "*.txt") for p in glob.glob(os.path.join(args.directory, ext)))
+    if not paths:
+        raise SystemExit(f"No filings found in {args.directory}")
+
+    results = [bench_file(path, args.repeat) for path in paths]
+    columns = ["file", "bytes", "locate_ms", "parse_ms", "rows", "years", "confidence", "llm_fallback"]
+    print("\t".join(columns))
+    for result in results:
+        print("\t".join(str(result.get(c, result.get("error", ""))) for c in columns))
+
+    ok = [r for r in results if "error" not in r]
+    if ok:
+        fallbacks = sum(r["llm_fallback"] for r in ok)
+        print(f"\n{len(ok)}/{len(results)} parsed, {fallbacks} would fall back to the LLM, "
+              f"mean parse {sum(r['parse_ms'] for r in ok) / len(ok):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Offline end-to-end benchmark: per-stage timings and peak memory, compared with a stored baseline.
+
+Filings, submissions JSON, order books and OHLCV frames come from a fixture directory
+(see benchmarks.fixtures; synthetic 10-Ks of three sizes unless --fixtures points at a
+recorded set) served by a local stand-in, and a scripted LLM drives the repair_shop_agent
+graph, so no API key or network is needed. Each stage runs once to warm up, is then
+timed --repeat times (median and min reported), and runs once more under tracemalloc
+for its peak memory. With a baseline, a stage whose median or peak grew by more than
+--tolerance is reported as a regression and the exit status is 1.
+
+    python -m benchmarks.bench_suite [--fixtures DIR] [--repeat 5] [--baseline FILE] [--save-baseline FILE]
+
+benchmarks/baseline.json is the committed baseline (synthetic fixtures); refresh it with
+--save-baseline when a change is meant to move the numbers.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from langchain_core.messages import AIMessage
+
+from benchmarks import fixtures
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+NOISE_FLOOR_MS = 1.0    # smaller absolute changes are never reported as regressions
+_HANDLE = re.compile(r"artifact:[0-9a-f]{16}")
+
+
+def load_tools(base_url: str, fixture_dir: str):
+    """Import the tools against the stand-in; the modules read these settings at import time."""
+    os.environ["SEC_WWW_URL"] = os.environ["SEC_DATA_URL"] = os.environ["BINANCE_API_URL"] = base_url
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["ORDER_BOOK_RECORD"] = "0"
+    # A fresh cache every run, so each run starts from the same state as the baseline did.
+    os.environ["FINANCIAL_AGENT_CACHE"] = tempfile.mkdtemp(prefix="bench_suite_")
+
+    import Agent
+    from edgar_client import TokenBucket, get_edgar_client
+    from ohlcv_store import set_price_provider
+
+    # The stand-in is not sec.gov: time the tools, not the 10 req/s fair-access limit.
+    get_edgar_client().rate_limiter = TokenBucket(1e9)
+    set_price_provider(fixtures.FixturePriceProvider(fixture_dir))
+    Agent.TOOLS.preload()
+    return Agent
+
+
+class ScriptedLLM:
+    """get_financials, then parse_income_statement on the returned artifact, then answer."""
+
+    model_name = "scripted"
+    temperature = 0.0
+    max_tokens = None
+    stop = None
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+    def invoke(self, messages):
+        observations = [m.content for m in messages if m.content.startswith("Observation:")]
+        if not observations:
+            action = {"action": "get_financials", "action_input": {"tickers": [self.ticker]}}
+        elif len(observations) == 1:
+            handle = _HANDLE.search(observations[0])
+            if handle is None:
+                raise RuntimeError(f"no income statement artifact in {observations[0][:200]!r}")
+            action = {"action": "parse_income_statement",
+                      "action_input": {"raw_data": handle.group(0), "ticker": self.ticker, "llm_fallback": False}}
+        else:
+            return AIMessage(content="Thought: I now know the final answer\nFinal Answer: parsed")
+        return AIMessage(content=f"Thought: next step\nAction:\n```json\n{json.dumps(action)}\n```")
+
+
+def _check(result: dict, stage: str) -> dict:
+    if not isinstance(result, dict) or "error" in result or result.get("errors"):
+        raise RuntimeError(f"{stage} failed: {str(result)[:300]}")
+    return result
+
+
+def stages(Agent, manifest: dict) -> list:
+    """(name, callable) for every stage; each callable does one complete unit of work."""
+    from actions import extract_actions, format_observation, run_actions
+    from extract_EDGAR_tool import get_income_statement_from_edgar, parse_income_statement
+    from financials_tool import get_batch_indicators, get_technical_indicators
+    from streaming_indicators import state_path
+
+    companies = manifest["companies"]
+    tickers = [c["ticker"] for c in companies]
+    symbol = manifest["symbols"][0]
+    result = []
+
+    statements = {}
+
+    def extract(ticker):
+        statements[ticker] = _check(get_income_statement_from_edgar(ticker, use_xbrl=False),
+                                    "extract_income_statement")["income_statement"]
+        # The synthetic 10-Ks name the statement in MD&A prose above a segment table first.
+        if manifest["source"] == "synthetic" and "Total net sales" not in statements[ticker]:
+            raise RuntimeError(f"extract_income_statement located the wrong table: {statements[ticker][:200]!r}")
+        return statements[ticker]
+
+    for company in companies:
+        result.append((f"extract_income_statement[{company['label']}]",
+                       lambda ticker=company["ticker"]: extract(ticker)))
+
+    for company in companies:
+        ticker = company["ticker"]
+
+        def parse(ticker=ticker):
+            raw_data = statements.get(ticker) or extract(ticker)
+            _check(parse_income_statement({"raw_data": raw_data, "ticker": ticker, "llm_fallback": False}),
+                   "parse_income_statement")
+        result.append((f"parse_income_statement[{company['label']}]", parse))
+
+    def indicators_single():
+        for ticker in tickers:
+            # Drop the persisted state so every run pays the full warm-up, as a first call does.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(state_path(ticker))
+            _check(get_technical_indicators({"ticker": ticker}), "get_technical_indicators")
+    result.append(("indicators[single]", indicators_single))
+    result.append(("indicators[batch]", lambda: _check(get_batch_indicators({"tickers": tickers}),
+                                                       "get_batch_indicators")))
+
+    # Dispatch overhead alone: parsing a three-action turn, running it and formatting the observation.
+    noop = {name: (lambda args: {"ok": True}) for name in ("a", "b", "c")}
+    turn = ("Thought: three at once\nAction:\n```json\n"
+            + json.dumps([{"action": name, "action_input": {"x": 1}} for name in noop]) + "\n```")
+
+    def dispatch():
+        actions = extract_actions(turn)
+        format_observation(actions, run_actions(noop, actions))
+    result.append(("tool_dispatch[noop x3]", dispatch))
+
+    node_turn = ("Thought: book, liquidity and trend\nAction:\n```json\n" + json.dumps([
+        {"action": "get_order_book", "action_input": {"symbol": symbol, "depth": 10}},
+        {"action": "get_order_book_analytics", "action_input": {"symbols": [symbol], "depth": 500, "order_size": 2}},
+        {"action": "get_technical_indicators", "action_input": {"ticker": tickers[0]}}]) + "\n```")
+
+    def tool_node():
+        observation = Agent.tool_node({"messages": [AIMessage(content=node_turn)]})["messages"][0].content
+        if "Error" in observation[:40]:
+            raise RuntimeError(f"tool_node failed: {observation[:300]}")
+    result.append(("tool_dispatch[tool_node x3]", tool_node))
+
+    ticker = companies[len(companies) // 2]["ticker"]
+    graph = Agent.build_graph(ScriptedLLM(ticker))
+
+    def run_graph():
+        messages = graph.invoke({"messages": [{"role": "user", "content": Agent.income_statement_prompt(ticker)}]},
+                                {"recursion_limit": 10})["messages"]
+        if "Final Answer" not in messages[-1].content or len(messages) != 6:
+            raise RuntimeError(f"graph did not finish as scripted: {[m.content[:80] for m in messages]}")
+    result.append(("graph[repair_shop_agent]", run_graph))
+    return result
+
+
+def measure(fn, repeat: int) -> dict:
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"median_ms": statistics.median(times) * 1000, "min_ms": min(times) * 1000, "peak_kb": peak / 1024}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> dict:
+    """{stage: [regressed metric, ...]} for stages slower or bigger than the baseline allows."""
+    regressions = {}
+    for stage, now in current.items():
+        before = baseline.get(stage)
+        if before is None:
+            continue
+        worse = []
+        if (now["median_ms"] > before["median_ms"] * (1 + tolerance)
+                and now["median_ms"] - before["median_ms"] > NOISE_FLOOR_MS):
+            worse.append("time")
+        if now["peak_kb"] > before["peak_kb"] * (1 + tolerance) and now["peak_kb"] - before["peak_kb"] > 64:
+            worse.append("memory")
+        if worse:
+            regressions[stage] = worse
+    return regressions
+
+
+def _delta(now: float, before) -> str:
+    return f"{(now / before - 1) * 100:>+7.0f}%" if before else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", help="fixture directory (default: synthetic fixtures in a temp directory)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stand-in waits before each response")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline to compare with (if it exists)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="FILE",
+                        help="write this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed growth before a regression")
+    parser.add_argument("--only", help="regular expression; run only the stages whose name matches")
+    args = parser.parse_args()
+
+    fixture_dir = args.fixtures
+    if fixture_dir is None or not os.path.exists(os.path.join(fixture_dir, "manifest.json")):
+        fixture_dir = fixture_dir or tempfile.mkdtemp(prefix="bench_fixtures_")
+        fixtures.generate(fixture_dir)
+    manifest = fixtures.load_manifest(fixture_dir)
+    Agent = load_tools(fixtures.start_server(fixture_dir, args.latency), fixture_dir)
+
+    print(f"python {platform.python_version()} on {platform.machine()}, {os.cpu_count()} CPU; "
+          f"{manifest['source']} fixtures in {fixture_dir}")
+    for company in manifest["companies"]:
+        print(f"  {company['label']:<8} {company['ticker']:<6} {company['document']:<28} {company['bytes'] / 1e6:>6.2f} MB")
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored["stages"]
+        print(f"baseline {args.baseline}: python {stored['python']} on {stored['machine']}, {stored['cpus']} CPU, "
+              f"{stored['fixtures']} fixtures")
+        if (stored["cpus"], stored["fixtures"]) != (os.cpu_count(), manifest["source"]):
+            print("  (recorded on a different machine or fixture set; refresh it with --save-baseline)")
+
+    print(f"\n{'stage':<34} {'median ms':>10} {'min ms':>9} {'peak KB':>9} {'base ms':>9} {'time':>8} {'memory':>8}")
+    results = {}
+    # Tools print progress; keep the table readable. parse_income_statement writes its CSV to the cwd.
+    workdir = tempfile.mkdtemp(prefix="bench_suite_cwd_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for name, fn in stages(Agent, manifest):
+            if args.only and not re.search(args.only, name):
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = m = measure(fn, args.repeat)
+            before = baseline.get(name, {})
+            base_ms = f"{before['median_ms']:>9.2f}" if before else f"{'-':>9}"
+            print(f"{name:<34} {m['median_ms']:>10.2f} {m['min_ms']:>9.2f} {m['peak_kb']:>9.0f} {base_ms} "
+                  f"{_delta(m['median_ms'], before.get('median_ms'))} {_delta(m['peak_kb'], before.get('peak_kb'))}",
+                  flush=True)
+    finally:
+        os.chdir(cwd)
+
+    if sys.platform != "win32":
+        import resource
+
+        print(f"\nprocess max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+                       "fixtures": manifest["source"], "repeat": args.repeat,
+                       "stages": {name: {k: round(v, 3) for k, v in m.items()} for name, m in results.items()}}, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    for stage, worse in regressions.items():
+        print(f"REGRESSION {stage}: {' and '.join(worse)} over the baseline by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,376 @@
+"""
+Fixtures for the offline benchmarks, and a local stand-in that serves them.
+
+A fixture directory mirrors the URL paths the tools request, so the stand-in is a
+plain file server (plus /api/v3/depth, which answers from depth/<SYMBOL>.json):
+
+    files/company_tickers.json                          SEC ticker -> CIK map
+    submissions/CIK<cik>.json                           company submissions
+    Archives/edgar/data/<cik>/<accession>/index.json    filing index
+    Archives/edgar/data/<cik>/<accession>/<doc>.htm     the 10-K itself
+    depth/<SYMBOL>.json                                 Binance depth snapshot
+    ohlcv/<TICKER>.csv                                  daily OHLCV (served by FixturePriceProvider)
+    manifest.json                                       which tickers/symbols the directory holds
+
+`generate` writes deterministic synthetic fixtures (10-Ks of three sizes laid out like
+inline-XBRL filings); `record` captures the same layout from the live services for
+real tickers, so a benchmark can run against real filings without the network.
+
+    python -m benchmarks.fixtures generate DIR
+    python -m benchmarks.fixtures record DIR --tickers AAPL MSFT --symbols BTCUSDT
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+# (label, ticker, CIK, approximate size of the 10-K in bytes)
+COMPANIES = (
+    ("small", "FXSM", "0000900001", 200_000),
+    ("medium", "FXMD", "0000900002", 2_000_000),
+    ("large", "FXLG", "0000900003", 8_000_000),
+)
+SYMBOLS = ("BTCUSDT", "ETHUSDT")
+OHLCV_DAYS = 504
+DEPTH_LEVELS = 1000
+STATEMENT_AT = 0.4      # the income statement sits this far into the document, as in most 10-Ks
+
+_WORDS = ("revenue", "segment", "operating", "fiscal", "customers", "products", "services", "risk",
+          "market", "results", "compared", "increase", "decrease", "primarily", "due", "to", "the",
+          "of", "and", "in", "our", "net", "sales", "costs", "year", "certain", "may", "could")
+_TEXT = "color:#000000;font-family:'Times New Roman',sans-serif;font-size:10pt;font-weight:400;line-height:120%"
+_CELL = "padding:2px 1pt;text-align:right;vertical-align:bottom"
+
+# (line item, values for the last three fiscal years in millions; None = heading row)
+INCOME_STATEMENT = (
+    ("Net sales:", None),
+    ("Products", (294_866, 298_085, 316_199)),
+    ("Services", (96_169, 85_200, 78_129)),
+    ("Total net sales", (391_035, 383_285, 394_328)),
+    ("Cost of sales:", None),
+    ("Products", (185_233, 189_282, 201_471)),
+    ("Services", (25_119, 24_855, 22_075)),
+    ("Total cost of sales", (210_352, 214_137, 223_546)),
+    ("Gross margin", (180_683, 169_148, 170_782)),
+    ("Operating expenses:", None),
+    ("Research and development", (31_370, 29_915, 26_251)),
+    ("Selling, general and administrative", (26_097, 24_932, 25_094)),
+    ("Total operating expenses", (57_467, 54_847, 51_345)),
+    ("Operating income", (123_216, 114_301, 119_437)),
+    ("Other income/(expense), net", (269, -565, -334)),
+    ("Income before provision for income taxes", (123_485, 113_736, 119_103)),
+    ("Provision for income taxes", (29_749, 16_741, 19_300)),
+    ("Net income", (93_736, 96_995, 99_803)),
+    ("Earnings per share:", None),
+    ("Basic", (6.11, 6.16, 6.15)),
+    ("Diluted", (6.08, 6.13, 6.11)),
+    ("Shares used in computing earnings per share:", None),
+    ("Basic", (15_343_783, 15_744_231, 16_215_963)),
+    ("Diluted", (15_408_095, 15_812_547, 16_325_819)),
+)
+FISCAL_YEAR_ENDS = ("September 28,<br/>2024", "September 30,<br/>2023", "September 24,<br/>2022")
+
+
+def _paragraph(rng: random.Random) -> str:
+    words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(60, 160)))
+    return f'<div style="margin-top:9pt;text-align:justify"><span style="{_TEXT}">{words.capitalize()}.</span></div>'
+
+
+def _filler_table(rng: random.Random) -> str:
+    rows = []
+    for _ in range(rng.randint(4, 12)):
+        cells = "".join(f'<td style="{_CELL}"><span style="{_TEXT}">{rng.randint(100, 99_999):,}</span></td>'
+                        for _ in range(3))
+        rows.append(f'<tr><td style="padding:2px 1pt"><span style="{_TEXT}">{rng.choice(_WORDS).capitalize()} '
+                    f'{rng.choice(_WORDS)}</span></td>{cells}</tr>')
+    return f'<table style="border-collapse:collapse;width:100%">{"".join(rows)}</table>'
+
+
+def _mdna_mention(rng: random.Random) -> str:
+    """MD&A prose that names the income statement, then a segment table: neither is the statement."""
+    words = " ".join(rng.choice(_WORDS) for _ in range(40))
+    paragraph = (f'<div style="margin-top:9pt;text-align:justify"><span style="{_TEXT}">Net sales by reportable '
+                 f'segment were as follows, as reported in the Consolidated Statements of Operations included in '
+                 f'Part II, Item 8 of this Form 10-K; {words}.</span></div>')
+    rows = "".join(f'<tr><td style="padding:2px 1pt"><span style="{_TEXT}">{segment}</span></td>'
+                   + "".join(f'<td style="{_CELL}"><span style="{_TEXT}">{rng.randint(20_000, 170_000):,}</span></td>'
+                             for _ in range(3)) + "</tr>"
+                   for segment in ("Americas", "Europe", "Greater China", "Japan", "Rest of Asia Pacific"))
+    return paragraph + f'<table style="border-collapse:collapse;width:100%">{rows}</table>'
+
+
+def _number(value, concept: str) -> str:
+    text = f"{abs(value):,.2f}" if isinstance(value, float) else f"{abs(value):,}"
+    if value < 0:
+        return f'<td style="{_CELL}"><span style="{_TEXT}">({text}</span></td><td><span style="{_TEXT}">)</span></td>'
+    cell = (f'<ix:nonFraction unitRef="usd" contextRef="c-1" decimals="-6" name="us-gaap:{concept}" '
+            f'format="ixt:num-dot-decimal" scale="6">{text}</ix:nonFraction>')
+    return f'<td style="{_CELL}"><span style="{_TEXT}">{cell}</span></td>'
+
+
+def statement_html() -> str:
+    header = "".join(f'<td colspan="3" style="{_CELL}"><span style="{_TEXT};font-weight:700">{year}</span></td>'
+                     for year in FISCAL_YEAR_ENDS)
+    rows = [f'<tr><td></td><td colspan="9" style="text-align:center"><span style="{_TEXT}">Years ended</span></td></tr>',
+            f"<tr><td></td>{header}</tr>"]
+    for label, values in INCOME_STATEMENT:
+        cells = ""
+        if values is not None:
+            concept = "".join(w.capitalize() for w in label.replace(",", "").split())[:40]
+            cells = "".join(f'<td style="{_CELL}"><span style="{_TEXT}">$</span></td>{_number(v, concept)}'
+                            for v in values)
+        rows.append(f'<tr><td style="padding:2px 1pt"><span style="{_TEXT}">{label}</span></td>{cells}</tr>')
+    return (f'<div style="text-align:center"><span style="{_TEXT};font-weight:700">CONSOLIDATED STATEMENTS OF '
+            f'OPERATIONS</span></div><div style="text-align:center"><span style="{_TEXT}">(In millions, except number '
+            f'of shares, which are reflected in thousands, and per-share amounts)</span></div>'
+            f'<table style="border-collapse:collapse;width:100%">{"".join(rows)}</table>')
+
+
+def filing_html(name: str, size: int, seed: int = 0) -> str:
+    """
+    A 10-K of roughly `size` bytes: cover and contents, narrative (with an MD&A mention of the
+    income statement ahead of a segment table), statements, notes.
+    """
+    rng = random.Random(seed)
+    head = [f'<?xml version="1.0" encoding="utf-8"?><html xmlns="http://www.w3.org/1999/xhtml" '
+            f'xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"><head><title>{name} 10-K</title></head><body>',
+            f'<div style="text-align:center"><span style="{_TEXT};font-weight:700">FORM 10-K</span></div>',
+            f'<table><tr><td><a href="#ops">Consolidated Statements of Operations</a></td><td>28</td></tr>'
+            f'<tr><td><a href="#bs">Consolidated Balance Sheets</a></td><td>30</td></tr></table>']
+    head.append(_mdna_mention(rng))
+    body, length, placed = [], sum(map(len, head)), False
+    while length < size:
+        if not placed and length >= size * STATEMENT_AT:
+            body.append(statement_html())
+            placed = True
+        part = _filler_table(rng) if rng.random() < 0.25 else _paragraph(rng)
+        body.append(part)
+        length += len(part)
+    if not placed:
+        body.append(statement_html())
+    return "".join(head + body + ["</body></html>"])
+
+
+def submissions(ticker: str, cik: str, name: str, accession: str, document: str, filings: int = 1000) -> dict:
+    """Submissions JSON with a year of other filings ahead of the 10-K, like a large filer's."""
+    rng = random.Random(cik)
+    forms = [rng.choice(("8-K", "4", "4", "4", "10-Q", "SC 13G/A", "424B2")) for _ in range(filings)]
+    accessions = [f"{cik}-24-{i:06d}" for i in range(filings)]
+    forms[filings // 3], accessions[filings // 3] = "10-K", accession
+    dates = pd.bdate_range(end="2024-11-01", periods=filings)[::-1].strftime("%Y-%m-%d").tolist()
+    return {"cik": cik.lstrip("0"), "entityType": "operating", "name": name, "tickers": [ticker],
+            "filings": {"recent": {"accessionNumber": accessions, "filingDate": dates, "form": forms,
+                                   "primaryDocument": [document if f == "10-K" else f"doc{i}.htm"
+                                                       for i, f in enumerate(forms)]},
+                        "files": []}}
+
+
+def ohlcv_frame(days: int = OHLCV_DAYS, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-12-31", periods=days, tz="America/New_York")
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, days)))
+    spread = np.abs(rng.normal(0, 0.01, days))
+    return pd.DataFrame({"Open": close * (1 + rng.normal(0, 0.004, days)), "High": close * (1 + spread),
+                         "Low": close * (1 - spread), "Close": close,
+                         "Volume": rng.integers(1_000_000, 50_000_000, days).astype(float)}, index=index)
+
+
+def depth_snapshot(mid: float, levels: int = DEPTH_LEVELS, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    tick = mid * 1e-5
+    return {"lastUpdateId": 1,
+            "bids": [[f"{mid - tick * (i + 1):.2f}", f"{q:.5f}"] for i, q in enumerate(rng.exponential(0.5, levels))],
+            "asks": [[f"{mid + tick * (i + 1):.2f}", f"{q:.5f}"] for i, q in enumerate(rng.exponential(0.5, levels))]}
+
+
+def _write(directory: str, relpath: str, data):
+    path = _mkdir(directory, *relpath.split("/"))
+    if isinstance(data, (dict, list)):
+        data = json.dumps(data)
+    with open(path, "wb") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+
+
+def _mkdir(directory: str, *parts: str) -> str:
+    path = os.path.join(directory, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _filing_path(cik: str, accession: str) -> str:
+    return f"Archives/edgar/data/{cik}/{accession.replace('-', '')}"
+
+
+def generate(directory: str) -> dict:
+    """Write the synthetic fixture set into `directory`; returns its manifest."""
+    companies, tickers_json = [], {}
+    for i, (label, ticker, cik, size) in enumerate(COMPANIES):
+        name, accession = f"{label.capitalize()} Fixture Corp", f"{cik}-24-000123"
+        document = f"{ticker.lower()}-20240928.htm"
+        html = filing_html(name, size, seed=i)
+        tickers_json[str(i)] = {"cik_str": int(cik), "ticker": ticker, "title": name}
+        _write(directory, f"submissions/CIK{cik}.json", submissions(ticker, cik, name, accession, document))
+        _write(directory, f"{_filing_path(cik, accession)}/index.json", {"directory": {"item": [
+            {"name": f"{accession}-index.htm"}, {"name": document}, {"name": "exhibit211.htm"},
+            {"name": "Financial_Report.xlsx"}]}})
+        _write(directory, f"{_filing_path(cik, accession)}/{document}", html)
+        ohlcv_frame(seed=i).to_csv(_mkdir(directory, "ohlcv", f"{ticker}.csv"))
+        companies.append({"label": label, "ticker": ticker, "cik": cik, "document": document, "bytes": len(html)})
+    _write(directory, "files/company_tickers.json", tickers_json)
+    for i, symbol in enumerate(SYMBOLS):
+        _write(directory, f"depth/{symbol}.json", depth_snapshot((60_000.0, 3_000.0)[i % 2], seed=i))
+    manifest = {"source": "synthetic", "companies": companies, "symbols": list(SYMBOLS)}
+    _write(directory, "manifest.json", manifest)
+    return manifest
+
+
+def record(directory: str, tickers: list, symbols: list = SYMBOLS) -> dict:
+    """
+    Capture real fixtures: each ticker's latest 10-K (with its submissions and filing
+    index), a year of daily prices and a depth snapshot per symbol. The EDGAR documents
+    are copied out of the response cache after one full fetch, so they are byte-for-byte
+    what the tools received. Run with FINANCIAL_AGENT_CACHE pointing at an empty directory.
+    """
+    from edgar_client import get_edgar_client
+    from extract_EDGAR_tool import get_statement_from_edgar
+    from ohlcv_store import YFinanceProvider
+    from order_book import fetch_snapshot
+    from sec_ticker_index import get_ticker_index
+
+    index = get_ticker_index()
+    companies, tickers_json = [], {}
+    for i, ticker in enumerate(tickers):
+        result = get_statement_from_edgar(ticker, parse_mode="full")
+        if "error" in result:
+            raise RuntimeError(f"{ticker}: {result['error']}")
+        cik = index.resolve_cik(ticker)
+        tickers_json[str(i)] = {"cik_str": int(cik), "ticker": ticker.upper(), "title": index.name_for(ticker)}
+        YFinanceProvider().fetch(ticker, period="2y").to_csv(_mkdir(directory, "ohlcv", f"{ticker.upper()}.csv"))
+        companies.append({"label": ticker.lower(), "ticker": ticker.upper(), "cik": cik, "document": result["document"]})
+
+    cache = get_edgar_client().cache
+    for root, _, files in os.walk(cache.directory):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                url = json.load(f)["url"]
+            relpath = unquote(urlsplit(url).path).lstrip("/")
+            shutil.copyfile(os.path.join(root, name[:-len(".json")] + ".body"), _mkdir(directory, *relpath.split("/")))
+    for company in companies:
+        company["bytes"] = sum(os.path.getsize(os.path.join(root, name))
+                               for root, _, files in os.walk(os.path.join(directory, "Archives", "edgar", "data",
+                                                                         company["cik"]))
+                               for name in files if name == company["document"])
+    _write(directory, "files/company_tickers.json", tickers_json)
+    for symbol in symbols:
+        _write(directory, f"depth/{symbol.upper()}.json", fetch_snapshot(symbol, DEPTH_LEVELS))
+    manifest = {"source": "recorded", "companies": companies, "symbols": [s.upper() for s in symbols]}
+    _write(directory, "manifest.json", manifest)
+    return manifest
+
+
+def load_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FixturePriceProvider:
+    """ohlcv_store price provider that reads ohlcv/<TICKER>.csv instead of calling yfinance."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, ticker: str, start: str = None, period: str = None, interval: str = "1d") -> pd.DataFrame:
+        df = pd.read_csv(os.path.join(self.directory, "ohlcv", f"{ticker.upper()}.csv"), index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start, tz="UTC")]
+        return df
+
+
+def _respond(directory: str, target: str):
+    url = urlsplit(target)
+    if url.path == "/api/v3/depth":
+        query = parse_qs(url.query)
+        path = os.path.join(directory, "depth", f"{query.get('symbol', [''])[0].upper()}.json")
+        if not os.path.exists(path):
+            return 404, b"{}"
+        with open(path, "rb") as f:
+            book = json.load(f)
+        limit = int(query.get("limit", ["100"])[0])
+        return 200, json.dumps(dict(book, bids=book["bids"][:limit], asks=book["asks"][:limit])).encode("utf-8")
+    path = os.path.realpath(os.path.join(directory, unquote(url.path).lstrip("/")))
+    if not path.startswith(os.path.realpath(directory) + os.sep) or not os.path.isfile(path):
+        return 404, b"Not Found"
+    with open(path, "rb") as f:
+        return 200, f.read()
+
+
+def _serve(directory: str, latency: float, port_queue):
+    async def handle(reader, writer):
+        # Minimal HTTP/1.1 keep-alive server: GET requests only, no bodies.
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                target = head.split(b" ", 2)[1].decode("latin-1")
+                if latency:
+                    await asyncio.sleep(latency)
+                status, payload = _respond(directory, target)
+                reason = b"OK" if status == 200 else b"Not Found"
+                content_type = b"text/html" if target.split("?")[0].endswith(".htm") else b"application/json"
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n"
+                             % (status, reason, content_type, len(payload)) + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def start_server(directory: str, latency: float = 0.0) -> str:
+    """Serve a fixture directory from a child process; returns its base URL."""
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve, args=(directory, latency, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("generate").add_argument("directory")
+    rec = sub.add_parser("record")
+    rec.add_argument("directory")
+    rec.add_argument("--tickers", nargs="+", required=True)
+    rec.add_argument("--symbols", nargs="+", default=list(SYMBOLS))
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    if args.command == "generate":
+        manifest = generate(args.directory)
+    else:
+        # A fresh response cache, so only this run's responses are copied out.
+        os.environ["FINANCIAL_AGENT_CACHE"] = tempfile.mkdtemp(prefix="fixtures_record_")
+        os.environ["ORDER_BOOK_RECORD"] = "0"
+        manifest = record(args.directory, args.tickers, args.symbols)
+    for company in manifest["companies"]:
+        print(f"{company['ticker']:<8} CIK {company['cik']}  {company['document']:<28} {company['bytes'] / 1e6:>6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import os
+
+# Root for every on-disk cache the tools keep (ticker index, HTTP responses, price history, ...).
+# Override with FINANCIAL_AGENT_CACHE to keep caches next to a project or on a scratch disk.
+CACHE_DIR = os.environ.get(
+    "FINANCIAL_AGENT_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "financial_data_agent"))
+
+
+def cache_path(*parts: str) -> str:
+    """Return a path under CACHE_DIR, creating its parent directory if needed."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from async_http import get_async_http
+from cache_paths import cache_path
+from tracing import get_tracer, host_of, span
+
+SEC_HEADERS = {
+    "User-Agent": "Your Name your.email@example.com",
+    "Accept-Encoding": "gzip, deflate"
+}
+
+# Base URLs, overridable so the tools can run against a local fixture server.
+SEC_WWW_URL = os.environ.get("SEC_WWW_URL", "https://www.sec.gov").rstrip("/")
+SEC_DATA_URL = os.environ.get("SEC_DATA_URL", "https://data.sec.gov").rstrip("/")
+
+# SEC fair-access policy: no more than 10 requests per second per client.
+SEC_MAX_REQUESTS_PER_SECOND = 10
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; acquire() blocks until a token is available and
+    aacquire() awaits it instead, so threads and coroutines draw on one budget.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take the tokens and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class ResponseCache:
+    """
+    Local store of response bodies plus their validators (ETag / Last-Modified),
+    used to turn repeat requests into conditional GETs.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.dirname(cache_path("edgar", "http", "_"))
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url: str):
+        """Return (meta, body) for a cached URL, or (None, None)."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def put(self, url: str, response, body: bytes):
+        # response is a requests or an httpx response; only its headers are read.
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "stored_at": time.time(),
+        }
+        _atomic_write(body_path, body)
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def touch(self, url: str, meta: dict):
+        """Record a successful revalidation (304) so max_age counts from now."""
+        meta_path, _ = self._paths(url)
+        meta = dict(meta, stored_at=time.time())
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class EdgarClient:
+    """
+    Shared HTTP client for sec.gov / data.sec.gov.
+
+    - one keep-alive requests.Session with a connection pool, so consecutive hops
+      (submissions -> filing index -> document) reuse the same TCP/TLS connection;
+    - a token bucket that keeps the whole process under SEC's 10 req/s limit;
+    - conditional GETs (If-None-Match / If-Modified-Since) against a local response
+      cache, so unchanged submissions and filing indexes come back as 304s;
+    - counters for requests, bytes on the wire and cache hit rate (see stats()).
+    """
+
+    def __init__(self, headers: dict = None, rate: float = SEC_MAX_REQUESTS_PER_SECOND,
+                 timeout=DEFAULT_TIMEOUT, cache: ResponseCache = None, pool_size: int = 16):
+        self.headers = dict(headers or SEC_HEADERS)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=("GET", "HEAD"))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limiter = TokenBucket(rate)
+        self.timeout = timeout
+        self.cache = cache or ResponseCache()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "fresh_hits": 0,
+            "cache_misses": 0,
+            "bytes_received": 0,
+            "bytes_saved": 0,
+        }
+
+    def send(self, url: str, headers: dict = None, stream: bool = False) -> requests.Response:
+        """Rate-limited GET on the pooled session, without any response caching."""
+        self.rate_limiter.acquire()
+        with span("http", host_of(url), conditional=bool(headers), stream=stream) as s:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            self._count("requests")
+            s.set(status=response.status_code, cache_hit=response.status_code == 304)
+            if not stream:
+                wire_bytes = _wire_bytes(response)
+                self._count("bytes_received", wire_bytes)
+                s.set(bytes_in=wire_bytes)
+        return response
+
+    def get_bytes(self, url: str, max_age: float = 0.0, use_cache: bool = True) -> bytes:
+        """
+        GET a URL through the response cache.
+
+        A cached body younger than max_age seconds is returned without touching the
+        network (pass float("inf") for immutable EDGAR archive paths); otherwise the
+        request is revalidated and a 304 serves the cached body.
+        """
+        if not use_cache:
+            response = self.send(url)
+            response.raise_for_status()
+            return response.content
+
+        meta, body = self.cache.get(url)
+        if meta is not None and time.time() - meta["stored_at"] < max_age:
+            self._count("fresh_hits")
+            get_tracer().record("http", host_of(url), cache_hit=True)
+            self._count("bytes_saved", len(body))
+            return body
+
+        response = self.send(url, headers=_validators(meta))
+        if response.status_code == 304 and meta is not None:
+            self._count("not_modified")
+            self._count("bytes_saved", len(body))
+            self.cache.touch(url, meta)
+            return body
+
+        response.raise_for_status()
+        self._count("cache_misses")
+        body = response.content
+        self.cache.put(url, response, body)
+        return body
+
+    def get_json(self, url: str, max_age: float = 0.0, use_cache: bool = True):
+        return json.loads(self.get_bytes(url, max_age=max_age, use_cache=use_cache))
+
+    def iter_chunks(self, url: str, chunk_size: int = 64 * 1024):
+        """
+        Yield the body of a URL in chunks so the caller can stop reading early.
+
+        A body already in the response cache is served from disk; otherwise the
+        response is streamed and the connection is released as soon as the caller
+        closes the generator. Streamed bodies are not cached since they are usually
+        abandoned half way through.
+        """
+        meta, body = self.cache.get(url)
+        if meta is not None:
+            self._count("fresh_hits")
+            get_tracer().record("http", host_of(url), cache_hit=True)
+            for start in range(0, len(body), chunk_size):
+                self._count("bytes_saved", min(chunk_size, len(body) - start))
+                yield body[start:start + chunk_size]
+            return
+
+        self._count("cache_misses")
+        response = self.send(url, stream=True)
+        try:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                yield chunk
+        finally:
+            self._count("bytes_received", _wire_bytes_streamed(response))
+            response.close()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats["not_modified"] + stats["fresh_hits"]
+        lookups = hits + stats["cache_misses"]
+        stats["cache_hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+
+class AsyncEdgarClient:
+    """
+    Coroutine counterpart of EdgarClient for the async tool paths.
+
+    Requests go out on the running loop's AsyncHTTP pool instead of a worker thread,
+    but the token bucket, response cache and counters are the wrapped EdgarClient's:
+    sync and async callers together stay under SEC's 10 req/s and share cached bodies.
+    """
+
+    def __init__(self, client: EdgarClient = None, retries: int = 3, backoff: float = 0.5):
+        self.client = client or get_edgar_client()
+        self.retries = retries
+        self.backoff = backoff
+
+    async def send(self, url: str, headers: dict = None) -> httpx.Response:
+        """Rate-limited GET with the sync client's retry policy, without any response caching."""
+        headers = dict(self.client.headers, **(headers or {}))
+        for attempt in range(self.retries + 1):
+            # Read on every request: callers may swap the limiter (the benchmarks do).
+            await self.client.rate_limiter.aacquire()
+            try:
+                response = await get_async_http().get(url, headers=headers)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                self.client._count("requests")
+                self.client._count("bytes_received", response.num_bytes_downloaded)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def get_bytes(self, url: str, max_age: float = 0.0, use_cache: bool = True) -> bytes:
+        """GET a URL through the response cache; see EdgarClient.get_bytes."""
+        client = self.client
+        if not use_cache:
+            response = await self.send(url)
+            response.raise_for_status()
+            return response.content
+
+        meta, body = client.cache.get(url)
+        if meta is not None and time.time() - meta["stored_at"] < max_age:
+            client._count("fresh_hits")
+            get_tracer().record("http", host_of(url), cache_hit=True)
+            client._count("bytes_saved", len(body))
+            return body
+
+        response = await self.send(url, headers=_validators(meta))
+        if response.status_code == 304 and meta is not None:
+            client._count("not_modified")
+            client._count("bytes_saved", len(body))
+            client.cache.touch(url, meta)
+            return body
+
+        response.raise_for_status()
+        client._count("cache_misses")
+        body = response.content
+        client.cache.put(url, response, body)
+        return body
+
+    async def get_json(self, url: str, max_age: float = 0.0, use_cache: bool = True):
+        return json.loads(await self.get_bytes(url, max_age=max_age, use_cache=use_cache))
+
+    async def iter_chunks(self, url: str, chunk_size: int = 64 * 1024):
+        """
+        Async generator over the body of a URL; see EdgarClient.iter_chunks. The
+        connection goes back to the pool when the caller closes the generator.
+        """
+        client = self.client
+        meta, body = client.cache.get(url)
+        if meta is not None:
+            client._count("fresh_hits")
+            get_tracer().record("http", host_of(url), cache_hit=True)
+            for start in range(0, len(body), chunk_size):
+                client._count("bytes_saved", min(chunk_size, len(body) - start))
+                yield body[start:start + chunk_size]
+            return
+
+        client._count("cache_misses")
+        await client.rate_limiter.aacquire()
+        async with get_async_http().stream(url, headers=client.headers) as response:
+            client._count("requests")
+            try:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+            finally:
+                client._count("bytes_received", response.num_bytes_downloaded)
+
+
+def _validators(meta: dict) -> dict:
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _wire_bytes(response: requests.Response) -> int:
+    # urllib3 tracks compressed bytes read off the socket; fall back to the decoded size.
+    raw = getattr(response, "raw", None)
+    try:
+        return int(raw.tell()) or len(response.content)
+    except Exception:
+        return len(response.content)
+
+
+def _wire_bytes_streamed(response: requests.Response) -> int:
+    # Only what was actually read off the socket before the stream was abandoned.
+    try:
+        return int(response.raw.tell())
+    except Exception:
+        return 0
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_edgar_client() -> EdgarClient:
+    """Process-wide EdgarClient so every tool shares one pool and one rate limit."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = EdgarClient()
+    return _default_client
+
+
+_async_client = None
+_async_client_lock = threading.Lock()
+
+
+def get_async_edgar_client() -> AsyncEdgarClient:
+    """Process-wide AsyncEdgarClient over the shared EdgarClient (it holds no per-loop state)."""
+    global _async_client
+    if _async_client is None:
+        with _async_client_lock:
+            if _async_client is None:
+                _async_client = AsyncEdgarClient(get_edgar_client())
+    return _async_client
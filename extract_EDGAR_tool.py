@@ -1,123 +1,329 @@
-import requests
+import asyncio
+import contextvars
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 from bs4 import BeautifulSoup
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 
-HEADERS = {
-    "User-Agent": "Your Name your.email@example.com",
-    "Accept-Encoding": "gzip, deflate"
-}
+from artifact_store import get_artifact_store
+from edgar_client import get_async_edgar_client, get_edgar_client, SEC_DATA_URL, SEC_WWW_URL
+from llm_cache import cached_invoke
+from filing_stream import alocate_statement_table, locate_statement_table
+from statement_sections import locate_statement_tables
+from sec_ticker_index import get_ticker_index
+from statement_parser import parse_statement_table, CONFIDENCE_THRESHOLD
+from xbrl_facts import get_fact_store, income_statement_text, REQUIRED_LINE_ITEMS
 
-def get_income_statement_from_edgar(ticker_or_cik: str) -> dict:
+def get_income_statement_from_edgar(ticker_or_cik: str, parse_mode: str = "stream", use_xbrl: bool = True) -> dict:
+    """
+    Answer from the local XBRL companyfacts store when it has the required line items;
+    only scrape the 10-K HTML when a concept is missing or the company files no XBRL.
+    """
+    if use_xbrl:
+        cik = None
+        try:
+            cik = get_ticker_index().resolve_cik(ticker_or_cik)
+            frame = get_fact_store().facts(cik).income_statement() if cik else None
+        except Exception as e:
+            print(f"XBRL companyfacts unavailable for {ticker_or_cik}: {e}")
+            frame = None
+        answer = _xbrl_answer(ticker_or_cik, cik, frame)
+        if answer is not None:
+            return answer
+    return get_statement_from_edgar(ticker_or_cik, statement="income_statement", parse_mode=parse_mode)
+
+
+async def aget_income_statement_from_edgar(ticker_or_cik: str, parse_mode: str = "stream",
+                                           use_xbrl: bool = True) -> dict:
+    """get_income_statement_from_edgar on the async EDGAR client."""
+    if use_xbrl:
+        cik = None
+        try:
+            cik = await _aresolve_cik(ticker_or_cik)
+            frame = (await get_fact_store().afacts(cik)).income_statement() if cik else None
+        except Exception as e:
+            print(f"XBRL companyfacts unavailable for {ticker_or_cik}: {e}")
+            frame = None
+        answer = _xbrl_answer(ticker_or_cik, cik, frame)
+        if answer is not None:
+            return answer
+    return await aget_statement_from_edgar(ticker_or_cik, statement="income_statement", parse_mode=parse_mode)
+
+
+def _xbrl_answer(ticker_or_cik: str, cik, frame):
+    if (frame is not None and all(item in frame.index for item in REQUIRED_LINE_ITEMS)
+            and frame.loc[list(REQUIRED_LINE_ITEMS)].iloc[:, 0].notna().all()):
+        return {
+            "source": "XBRL",
+            "ticker_or_cik": ticker_or_cik,
+            "document": f"CIK{cik}.json (companyfacts)",
+            "income_statement": income_statement_text(frame)
+        }
+    return None
+
+
+def get_statement_from_edgar(ticker_or_cik: str, statement: str = "income_statement", parse_mode: str = "stream") -> dict:
+    """
+    Pull one statement table ("income_statement", "balance_sheet" or "cash_flow",
+    see statement_sections.STATEMENT_PATTERNS) from the latest 10-K.
+
+    parse_mode="stream" scans the 10-K once and stops downloading as soon as the
+    statement table has been read; it falls back to the full BeautifulSoup
+    parse ("full") only when the streaming scan finds nothing.
+    """
     def fetch_company_submissions(cik: str) -> dict:
         normalized_cik = cik.zfill(10)
-        url = f"https://data.sec.gov/submissions/CIK{normalized_cik}.json"
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        return response.json()
-
-    def get_latest_10k_url(data):
-        filings = data["filings"]["recent"]
-        for i, form in enumerate(filings["form"]):
-            if form == "10-K":
-                accession = filings["accessionNumber"][i].replace("-", "")
-                cik = data["cik"].zfill(10)
-                return f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession}/index.json"
-        return None
-
-    def find_main_filing(doc_items):
-        preferred_names = ["10-k", "10k", "form10k", "annual", "report"]
-        for item in doc_items:
-            name = item["name"].lower()
-            if any(k in name for k in preferred_names) and name.endswith(".htm") and "exhibit" not in name and "index" not in name:
-                return item["name"]
-        for item in doc_items:
-            name = item["name"].lower()
-            if name.endswith(".htm") and "exhibit" not in name and "index" not in name:
-                return item["name"]
-        return None
+        url = f"{SEC_DATA_URL}/submissions/CIK{normalized_cik}.json"
+        return get_edgar_client().get_json(url)
 
     def fetch_and_parse_filing(doc_base_url, filename):
         full_url = f"{doc_base_url}/{filename}"
-        res = requests.get(full_url, headers=HEADERS)
-        res.raise_for_status()
-        return BeautifulSoup(res.text, "html.parser")
-
-    def extract_income_statement(soup):
-        target_phrases = [
-            "Consolidated Statements of Operations",
-            "Consolidated Statement of Income",
-            "Consolidated Statements of Earnings"
-        ]
-        for tag in soup.find_all(['h1', 'h2', 'h3', 'b', 'strong', 'p', 'div']):
-            text = tag.get_text(strip=True).replace(u'\xa0', ' ')
-            for phrase in target_phrases:
-                if phrase.lower() in text.lower():
-                    if "page" in text.lower() or "index" in text.lower():
-                        continue
-                    table = tag.find_next("table")
-                    if table:
-                        return table.get_text(separator="\n", strip=True)
-        return None
+        # Filed documents never change, so a cached copy is always valid.
+        html = get_edgar_client().get_bytes(full_url, max_age=float("inf"))
+        return BeautifulSoup(html, "html.parser")
+
+    def stream_statement(doc_base_url, filename):
+        full_url = f"{doc_base_url}/{filename}"
+        return locate_statement_table(get_edgar_client().iter_chunks(full_url), statement)
 
     try:
-        # If user gave ticker, resolve to CIK via lookup
-        if not ticker_or_cik.isdigit():
-            resp = requests.get(f"https://www.sec.gov/files/company_tickers.json", headers=HEADERS)
-            resp.raise_for_status()
-            ticker_map = resp.json()
-            cik = None
-            for entry in ticker_map.values():
-                if entry["ticker"].lower() == ticker_or_cik.lower():
-                    cik = str(entry["cik_str"])
-                    break
-            if not cik:
-                return {"error": f"Ticker '{ticker_or_cik}' not found in SEC lookup"}
-        else:
-            cik = ticker_or_cik
+        # If user gave ticker, resolve to CIK via the shared on-disk index
+        cik = get_ticker_index().resolve_cik(ticker_or_cik)
+        if not cik:
+            return {"error": f"Ticker '{ticker_or_cik}' not found in SEC lookup"}
 
         data = fetch_company_submissions(cik)
-        index_url = get_latest_10k_url(data)
+        index_url = _latest_10k_index_url(data)
         if not index_url:
             return {"error": "No recent 10-K filing found"}
 
-        filing_index = requests.get(index_url, headers=HEADERS).json()
+        filing_index = get_edgar_client().get_json(index_url)
         doc_items = filing_index["directory"]["item"]
-        filing_doc = find_main_filing(doc_items)
+        filing_doc = _find_main_filing(doc_items)
 
         if not filing_doc:
             return {"error": "Could not find main filing document"}
 
         base_url = index_url.rsplit("/", 1)[0]
-        soup = fetch_and_parse_filing(base_url, filing_doc)
-        income_text = extract_income_statement(soup)
+        statement_text = None
+        if parse_mode == "stream":
+            statement_text = stream_statement(base_url, filing_doc)
+        if not statement_text:
+            soup = fetch_and_parse_filing(base_url, filing_doc)
+            statement_text = _extract_statement(soup, statement)
 
-        if not income_text:
-            return {"error": "Income statement not found"}
+        if not statement_text:
+            return {"error": f"{statement.replace('_', ' ').capitalize()} not found"}
 
+        return {
+            "source": "EDGAR",
+            "ticker_or_cik": ticker_or_cik,
+            "document": filing_doc,
+            statement: statement_text  # stored as an artifact by the tool node when large
+        }
+
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def aget_statement_from_edgar(ticker_or_cik: str, statement: str = "income_statement",
+                                    parse_mode: str = "stream") -> dict:
+    """
+    get_statement_from_edgar on the async EDGAR client: every hop is awaited on the
+    event loop, and only the BeautifulSoup fallback parse is handed to a thread.
+    """
+    client = get_async_edgar_client()
+    try:
+        cik = await _aresolve_cik(ticker_or_cik)
+        if not cik:
+            return {"error": f"Ticker '{ticker_or_cik}' not found in SEC lookup"}
+
+        data = await client.get_json(f"{SEC_DATA_URL}/submissions/CIK{cik.zfill(10)}.json")
+        index_url = _latest_10k_index_url(data)
+        if not index_url:
+            return {"error": "No recent 10-K filing found"}
+
+        filing_index = await client.get_json(index_url)
+        filing_doc = _find_main_filing(filing_index["directory"]["item"])
+
+        if not filing_doc:
+            return {"error": "Could not find main filing document"}
 
+        full_url = f"{index_url.rsplit('/', 1)[0]}/{filing_doc}"
+        statement_text = None
+        if parse_mode == "stream":
+            statement_text = await alocate_statement_table(client.iter_chunks(full_url), statement)
+        if not statement_text:
+            html = await client.get_bytes(full_url, max_age=float("inf"))
+            statement_text = await asyncio.to_thread(
+                lambda: _extract_statement(BeautifulSoup(html, "html.parser"), statement))
 
+        if not statement_text:
+            return {"error": f"{statement.replace('_', ' ').capitalize()} not found"}
 
         return {
             "source": "EDGAR",
             "ticker_or_cik": ticker_or_cik,
             "document": filing_doc,
-            "income_statement": income_text[:3000]  # limit output if large
+            statement: statement_text
         }
 
     except Exception as e:
         return {"error": str(e)}
 
 
+async def _aresolve_cik(ticker_or_cik: str):
+    index = get_ticker_index()
+    if index.stale:
+        # Loading or revalidating the on-disk index is blocking and happens about once a day.
+        return await asyncio.to_thread(index.resolve_cik, ticker_or_cik)
+    return index.resolve_cik(ticker_or_cik)
+
+
+def _latest_10k_index_url(data):
+    filings = data["filings"]["recent"]
+    for i, form in enumerate(filings["form"]):
+        if form == "10-K":
+            accession = filings["accessionNumber"][i].replace("-", "")
+            cik = data["cik"].zfill(10)
+            return f"{SEC_WWW_URL}/Archives/edgar/data/{cik}/{accession}/index.json"
+    return None
+
+
+def _find_main_filing(doc_items):
+    preferred_names = ["10-k", "10k", "form10k", "annual", "report"]
+    for item in doc_items:
+        name = item["name"].lower()
+        if any(k in name for k in preferred_names) and name.endswith(".htm") and "exhibit" not in name and "index" not in name:
+            return item["name"]
+    for item in doc_items:
+        name = item["name"].lower()
+        if name.endswith(".htm") and "exhibit" not in name and "index" not in name:
+            return item["name"]
+    return None
+
+
+def _extract_statement(soup, statement: str):
+    # One pass over the tree builds a heading index; headings are matched with a
+    # single compiled pattern instead of re-serializing every nested tag.
+    return locate_statement_tables(soup, [statement]).get(statement)
+
+
+def get_financials(args: dict) -> dict:
+    """
+    Fetch income statements for every ticker in {"tickers": [...]} concurrently.
+
+    Work runs on a bounded thread pool; all EDGAR traffic goes through the shared
+    client, whose token bucket keeps the whole batch under SEC's 10 req/s, so wall
+    time scales with the rate limit rather than with N x round-trip latency.
+    Failures are reported per ticker next to the successful results.
+    """
+    tickers = _tickers_arg(args)
+    if not tickers:
+        return {"error": "No tickers given"}
+
+    max_workers = max(1, min(len(tickers), int(args.get("max_workers", 8))))
+    results, errors = {}, {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="edgar") as pool:
+        # Copied context per ticker: its EDGAR HTTP spans nest under the get_financials tool span.
+        futures = {pool.submit(contextvars.copy_context().run, get_income_statement_from_edgar, ticker): ticker
+                   for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+            if "error" in result:
+                errors[ticker] = result["error"]
+            else:
+                results[ticker] = result
+
+    return {
+        "results": {t: results[t] for t in tickers if t in results},
+        "errors": {t: errors[t] for t in tickers if t in errors},
+        "elapsed_s": round(time.perf_counter() - start, 2),
+    }
+
+
+async def aget_financials(args: dict) -> dict:
+    """
+    get_financials for the async graph: the tickers are fetched as coroutines on the
+    event loop (at most max_workers at a time) instead of on a thread pool, still
+    paced by the shared token bucket.
+    """
+    tickers = _tickers_arg(args)
+    if not tickers:
+        return {"error": "No tickers given"}
+
+    slots = asyncio.Semaphore(max(1, min(len(tickers), int(args.get("max_workers", 8)))))
+
+    async def fetch(ticker):
+        async with slots:
+            return await aget_income_statement_from_edgar(ticker)
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(fetch(t) for t in tickers), return_exceptions=True)
+    results, errors = {}, {}
+    for ticker, result in zip(tickers, outcomes):
+        if isinstance(result, Exception):
+            result = {"error": str(result)}
+        if "error" in result:
+            errors[ticker] = result["error"]
+        else:
+            results[ticker] = result
+
+    return {
+        "results": results,
+        "errors": errors,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+    }
+
+
+def _tickers_arg(args: dict) -> list:
+    tickers = args.get("tickers") or args.get("ticker_or_cik") or args.get("ticker") or []
+    if isinstance(tickers, str):
+        tickers = [t.strip() for t in tickers.split(",")]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
 # raw_data: str, ticker: str
 def parse_income_statement(args: dict) -> dict:
+    """
+    Turn the raw EDGAR table text into a CSV of line items x fiscal years.
 
-    raw_data = args['raw_data']
+    The table is parsed with the rule-based parser in statement_parser; GPT-4 is only
+    asked when that parse comes back with low confidence (set "llm_fallback": false
+    to never call it).
+    """
+    # Accepts the table text itself or the artifact handle it was stored under.
+    raw_data = get_artifact_store().resolve_text(args.get('raw_data') or args.get('raw_text') or "")
     ticker = args['ticker']
 
+    parsed = parse_statement_table(raw_data)
+    df, source = parsed.frame, "rules"
+    if parsed.confidence < CONFIDENCE_THRESHOLD and args.get("llm_fallback", True):
+        df, source = _parse_income_statement_with_llm(raw_data), "llm"
+
+    df.to_csv("income_statement_"+ticker+".csv")
+    print("Saved to income_statement_"+ticker+".csv")
+
+    return {
+        "ticker": ticker,
+        "source": source,
+        "confidence": round(parsed.confidence, 2),
+        "csv_path": "income_statement_"+ticker+".csv",
+        "years": [str(c) for c in df.columns],
+        "income_statement": df.to_dict(orient="index"),
+    }
+
+
+def _parse_income_statement_with_llm(raw_data: str) -> pd.DataFrame:
     prompt = f"""
     Extract the income statement data for the last 3 years from the following text. 
     Return a dictionary like: 
@@ -132,6 +338,9 @@ def parse_income_statement(args: dict) -> dict:
     """
     OPENAI_API_KEY = "your_API_key"
 
+    # Only the low-confidence fallback needs the OpenAI client.
+    from langchain_openai import ChatOpenAI
+
     llm = ChatOpenAI(
         model="gpt-4",
         openai_api_key=OPENAI_API_KEY,
@@ -142,21 +351,17 @@ def parse_income_statement(args: dict) -> dict:
     sys_msg = SystemMessage(content="You are a financial data parser.")
     human_msg = HumanMessage(content=prompt)
 
-    # Run the LLM with the prompt
-    response = llm.invoke([sys_msg, human_msg])
+    # Run the LLM with the prompt (answered from the response cache for a table seen before)
+    response = cached_invoke(llm, [sys_msg, human_msg])
 
-        
+    # The model sometimes wraps the JSON in prose or a markdown fence.
     json_str = response.content
-    parsed = json.loads(json_str)
+    start, end = json_str.find("{"), json_str.rfind("}")
+    parsed = json.loads(json_str[start:end + 1] if start != -1 and end > start else json_str)
 
-    # df = pd.DataFrame(parsed)
     df = pd.DataFrame.from_dict(parsed, orient="index").T
     df = df.set_index("Years").T  # Transpose so rows are line items, columns are years
-    
-    df.to_csv("income_statement_"+ticker+".csv")
-    print("Saved to income_statement_"+ticker+".csv")
-
-    return response
+    return df
 
 
 
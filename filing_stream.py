@@ -0,0 +1,139 @@
+import codecs
+from html.parser import HTMLParser
+
+from statement_sections import BLOCK_TAGS, MAX_PREAMBLE_CHARS, SectionMatcher, count_numbers, normalize_text
+
+
+class StatementTableLocator(HTMLParser):
+    """
+    Incremental HTML scanner that finds a statement heading and captures only the
+    <table> that follows it.
+
+    Feed it the document in chunks; once `done` is set the rest of the document can
+    be dropped. Text outside tables is accumulated per block so headings split over
+    inline tags (<b>Consolidated</b> <b>Statements of Operations</b>) still match.
+    Only a short, heading-shaped block arms it (see SectionMatcher.match_line), and a
+    block of prose before the next numeric table disarms it again.
+    The captured text has the same shape as BeautifulSoup's
+    table.get_text(separator="\\n", strip=True), preceded by the short lines between
+    the heading and the table (usually the "(In millions, except ...)" subtitle).
+    """
+
+    def __init__(self, statement: str = "income_statement", min_numbers: int = 4, max_block_chars: int = 400):
+        super().__init__(convert_charrefs=True)
+        self.matcher = SectionMatcher([statement])
+        self.min_numbers = min_numbers
+        self.max_block_chars = max_block_chars
+        self.done = False
+        self.result = None
+        self._block = []
+        self._block_len = 0
+        self._armed = False
+        self._preamble = []
+        self._table_depth = 0
+        self._capturing = False
+        self._captured = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "table":
+            self._table_depth += 1
+            if self._table_depth == 1:
+                self._check_heading()
+                if self._armed:
+                    self._capturing = True
+                    self._captured = []
+        elif tag in BLOCK_TAGS and self._table_depth == 0:
+            self._check_heading()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br" and self._table_depth == 0 and not self.done:
+            self._check_heading()
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == "table" and self._table_depth > 0:
+            self._table_depth -= 1
+            if self._table_depth == 0 and self._capturing:
+                self._capturing = False
+                if count_numbers(self._captured) >= self.min_numbers:
+                    self.result = "\n".join(self._preamble + self._captured)
+                    self.done = True
+                # else: a layout table between the heading and the statement; keep looking.
+        elif tag in BLOCK_TAGS and self._table_depth == 0:
+            self._check_heading()
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        if self._capturing:
+            text = data.strip()
+            if text:
+                self._captured.append(text)
+        elif self._table_depth == 0 and self._block_len < self.max_block_chars:
+            self._block.append(data)
+            self._block_len += len(data)
+
+    def _check_heading(self):
+        if not self._block:
+            return
+        raw = " ".join("".join(self._block).split())
+        self._block = []
+        self._block_len = 0
+        line = normalize_text(raw)
+        if line and self.matcher.match_line(line):
+            self._armed = True
+            self._preamble = []
+        elif line and self._armed:
+            if len(line) > MAX_PREAMBLE_CHARS:
+                # Prose before any table: the heading was not this statement's after all.
+                self._armed = False
+                self._preamble = []
+            elif len(self._preamble) < 3:
+                self._preamble.append(raw)
+
+
+def locate_statement_table(chunks, statement: str = "income_statement", encoding: str = "utf-8"):
+    """
+    Scan an iterable of byte (or str) chunks once and return the text of the first
+    statement table after a matching heading, or None.
+
+    Stops pulling chunks as soon as the table is closed; if `chunks` is a generator
+    it is closed so a streamed HTTP response is released early.
+    """
+    locator = StatementTableLocator(statement)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    try:
+        for chunk in chunks:
+            locator.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+            if locator.done:
+                break
+        else:
+            locator.feed(decoder.decode(b"", final=True))
+            locator.close()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return locator.result
+
+
+async def alocate_statement_table(chunks, statement: str = "income_statement", encoding: str = "utf-8"):
+    """locate_statement_table over an async iterable, e.g. AsyncEdgarClient.iter_chunks."""
+    locator = StatementTableLocator(statement)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    try:
+        async for chunk in chunks:
+            locator.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+            if locator.done:
+                break
+        else:
+            locator.feed(decoder.decode(b"", final=True))
+            locator.close()
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return locator.result
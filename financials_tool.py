@@ -1,64 +1,246 @@
-import yfinance as yf
-import requests
+import asyncio
+import contextvars
+import datetime
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def get_order_book(tool_args: dict):
-    symbol = tool_args.get("symbol", "BTCUSDT").upper()
-    depth = tool_args.get("depth", 5    )
+import numpy as np
+import pandas as pd
+
+import indicators
+import order_book_analytics
+from cache_paths import cache_path
+from news_client import get_news_client
+from ohlcv_store import YFINANCE_HOST, get_ohlcv_store, aligned_matrix
+from order_book import get_order_book_manager
+from order_book_recorder import get_order_book_log, RECORDING_ENABLED
+from streaming_indicators import LiveIndicators
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Bars the indicator tools start from: a year of warm-up for Wilder's RSI and the EMAs.
+# get_technical_indicators seeds a ticker's state from the same window get_batch_indicators
+# computes over, so both report the same values for it.
+INDICATOR_LOOKBACK = indicators.TRADING_DAYS
+
+
+def _order_book_args(tool_args: dict):
+    return tool_args.get("symbol", "BTCUSDT").upper(), int(tool_args.get("depth", 5))
+
+
+def _order_book_result(book, source: str, depth: int, tool_args: dict) -> dict:
+    _record_book(book, tool_args)
+    result = book.to_dict(depth)
+    result["source"] = source
+    return result
 
-    url = f"https://api.binance.us/api/v3/depth?symbol=BTCUSDT&limit=10"
-    params = {"symbol": symbol, "limit": depth}
+
+def get_order_book(tool_args: dict):
+    symbol, depth = _order_book_args(tool_args)
+    manager = get_order_book_manager()
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        if tool_args.get("follow"):
+            # Keep a local book for this symbol from the diff stream; later calls read it from memory.
+            manager.follow(symbol)
+        book, source = manager.current(symbol, depth)
+        return _order_book_result(book, source, depth, tool_args)
+
+    except Exception as e:
+        return {"error": f"Failed to retrieve order book for {symbol}: {str(e)}"}
 
-        return {
-            "symbol": symbol,
-            "bids": data["bids"],  # list of [price, quantity]
-            "asks": data["asks"]
-        }
+
+async def aget_order_book(tool_args: dict):
+    """get_order_book() for the async runtime: the REST snapshot is awaited, not blocking."""
+    symbol, depth = _order_book_args(tool_args)
+    manager = get_order_book_manager()
+
+    try:
+        if tool_args.get("follow"):
+            manager.follow(symbol)
+        book, source = await manager.acurrent(symbol, depth)
+        return _order_book_result(book, source, depth, tool_args)
 
     except Exception as e:
         return {"error": f"Failed to retrieve order book for {symbol}: {str(e)}"}
 
 
+def _record_book(book, tool_args: dict):
+    """
+    Append the book the agent is shown to the snapshot log (for replay and backtests), when
+    asked for with "record": true or ORDER_BOOK_RECORD=1.
+    """
+    if not tool_args.get("record", RECORDING_ENABLED):
+        return
+    try:
+        get_order_book_log().append_book(book, ts=int(time.time() * 1000))
+    except Exception as e:
+        logger.warning("Could not record order book for %s: %s", book.symbol, e)
+
+
+def _analytics_args(tool_args: dict):
+    symbols = tool_args.get("symbols") or tool_args.get("symbol") or "BTCUSDT"
+    if isinstance(symbols, str):
+        symbols = [s.strip() for s in symbols.split(",")]
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    return symbols, int(tool_args.get("depth", 100))
+
+
+def _analytics_result(symbols: list, fetched: dict, depth: int, tool_args: dict) -> dict:
+    """fetched: symbol -> (book, source) or the exception raised while fetching it."""
+    bands = tuple(tool_args.get("bands_bps") or order_book_analytics.DEFAULT_BANDS_BPS)
+    size, notional = tool_args.get("order_size"), tool_args.get("notional")
+    books, sources, errors = {}, {}, {}
+    for symbol in symbols:
+        outcome = fetched[symbol]
+        if isinstance(outcome, Exception):
+            errors[symbol] = str(outcome)
+            continue
+        book, sources[symbol] = outcome
+        books[symbol] = book.top(depth)
+        _record_book(book, tool_args)
+    if not books:
+        return {"error": "No order book for any symbol", "errors": errors}
+
+    found = [symbol for symbol in symbols if symbol in books]
+    levels = order_book_analytics.stack_levels([books[symbol] for symbol in found], depth)
+    metrics = order_book_analytics.analyze(
+        levels,
+        size=float(size) if size is not None else None,
+        notional=float(notional) if notional is not None and size is None else None,
+        bands_bps=bands)
+    results = order_book_analytics.summarize(found, metrics, bands)
+    for symbol in found:
+        results[symbol]["source"] = sources[symbol]
+        results[symbol]["levels"] = int(min(len(books[symbol][0]), len(books[symbol][2])))
+    return {"results": results, "errors": errors}
+
+
+def get_order_book_analytics(tool_args: dict):
+    """
+    Spread, mid, imbalance, depth near the mid and the VWAP/slippage of a market order
+    for one or more crypto symbols, computed over stacked level arrays in one pass.
+    Input: {"symbols": ["BTCUSDT", "ETHUSDT"], "depth": 100, "order_size": 0.5}
+           (or "notional": 25000 for an order sized in the quote currency)
+    """
+    symbols, depth = _analytics_args(tool_args)
+    manager = get_order_book_manager()
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as pool:
+        # Each fetch runs in a copy of this context so its HTTP span nests under the tool call.
+        futures = {pool.submit(contextvars.copy_context().run, manager.current, symbol, depth): symbol
+                   for symbol in symbols}
+        for future, symbol in futures.items():
+            try:
+                fetched[symbol] = future.result()
+            except Exception as e:
+                fetched[symbol] = e
+    return _analytics_result(symbols, fetched, depth, tool_args)
+
+
+async def aget_order_book_analytics(tool_args: dict):
+    """get_order_book_analytics() with the snapshots fetched concurrently on the event loop."""
+    symbols, depth = _analytics_args(tool_args)
+    manager = get_order_book_manager()
+    outcomes = await asyncio.gather(*(manager.acurrent(symbol, depth) for symbol in symbols),
+                                    return_exceptions=True)
+    return _analytics_result(symbols, dict(zip(symbols, outcomes)), depth, tool_args)
+
 
 def get_technical_indicators(tool_args: dict):
     
     ticker = tool_args.get("ticker")
     try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(period="3mo")
-
-        df["SMA_20"] = df["Close"].rolling(window=20).mean()
-        df["RSI_14"] = 100 - (100 / (1 + df["Close"].pct_change().add(1).rolling(14).mean()))
-        latest = df.iloc[-1]
-
-        return {
-            "ticker": ticker,
-            "SMA_20": round(latest["SMA_20"], 2),
-            "RSI_14": round(latest["RSI_14"], 2),
-            "latest_price": round(latest["Close"], 2)
-        }
+        bars = get_ohlcv_store().bars(ticker)
+        if not len(bars):
+            return {"error": f"No price history for {ticker}"}
+
+        # Indicator state is persisted per ticker and only advanced by the bars that
+        # arrived since the last call. The newest bar may still be forming, so it is
+        # previewed rather than committed.
+        committed, latest = bars[:-1], bars[-1]
+        live = LiveIndicators.load(ticker)
+        if live is None or live.last_ts is None or not np.any(committed["ts"] == live.last_ts):
+            # First call, or the stored history no longer contains the state's last bar.
+            live = LiveIndicators(ticker)
+            committed = bars[-INDICATOR_LOOKBACK:-1]
+        new_bars = committed[committed["ts"] > live.last_ts] if live.last_ts is not None else committed
+        if len(new_bars):
+            live.seed(new_bars)
+            live.save()
+
+        values = live.preview(int(latest["ts"]), float(latest["close"]))
+        result = {"ticker": ticker}
+        for name, value in values.items():
+            result[name] = None if math.isnan(value) else round(value, 2)
+        result["latest_price"] = round(float(latest["close"]), 2)
+        return result
     except Exception as e:
         return {"error": str(e)}
     
 
 
-    
+def get_batch_indicators(tool_args: dict):
+    """
+    Latest SMA/EMA/Wilder RSI/MACD/Bollinger/ATR/volatility for many tickers at once.
+    Prices come from the local OHLCV store and all tickers are computed in one
+    vectorized pass over a (time x ticker) matrix.
+    Input: {"tickers": ["AAPL", "MSFT", ...], "lookback": 252}
+    """
+    tickers = tool_args.get("tickers") or []
+    if isinstance(tickers, str):
+        tickers = [t.strip() for t in tickers.split(",")]
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    lookback = int(tool_args.get("lookback", INDICATOR_LOOKBACK))
+    if not tickers:
+        return {"error": "No tickers given"}
+
+    store = get_ohlcv_store()
+    bars_by_ticker, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=min(8, len(tickers))) as pool:
+        futures = {pool.submit(contextvars.copy_context().run, store.bars, ticker, lookback): ticker
+                   for ticker in tickers}
+        for future, ticker in futures.items():
+            try:
+                bars_by_ticker[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = str(e)
+
+    _, m, found = aligned_matrix(bars_by_ticker, ("close", "high", "low"), last=lookback)
+    for ticker in tickers:
+        if ticker not in found and ticker not in errors:
+            errors[ticker] = "No price history"
+    if not found:
+        return {"error": "No price history for any ticker", "errors": errors}
+
+    values = indicators.compute_all(m["close"], m["high"], m["low"])
+    results = {}
+    for j, ticker in enumerate(found):
+        row = {"latest_price": round(float(m["close"][-1, j]), 2)}
+        for name, matrix in values.items():
+            value = matrix[-1, j]
+            row[name] = None if np.isnan(value) else round(float(value), 4 if name == "volatility_20" else 2)
+        results[ticker] = row
+    return {"results": results, "errors": errors}
+
+
 def get_stock_price(tool_args: dict):
     ticker = tool_args.get("ticker")
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="1d")
-        latest = data.iloc[-1]
+        latest = get_ohlcv_store().latest(ticker)
+        if latest is None:
+            return {"error": f"No price history for {ticker}"}
         return {
             "ticker": ticker,
-            "price": round(latest["Close"], 2),
-            "open": round(latest["Open"], 2),
-            "volume": int(latest["Volume"]),
-            "change_pct": round(((latest["Close"] - latest["Open"]) / latest["Open"]) * 100, 2)
+            "price": round(float(latest["close"]), 2),
+            "open": round(float(latest["open"]), 2),
+            "volume": int(latest["volume"]),
+            "change_pct": round(float((latest["close"] - latest["open"]) / latest["open"]) * 100, 2)
         }
     except Exception as e:
         return {"error": str(e)}
@@ -66,41 +248,114 @@ def get_stock_price(tool_args: dict):
 
 
 
-def get_earnings_data(tool_args: dict):
+# A cached fiscal year is kept until its successor could have been reported
+# (period end + one year + the 10-K filing window); after that the ticker is re-checked
+# at most once a day.
+FUNDAMENTALS_NEXT_PERIOD_DAYS = 365 + 75
+FUNDAMENTALS_RECHECK_SECONDS = 24 * 60 * 60
 
-    tickers = tool_args.get("tickers")
-    if isinstance(tickers, str):
-        tickers = [t.strip() for t in tickers.split(",")]
 
-    earnings_data = {}
+def _fundamentals_path(ticker: str) -> str:
+    return cache_path("fundamentals", f"{ticker.upper().replace('/', '_')}.json")
 
-    for ticker in tickers:
-        try:
-            print(f"📡 Fetching: {ticker}")
-            stock = yf.Ticker(ticker)
-            income_stmt = stock.income_stmt
 
-            print(f"📄 income_stmt for {ticker}:\n{income_stmt}")
+def _load_fundamentals(ticker: str):
+    try:
+        with open(_fundamentals_path(ticker), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        period_end = datetime.date.fromisoformat(cached["data"]["Period Ending"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    next_period_due = period_end + datetime.timedelta(days=FUNDAMENTALS_NEXT_PERIOD_DAYS)
+    if datetime.date.today() < next_period_due or time.time() - cached["checked_at"] < FUNDAMENTALS_RECHECK_SECONDS:
+        return cached["data"]
+    return None
+
+
+def _save_fundamentals(ticker: str, data: dict):
+    path = _fundamentals_path(ticker)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"data": data, "checked_at": time.time()}, f)
+    os.replace(path + ".tmp", path)
+
+
+def _fetch_earnings(ticker: str, verbose: bool):
+    """Returns (data or message, from_cache)."""
+    cached = _load_fundamentals(ticker)
+    if cached is not None:
+        logger.debug("earnings ticker=%s source=cache period=%s", ticker, cached["Period Ending"])
+        return cached, True
+
+    import yfinance as yf    # only when the fundamentals cache misses
 
-            if income_stmt is not None and not income_stmt.empty:
-                latest_col = income_stmt.columns[0]
+    logger.debug("earnings ticker=%s source=yfinance", ticker)
+    stock = yf.Ticker(ticker)
+    with span("http", YFINANCE_HOST, path="income_stmt", ticker=ticker):
+        income_stmt = stock.income_stmt
+    if verbose:
+        logger.info("income_stmt for %s:\n%s", ticker, income_stmt)
 
-                revenue = income_stmt.loc["Total Revenue"][latest_col] if "Total Revenue" in income_stmt.index else None
-                net_income = income_stmt.loc["Net Income"][latest_col] if "Net Income" in income_stmt.index else None
+    if income_stmt is None or income_stmt.empty:
+        return "No earnings data found (empty income_stmt)", False
 
-                data = {
-                    "Total Revenue": int(revenue) if revenue else "N/A",
-                    "Net Income": int(net_income) if net_income else "N/A",
-                    "Period Ending": str(latest_col.date()) if hasattr(latest_col, 'date') else str(latest_col)
-                }
+    latest_col = income_stmt.columns[0]
 
-                earnings_data[ticker] = data
-            else:
-                earnings_data[ticker] = "No earnings data found (empty income_stmt)"
+    revenue = income_stmt.loc["Total Revenue"][latest_col] if "Total Revenue" in income_stmt.index else None
+    net_income = income_stmt.loc["Net Income"][latest_col] if "Net Income" in income_stmt.index else None
 
-        except Exception as e:
-            earnings_data[ticker] = f"Error: {str(e)}"
+    data = {
+        "Total Revenue": int(revenue) if pd.notna(revenue) else "N/A",
+        "Net Income": int(net_income) if pd.notna(net_income) else "N/A",
+        "Period Ending": str(latest_col.date()) if hasattr(latest_col, 'date') else str(latest_col)
+    }
+    _save_fundamentals(ticker, data)
+    return data, False
 
+
+def get_earnings_data(tool_args: dict):
+    """
+    Latest annual revenue / net income for a list of tickers.
+
+    Tickers are fetched concurrently (max_workers, default 8) and cached per ticker
+    until a newer fiscal year can exist. Per-ticker progress goes to the
+    "financials_tool" logger at DEBUG level; "verbose": true also logs each income
+    statement. The "_summary" entry reports throughput and cache hits.
+    """
+    tickers = tool_args.get("tickers")
+    if isinstance(tickers, str):
+        tickers = [t.strip() for t in tickers.split(",")]
+    tickers = list(dict.fromkeys(t for t in (tickers or []) if t))
+    verbose = bool(tool_args.get("verbose", False))
+    max_workers = max(1, min(len(tickers) or 1, int(tool_args.get("max_workers", 8))))
+
+    earnings_data = {}
+    cache_hits = 0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="earnings") as pool:
+        # Copied context per ticker, as in get_order_book_analytics: its yfinance span nests under the tool.
+        futures = {pool.submit(contextvars.copy_context().run, _fetch_earnings, ticker, verbose): ticker
+                   for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                earnings_data[ticker], from_cache = future.result()
+                cache_hits += from_cache
+            except Exception as e:
+                earnings_data[ticker] = f"Error: {str(e)}"
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "tickers": len(tickers),
+        "cache_hits": cache_hits,
+        "errors": sum(isinstance(v, str) and v.startswith("Error") for v in earnings_data.values()),
+        "seconds": round(elapsed, 3),
+        "tickers_per_sec": round(len(tickers) / elapsed, 1) if elapsed > 0 else None,
+    }
+    logger.info("earnings summary %s", " ".join(f"{k}={v}" for k, v in summary.items()))
+
+    earnings_data = {t: earnings_data[t] for t in tickers}
+    earnings_data["_summary"] = summary
     return earnings_data
 
 
@@ -109,27 +364,24 @@ def get_earnings_data(tool_args: dict):
 
 
 def get_finance_news(tool_args: dict):
-    query = tool_args.get("query", "")
-    max_results = tool_args.get("max_results", 5)
-    api_key = "pub_65f81972c70a4d05a2f040f68c14089b"  # ← Replace this with your actual key
+    query = tool_args.get("queries") or tool_args.get("query", "")
+    max_results = int(tool_args.get("max_results", 5))
+
+    try:
+        # Cached per query/page for a few minutes and deduplicated across pages and queries.
+        return get_news_client().search(query, max_results=max_results, language=tool_args.get("language", "en"))
+
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def aget_finance_news(tool_args: dict):
+    query = tool_args.get("queries") or tool_args.get("query", "")
+    max_results = int(tool_args.get("max_results", 5))
 
     try:
-        url = f"https://newsdata.io/api/1/news?apikey={api_key}&q={query}&language=en"
-        response = requests.get(url)
-        response.raise_for_status()
-
-        data = response.json()
-        results = data.get("results", [])[:max_results]
-
-        return [
-            {
-                "title": item.get("title"),
-                "pubDate": item.get("pubDate"),
-                "link": item.get("link"),
-                "description": item.get("description")
-            }
-            for item in results
-        ]
+        return await get_news_client().asearch(query, max_results=max_results,
+                                               language=tool_args.get("language", "en"))
 
     except Exception as e:
         return {"error": str(e)}
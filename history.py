@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# Token-budgeted view of the conversation for the assistant node.
+#
+# The graph state keeps every message (add_messages only appends); what is sent to the
+# LLM is a window over it. The system prompt, the user's messages and the last few
+# messages are always sent verbatim. Older observations are compacted to a one-line
+# summary (artifact handles kept, so the data is still reachable), oldest first, only
+# until the prompt fits the budget; if it still does not fit, the oldest compacted
+# messages are dropped, and as a last resort the recent observations are compacted too.
+#
+# The budget is what the model accepts as a prompt: its context window less the
+# completion it may write (max_tokens) and a margin for the chat format's per-request
+# tokens and for counting error. AGENT_HISTORY_TOKENS can lower it, never raise it.
+
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+DEFAULT_COMPLETION_TOKENS = 1024    # reserved when the caller does not say what max_tokens is
+SAFETY_MARGIN = 256
+HISTORY_TOKEN_BUDGET = int(os.environ["AGENT_HISTORY_TOKENS"]) if os.environ.get("AGENT_HISTORY_TOKENS") else None
+KEEP_RECENT = 4             # trailing messages never compacted
+SUMMARY_CHARS = 240
+MESSAGE_OVERHEAD = 4        # tokens per message for role/formatting in chat models
+
+_HANDLE = re.compile(r"artifact:[0-9a-f]{16}")
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed (chars / 4 otherwise), caching by content."""
+
+    def __init__(self, model: str = "gpt-4", cache_size: int = 4096):
+        self.model = model
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._encoding = None
+        self._encoding_loaded = False
+
+    def _load_encoding(self):
+        # On first use: the BPE file may have to be downloaded, which should not delay startup.
+        try:
+            import tiktoken
+
+            self._encoding = tiktoken.encoding_for_model(self.model)
+        except Exception:
+            self._encoding = None
+        self._encoding_loaded = True
+
+    def count(self, text: str) -> int:
+        key = hashlib.sha1(text.encode("utf-8", "replace")).digest()
+        with self._lock:
+            n = self._cache.get(key)
+            if n is not None:
+                self._cache.move_to_end(key)
+                return n
+        if not self._encoding_loaded:
+            self._load_encoding()
+        n = len(self._encoding.encode(text, disallowed_special=())) if self._encoding else (len(text) + 3) // 4
+        with self._lock:
+            self._cache[key] = n
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return n
+
+    def message_tokens(self, message) -> int:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        return self.count(content) + MESSAGE_OVERHEAD
+
+
+def compact_observation(content: str, summary_chars: int = SUMMARY_CHARS) -> str:
+    """One-line stand-in for an old observation: its start plus any artifact handles in it."""
+    text = " ".join(content.split())
+    summary = text[:summary_chars] + ("..." if len(text) > summary_chars else "")
+    handles = [h for h in dict.fromkeys(_HANDLE.findall(text)) if h not in summary]
+    if handles:
+        summary += " [artifacts: " + ", ".join(handles) + "]"
+    return f"[compacted, {len(text)} chars] {summary}"
+
+
+def context_window(model: str) -> int:
+    # Longest matching prefix, so "gpt-4o-mini" is not read as "gpt-4".
+    names = [name for name in CONTEXT_WINDOWS if model.startswith(name)]
+    return CONTEXT_WINDOWS[max(names, key=len)] if names else DEFAULT_CONTEXT_WINDOW
+
+
+def prompt_budget(model: str = "gpt-4", max_tokens: int = None, margin: int = SAFETY_MARGIN) -> int:
+    """Largest prompt (in tokens) that leaves room for max_tokens of completion in the model's context."""
+    budget = context_window(model) - (max_tokens or DEFAULT_COMPLETION_TOKENS) - margin
+    return min(budget, HISTORY_TOKEN_BUDGET) if HISTORY_TOKEN_BUDGET else budget
+
+
+class ConversationWindow:
+    """Builds the message list for each LLM call and records its size per turn."""
+
+    def __init__(self, budget: int = None, keep_recent: int = KEEP_RECENT, summary_chars: int = SUMMARY_CHARS,
+                 counter: TokenCounter = None, model: str = "gpt-4", max_tokens: int = None):
+        self.budget = budget if budget is not None else prompt_budget(model, max_tokens)
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.counter = counter or TokenCounter(model)
+        self.turns = []
+        self._lock = threading.Lock()
+
+    def build(self, system_message: SystemMessage, messages: list) -> list:
+        messages = list(messages)
+        count = self.counter.message_tokens
+        system_tokens = count(system_message)
+        tokens = [count(m) for m in messages]
+        full = system_tokens + sum(tokens)
+        total = full
+        protected = len(messages) - self.keep_recent
+        compacted = dropped = 0
+
+        def compact(indices, observations_only: bool):
+            nonlocal total, compacted
+            for i in indices:
+                if total <= self.budget:
+                    return
+                m = messages[i]
+                if m is None or isinstance(m, (HumanMessage, SystemMessage)) or not isinstance(m.content, str):
+                    continue
+                is_observation = m.content.lstrip().startswith("Observation:")
+                if observations_only and not is_observation:
+                    continue
+                short = AIMessage(content=compact_observation(m.content, self.summary_chars))
+                new_tokens = count(short)
+                if new_tokens >= tokens[i] or m.content.startswith("[compacted"):
+                    continue
+                total -= tokens[i] - new_tokens
+                messages[i], tokens[i] = short, new_tokens
+                compacted += 1
+
+        # Oldest first: compact observations, then any other assistant message.
+        older = range(max(0, protected))
+        compact(older, observations_only=True)
+        compact(older, observations_only=False)
+        for i in older:
+            if total <= self.budget:
+                break
+            if not isinstance(messages[i], (HumanMessage, SystemMessage)):
+                total -= tokens[i]
+                messages[i] = None
+                dropped += 1
+        # Last resort, so the request still fits the context: the recent observations as well.
+        compact(range(max(0, protected), len(messages)), observations_only=True)
+        if total > self.budget:
+            logger.warning("prompt is %d tokens, over the %d-token budget, after compacting", total, self.budget)
+
+        window = [system_message] + [m for m in messages if m is not None]
+        record = {"turn": len(self.turns) + 1, "messages": len(window), "tokens_sent": total,
+                  "tokens_full_history": full, "compacted": compacted, "dropped": dropped}
+        with self._lock:
+            self.turns.append(record)
+        logger.info("LLM turn %(turn)d: %(tokens_sent)d tokens sent (%(tokens_full_history)d in full history), "
+                    "%(compacted)d compacted, %(dropped)d dropped", record)
+        return window
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = list(self.turns)
+        return {
+            "turns": len(turns),
+            "tokens_sent": sum(t["tokens_sent"] for t in turns),
+            "tokens_full_history": sum(t["tokens_full_history"] for t in turns),
+            "per_turn": turns,
+        }
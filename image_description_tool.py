@@ -1,23 +1,114 @@
-import pyautogui
 import base64
-from io import BytesIO
-from PIL import Image
 import io
-from openai import OpenAI
+
+from PIL import Image
+
+from artifact_store import get_artifact_store, is_handle
+from llm_cache import cached_chat_completion
+
+# What describe_image sends to the vision model. Screenshots are captured straight at
+# this size and format, so describing one needs no further decode or encode.
+DESCRIBE_MAX_SIZE = (256, 256)
+DESCRIBE_FORMAT = "JPEG"
+DESCRIBE_QUALITY = 40
+
+
+def _fit(size: tuple, max_size: tuple) -> tuple:
+    scale = min(max_size[0] / size[0], max_size[1] / size[1], 1.0)
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def encode_image(img: Image.Image, max_size=DESCRIBE_MAX_SIZE, fmt: str = DESCRIBE_FORMAT,
+                 quality: int = DESCRIBE_QUALITY) -> bytes:
+    """Downsample (keeping the aspect ratio) and encode in a single pass; the input is not modified."""
+    if max_size:
+        size = _fit(img.size, max_size)
+        if size != img.size:
+            # reducing_gap box-reduces by an integer factor first, so a 4K frame is not
+            # resampled at full resolution.
+            img = img.resize(size, Image.Resampling.BICUBIC, reducing_gap=2.0)
+    if fmt.upper() in ("JPEG", "JPG") and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG" if fmt.upper() == "JPG" else fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def image_for_model(image_bytes: bytes, max_size=DESCRIBE_MAX_SIZE, quality: int = DESCRIBE_QUALITY) -> bytes:
+    """
+    The JPEG sent to the vision model. A JPEG already within max_size (what capture_screenshot
+    produces) is passed through untouched; only its header is read. A larger JPEG is
+    decoded at a reduced scale (draft mode) before the final resize.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == "JPEG" and img.width <= max_size[0] and img.height <= max_size[1]:
+        return image_bytes
+    if img.format == "JPEG":
+        img.draft("RGB", max_size)
+    return encode_image(img, max_size, "JPEG", quality)
+
+
+def _size_arg(value):
+    if value is None:
+        return DESCRIBE_MAX_SIZE
+    if not value:
+        return None     # 0 or []: keep the captured size
+    if isinstance(value, (int, float)):
+        return (int(value), int(value))
+    return tuple(int(v) for v in value)
+
+
+def _window_region(title: str):
+    # Window lookup comes from pygetwindow (installed with pyautogui on Windows).
+    import pygetwindow
+
+    windows = [w for w in pygetwindow.getWindowsWithTitle(title) if w.width > 0 and w.height > 0]
+    if not windows:
+        raise ValueError(f"No window titled '{title}'")
+    return windows[0].left, windows[0].top, windows[0].width, windows[0].height
+
 
 def capture_screenshot(tool_args: dict = None):
+    """
+    Args:
+        tool_args: {
+            "region": [left, top, width, height]   (optional, screen pixels),
+            "window": "title"                      (optional, capture that window),
+            "max_size": 256 or [w, h]              (optional, default: describe_image's size; 0 keeps full size),
+            "format": "JPEG" | "PNG",              (optional),
+            "quality": 40                          (optional, JPEG only)
+        }
+    Returns:
+        dict with the image handle, the captured size ("width", "height"), the size of the
+        stored image ("stored_width", "stored_height") and its bytes, or "error"
+    """
+    tool_args = tool_args or {}
     try:
-        screenshot = pyautogui.screenshot()
-
-        # Save to buffer
-        buffered = BytesIO()
-        screenshot.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
-        
+        # Needs a display; imported here so headless runs only lose this tool.
+        import pyautogui
+
+        region = tool_args.get("region")
+        if tool_args.get("window"):
+            region = _window_region(tool_args["window"])
+        # Only the requested rectangle is grabbed.
+        screenshot = pyautogui.screenshot(region=tuple(int(v) for v in region) if region else None)
+        fmt = tool_args.get("format", DESCRIBE_FORMAT).upper()
+        max_size = _size_arg(tool_args.get("max_size"))
+        data = encode_image(screenshot, max_size, fmt, int(tool_args.get("quality", DESCRIBE_QUALITY)))
+        stored_width, stored_height = _fit(screenshot.size, max_size) if max_size else screenshot.size
+
+        # The image stays out of the conversation; describe_image takes the handle.
+        media_type = "image/png" if fmt == "PNG" else "image/jpeg"
+        handle = get_artifact_store().put(data, kind="image", media_type=media_type)
         return {
             "status": "success",
-            "image_base64": img_base64 + "...",  # Trim for display [:100]
-            "note": "Returned as base64. Truncated for readability."
+            "image": handle,
+            "width": screenshot.width,
+            "height": screenshot.height,
+            "stored_width": stored_width,
+            "stored_height": stored_height,
+            "bytes": len(data),
+            "note": "Pass the image handle to describe_image."
         }
 
     except Exception as e:
@@ -28,6 +119,7 @@ def describe_image(tool_args: dict):
     """
     Args:
         tool_args: {
+            "image": "artifact:..."            (optional, handle from capture_screenshot),
             "image_path": "path/to/image.png" (optional),
             "image_bytes": b"...",             (optional),
             "prompt": "What is in this image?" (optional)
@@ -36,8 +128,15 @@ def describe_image(tool_args: dict):
         dict with "description" or "error"
     """
     try:
+        store = get_artifact_store()
+        handle = next((tool_args[k] for k in ("image", "image_path", "image_bytes") if is_handle(tool_args.get(k))), None)
+
+        # Handle an artifact handle
+        if handle is not None:
+            image_bytes = store.get(handle)
+
         # Handle raw bytes
-        if "image_bytes" in tool_args and isinstance(tool_args["image_bytes"], bytes):
+        elif "image_bytes" in tool_args and isinstance(tool_args["image_bytes"], bytes):
             image_bytes = tool_args["image_bytes"]
 
         # Handle base64 string (your case)
@@ -53,34 +152,25 @@ def describe_image(tool_args: dict):
                 image_bytes = f.read()
 
         else:
-            return {"error": "Missing or invalid 'image_path' or 'image_bytes'"}
+            return {"error": "Missing or invalid 'image', 'image_path' or 'image_bytes'"}
 
-        def compress_image_bytes(image_bytes, max_size=(256, 256), quality=40):
-            """Compress image to JPEG at smaller resolution and quality."""
-            try:
-                img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-                img.thumbnail(max_size)  # Downscale
-                buffer = io.BytesIO()
-                img.save(buffer, format="JPEG", quality=quality)
-                return buffer.getvalue()
-            except Exception as e:
-                raise RuntimeError(f"Image compression failed: {e}")
-
-        compressed_bytes = compress_image_bytes(image_bytes)
+        try:
+            # One resize and encode at most; a capture_screenshot handle is already the right size.
+            compressed_bytes = image_for_model(image_bytes)
+        except Exception as e:
+            raise RuntimeError(f"Image compression failed: {e}")
         print(f"Compressed size: {len(compressed_bytes)} bytes")
-        img = Image.open(io.BytesIO(compressed_bytes))
-        img.verify()  # This will raise if the image is invalid
 
+        # base64 only here, for the data URL the API expects.
         base64_image = base64.b64encode(compressed_bytes).decode("utf-8")
         prompt = tool_args.get("prompt", "What is in this image?")
         print(f"Base64 size: {len(base64_image)} characters")
         image_url = f"data:image/jpeg;base64,{base64_image}"
 
-        client = OpenAI()  # Automatically uses your OPENAI_API_KEY env variable
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        # Cached on the exact request, so re-describing the same image costs no API call.
+        description = cached_chat_completion({
+            "model": "gpt-4o",
+            "messages": [
                 {
                     "role": "user",
                     "content": [
@@ -89,11 +179,12 @@ def describe_image(tool_args: dict):
                     ]
                 }
             ],
-            max_tokens=500
-        )
+            "max_tokens": 500,
+            "temperature": 0.0
+        })
 
 
-        return {"description": response.choices[0].message["content"]}
+        return {"description": description}
 
     except Exception as e:
         return {"error": str(e)}
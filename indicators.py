@@ -0,0 +1,213 @@
+import numpy as np
+
+# Vectorized technical indicators over a (time x ticker) price matrix.
+#
+# Every function accepts a 1-D series or a 2-D matrix with one column per ticker and
+# returns the same shape, NaN where the indicator is not defined yet. Columns may start
+# with NaNs (tickers listed later than others); gaps inside a column should be
+# forward-filled before calling. The loops run over time only and every step is a
+# vector operation across all tickers, so screening hundreds of names is one pass.
+
+TRADING_DAYS = 252
+
+
+def _as_matrix(x):
+    a = np.asarray(x, dtype=np.float64)
+    return (a[:, None], True) if a.ndim == 1 else (a, False)
+
+
+def _restore(out, was_1d):
+    if isinstance(out, tuple):
+        return tuple(o[:, 0] if was_1d else o for o in out)
+    return out[:, 0] if was_1d else out
+
+
+def _rolling_sums(x, n: int, squares: bool = False):
+    """Running window sum (and sum of squares) of the last n values, NaN until n values are in."""
+    T, N = x.shape
+    s = np.zeros(N)
+    q = np.zeros(N)
+    count = np.zeros(N, dtype=np.int64)
+    sums = np.full((T, N), np.nan)
+    sq_sums = np.full((T, N), np.nan) if squares else None
+    for t in range(T):
+        xt = x[t]
+        valid = ~np.isnan(xt)
+        full = valid & (count >= n)
+        if full.any():
+            old = x[t - n]
+            s = np.where(full, s - old, s)
+            if squares:
+                q = np.where(full, q - old * old, q)
+        s = np.where(valid, s + xt, s)
+        if squares:
+            q = np.where(valid, q + xt * xt, q)
+        count += valid
+        ready = valid & (count >= n)
+        sums[t] = np.where(ready, s, np.nan)
+        if squares:
+            sq_sums[t] = np.where(ready, q, np.nan)
+    return sums, sq_sums
+
+
+def sma(x, n: int = 20):
+    x, was_1d = _as_matrix(x)
+    sums, _ = _rolling_sums(x, n)
+    return _restore(sums / n, was_1d)
+
+
+def _ema(x, n: int):
+    """EMA seeded with the simple mean of the first n values, then e += alpha * (x - e)."""
+    T, N = x.shape
+    alpha = 2.0 / (n + 1)
+    e = np.zeros(N)
+    seed = np.zeros(N)
+    count = np.zeros(N, dtype=np.int64)
+    out = np.full((T, N), np.nan)
+    for t in range(T):
+        xt = x[t]
+        valid = ~np.isnan(xt)
+        seeding = valid & (count < n)
+        seed = np.where(seeding, seed + xt, seed)
+        count += valid
+        just_seeded = seeding & (count == n)
+        running = valid & ~seeding
+        e = np.where(just_seeded, seed / n, e)
+        e = np.where(running, e + alpha * (xt - e), e)
+        out[t] = np.where(valid & (count >= n), e, np.nan)
+    return out
+
+
+def ema(x, n: int = 20):
+    x, was_1d = _as_matrix(x)
+    return _restore(_ema(x, n), was_1d)
+
+
+def _wilder(x, n: int):
+    """Wilder smoothing: mean of the first n values, then m = (m * (n - 1) + x) / n."""
+    T, N = x.shape
+    m = np.zeros(N)
+    count = np.zeros(N, dtype=np.int64)
+    out = np.full((T, N), np.nan)
+    for t in range(T):
+        xt = x[t]
+        valid = ~np.isnan(xt)
+        seeding = valid & (count < n)
+        m = np.where(seeding, m + xt, m)
+        count += valid
+        m = np.where(seeding & (count == n), m / n, m)
+        running = valid & ~seeding
+        m = np.where(running, (m * (n - 1) + xt) / n, m)
+        out[t] = np.where(valid & (count >= n), m, np.nan)
+    return out
+
+
+def _diff(x):
+    d = np.full_like(x, np.nan)
+    d[1:] = x[1:] - x[:-1]
+    return d
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    return np.where(np.isnan(avg_gain) | np.isnan(avg_loss), np.nan, rsi)
+
+
+def rsi(x, n: int = 14):
+    """Wilder's RSI: Wilder-smoothed average gain / loss over n price changes."""
+    x, was_1d = _as_matrix(x)
+    d = _diff(x)
+    gains = np.where(np.isnan(d), np.nan, np.maximum(d, 0.0))
+    losses = np.where(np.isnan(d), np.nan, np.maximum(-d, 0.0))
+    return _restore(rsi_from_averages(_wilder(gains, n), _wilder(losses, n)), was_1d)
+
+
+def macd(x, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Returns (macd line, signal line, histogram)."""
+    x, was_1d = _as_matrix(x)
+    line = _ema(x, fast) - _ema(x, slow)
+    sig = _ema(line, signal)
+    return _restore((line, sig, line - sig), was_1d)
+
+
+def rolling_std(x, n: int = 20, ddof: int = 0):
+    x, was_1d = _as_matrix(x)
+    sums, sq_sums = _rolling_sums(x, n, squares=True)
+    return _restore(np.sqrt(variance_from_sums(sums, sq_sums, n, ddof)), was_1d)
+
+
+def variance_from_sums(s, q, n: int, ddof: int = 0):
+    if ddof == 0:
+        mean = s / n
+        var = q / n - mean * mean
+    else:
+        var = (q - s * s / n) / (n - ddof)
+    return np.maximum(var, 0.0)
+
+
+def bollinger(x, n: int = 20, k: float = 2.0):
+    """Returns (middle, upper, lower) bands with a population standard deviation."""
+    x, was_1d = _as_matrix(x)
+    sums, sq_sums = _rolling_sums(x, n, squares=True)
+    mid = sums / n
+    std = np.sqrt(variance_from_sums(sums, sq_sums, n))
+    return _restore((mid, mid + k * std, mid - k * std), was_1d)
+
+
+def true_range(high, low, close):
+    high, was_1d = _as_matrix(high)
+    low, _ = _as_matrix(low)
+    close, _ = _as_matrix(close)
+    prev = np.full_like(close, np.nan)
+    prev[1:] = close[:-1]
+    hl = high - low
+    tr = np.fmax(hl, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    # The first bar of a column has no previous close: fmax above already falls back to high - low.
+    return _restore(tr, was_1d)
+
+
+def atr(high, low, close, n: int = 14):
+    """Wilder-smoothed true range."""
+    tr, was_1d = _as_matrix(true_range(high, low, close))
+    return _restore(_wilder(tr, n), was_1d)
+
+
+def log_returns(x):
+    x, was_1d = _as_matrix(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.full_like(x, np.nan)
+        r[1:] = np.log(x[1:] / x[:-1])
+    return _restore(r, was_1d)
+
+
+def rolling_volatility(x, n: int = 20, annualize: bool = True):
+    """Sample standard deviation of log returns over n bars, annualized by sqrt(252)."""
+    r, was_1d = _as_matrix(log_returns(x))
+    sums, sq_sums = _rolling_sums(r, n, squares=True)
+    vol = np.sqrt(variance_from_sums(sums, sq_sums, n, ddof=1))
+    if annualize:
+        vol = vol * np.sqrt(TRADING_DAYS)
+    return _restore(vol, was_1d)
+
+
+def compute_all(close, high=None, low=None) -> dict:
+    """Every indicator for a (time x ticker) matrix in one pass per indicator."""
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_mid, bb_upper, bb_lower = bollinger(close)
+    out = {
+        "SMA_20": sma(close, 20),
+        "SMA_50": sma(close, 50),
+        "EMA_20": ema(close, 20),
+        "RSI_14": rsi(close, 14),
+        "MACD": macd_line,
+        "MACD_signal": macd_signal,
+        "MACD_hist": macd_hist,
+        "BB_upper": bb_upper,
+        "BB_lower": bb_lower,
+        "volatility_20": rolling_volatility(close, 20),
+    }
+    if high is not None and low is not None:
+        out["ATR_14"] = atr(high, low, close, 14)
+    return out
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+from cache_paths import cache_path
+from tracing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache of LLM responses.
+#
+# Every call is keyed by a hash of (model, sampling parameters, messages). Modes, set
+# with LLM_CACHE_MODE:
+#   read_write  serve hits, call the model on a miss and store the answer (default)
+#   replay      serve hits only; a miss raises LLMCacheMiss (offline, deterministic runs)
+#   off         always call the model
+# Only deterministic calls (temperature 0) are stored in read_write mode. The database
+# is kept under max_bytes by evicting the least recently used entries.
+
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "read_write")
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MODES = ("off", "read_write", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Replay mode was asked for a response that is not in the cache."""
+
+
+def cache_key(model: str, params: dict, messages: list) -> str:
+    payload = json.dumps({"model": model, "params": params, "messages": messages},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = None, mode: str = LLM_CACHE_MODE, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"LLM cache mode must be one of {MODES}, got {mode!r}")
+        self.path = path or cache_path("llm_cache.sqlite")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER,"
+                " created REAL, last_used REAL, hits INTEGER DEFAULT 0)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, key: str):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+            self._stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)", (key, model, response, len(response.encode("utf-8")), now, now))
+            self._stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._stats["evicted"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def call(self, model: str, params: dict, messages: list, compute) -> str:
+        """Return the cached response for this call, or compute() it (and store it)."""
+        with span("llm", model, bytes_out=_chars(messages)) as s:
+            if self.mode == "off":
+                response = compute()
+                s.set(bytes_in=len(response))
+                return response
+            key = cache_key(model, params, messages)
+            cached = self.get(key)
+            if cached is not None:
+                logger.debug("LLM cache hit for %s call %s", model, key[:12])
+                s.set(cache_hit=True, bytes_in=len(cached))
+                return cached
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No cached response for {model} call {key[:12]} (LLM_CACHE_MODE=replay)")
+            response = compute()
+            s.set(bytes_in=len(response))
+            if params.get("temperature") == 0:
+                self.put(key, model, response)
+            return response
+
+    async def acall(self, model: str, params: dict, messages: list, acompute) -> str:
+        """call() for a coroutine-returning acompute; the SQLite lookups are sub-millisecond."""
+        with span("llm", model, bytes_out=_chars(messages)) as s:
+            if self.mode == "off":
+                response = await acompute()
+                s.set(bytes_in=len(response))
+                return response
+            key = cache_key(model, params, messages)
+            cached = self.get(key)
+            if cached is not None:
+                logger.debug("LLM cache hit for %s call %s", model, key[:12])
+                s.set(cache_hit=True, bytes_in=len(cached))
+                return cached
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No cached response for {model} call {key[:12]} (LLM_CACHE_MODE=replay)")
+            response = await acompute()
+            s.set(bytes_in=len(response))
+            if params.get("temperature") == 0:
+                self.put(key, model, response)
+            return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return dict(self._stats, entries=entries, bytes=size, mode=self.mode)
+
+
+def _chars(messages: list) -> int:
+    # Prompt size in characters, recorded as the span's bytes_out.
+    return sum(len(m["content"]) if isinstance(m.get("content"), str) else len(str(m.get("content"))) for m in messages)
+
+
+def _annotate_usage(message):
+    # Token counts reported by the provider for a real call (none for cache hits).
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        annotate(tokens_in=usage.get("input_tokens", 0), tokens_out=usage.get("output_tokens", 0))
+    return message.content
+
+
+def _message_dict(message) -> dict:
+    return {"role": message.type, "content": message.content}
+
+
+def _llm_key_parts(llm) -> tuple:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    params = {
+        "temperature": getattr(llm, "temperature", None),
+        "max_tokens": getattr(llm, "max_tokens", None),
+        "stop": getattr(llm, "stop", None),
+    }
+    return model, params
+
+
+def cached_invoke(llm, messages: list, cache: "LLMCache" = None) -> AIMessage:
+    """llm.invoke(messages) for a ChatOpenAI-style model, through the response cache."""
+    cache = cache or get_llm_cache()
+    model, params = _llm_key_parts(llm)
+    content = cache.call(model, params, [_message_dict(m) for m in messages],
+                         lambda: _annotate_usage(llm.invoke(messages)))
+    return AIMessage(content=content)
+
+
+async def cached_ainvoke(llm, messages: list, cache: "LLMCache" = None) -> AIMessage:
+    """await llm.ainvoke(messages), through the response cache."""
+    cache = cache or get_llm_cache()
+    model, params = _llm_key_parts(llm)
+
+    async def acompute():
+        return _annotate_usage(await llm.ainvoke(messages))
+
+    content = await cache.acall(model, params, [_message_dict(m) for m in messages], acompute)
+    return AIMessage(content=content)
+
+
+def cached_chat_completion(request: dict, client=None, cache: "LLMCache" = None) -> str:
+    """
+    Content of an OpenAI chat.completions.create(**request) call, through the response
+    cache. The client is only created on a miss, so replay mode needs no API key.
+    """
+    cache = cache or get_llm_cache()
+    params = {k: v for k, v in request.items() if k not in ("model", "messages")}
+
+    def compute():
+        from openai import OpenAI
+
+        response = (client or OpenAI()).chat.completions.create(**request)
+        if getattr(response, "usage", None) is not None:
+            annotate(tokens_in=response.usage.prompt_tokens, tokens_out=response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    return cache.call(request["model"], params, request["messages"], compute)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = LLMCache()
+    return _default_cache
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+
+from tracing import get_tracer, host_of, span
+
+NEWSDATA_URL = os.environ.get("NEWSDATA_URL", "https://newsdata.io/api/1/news")
+NEWSDATA_API_KEY = os.environ.get("NEWSDATA_API_KEY", "pub_65f81972c70a4d05a2f040f68c14089b")
+NEWS_CACHE_TTL = 15 * 60    # seconds a fetched page is reused for the same query
+NEWS_CACHE_SIZE = 512       # pages kept at most
+MAX_PAGES = 5               # upper bound on credits spent per query
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def article_keys(item: dict):
+    """Hashes identifying an article by link (host/path, no query string) and by title."""
+    keys = []
+    link = item.get("link")
+    if link:
+        parts = urlsplit(link.strip())
+        host = parts.netloc.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        keys.append("link:" + hashlib.sha1(f"{host}{parts.path.rstrip('/')}".encode("utf-8")).hexdigest())
+    title = _NON_WORD.sub(" ", (item.get("title") or "").lower()).strip()
+    if title:
+        # Syndicated copies keep the headline but live under different links.
+        keys.append("title:" + hashlib.sha1(title.encode("utf-8")).hexdigest())
+    return keys
+
+
+class NewsClient:
+    """
+    newsdata.io search over one shared HTTP session.
+
+    Pages are cached for `ttl` seconds keyed on (normalized query, language, page
+    token), so repeating a question within the TTL costs no API credits; at most
+    `cache_size` pages are kept. search() follows nextPage tokens until it has
+    max_results distinct articles.
+    """
+
+    def __init__(self, api_key: str = NEWSDATA_API_KEY, url: str = NEWSDATA_URL, ttl: float = NEWS_CACHE_TTL,
+                 max_pages: int = MAX_PAGES, cache_size: int = NEWS_CACHE_SIZE):
+        self.api_key = api_key
+        self.url = url
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.cache_size = cache_size
+        self.session = requests.Session()
+        self._cache = OrderedDict()     # key -> (expires, page), oldest first
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "duplicates": 0}
+
+    def _cached(self, key: tuple):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.time():
+                self._stats["cache_hits"] += 1
+                hit = cached[1]
+            else:
+                hit = None
+        if hit is not None:
+            get_tracer().record("http", host_of(self.url), cache_hit=True)
+        return hit
+
+    def _store(self, key: tuple, data: dict) -> dict:
+        now = time.time()
+        with self._lock:
+            self._stats["requests"] += 1
+            self._cache.pop(key, None)
+            self._cache[key] = (now + self.ttl, data)
+            # Every entry lives for the same ttl, so the expired ones are at the front.
+            while self._cache and (len(self._cache) > self.cache_size or next(iter(self._cache.values()))[0] <= now):
+                self._cache.popitem(last=False)
+        return data
+
+    def _params(self, query: str, language: str, page: str = None) -> dict:
+        params = {"apikey": self.api_key, "q": query, "language": language}
+        if page:
+            params["page"] = page
+        return params
+
+    def _page(self, query: str, language: str, page: str = None) -> dict:
+        key = (query, language, page)
+        data = self._cached(key)
+        if data is not None:
+            return data
+        with span("http", host_of(self.url)) as s:
+            response = self.session.get(self.url, params=self._params(query, language, page), timeout=15)
+            s.set(status=response.status_code, bytes_in=len(response.content))
+            response.raise_for_status()
+        return self._store(key, response.json())
+
+    async def _apage(self, query: str, language: str, page: str = None) -> dict:
+        key = (query, language, page)
+        data = self._cached(key)
+        if data is not None:
+            return data
+        from async_http import get_async_http
+
+        response = await get_async_http().get(self.url, params=self._params(query, language, page), timeout=15)
+        response.raise_for_status()
+        return self._store(key, response.json())
+
+    @staticmethod
+    def _queries(query) -> list:
+        queries = [query] if isinstance(query, str) else list(query)
+        return list(dict.fromkeys(normalize_query(q) for q in queries if q and q.strip()))
+
+    def _collect(self, data: dict, seen: set, articles: list, max_results: int) -> bool:
+        """Add the page's new articles; True once max_results have been collected."""
+        for item in data.get("results") or []:
+            keys = article_keys(item)
+            if any(k in seen for k in keys):
+                self._stats["duplicates"] += 1
+                continue
+            seen.update(keys)
+            articles.append({
+                "title": item.get("title"),
+                "pubDate": item.get("pubDate"),
+                "link": item.get("link"),
+                "description": item.get("description"),
+            })
+            if len(articles) >= max_results:
+                return True
+        return False
+
+    def search(self, query, max_results: int = 5, language: str = "en") -> list:
+        """
+        Up to max_results distinct articles for one query or a list of queries; an
+        article already returned (same link or same headline) is not repeated.
+        """
+        if max_results <= 0:
+            return []
+        seen = set()
+        articles = []
+        # Queries advance one page at a time in turn, so each contributes to the results.
+        pending = {q: None for q in self._queries(query)}     # query -> next page token
+        for _ in range(self.max_pages):
+            for q, page in list(pending.items()):
+                data = self._page(q, language, page)
+                if self._collect(data, seen, articles, max_results):
+                    return articles
+                if data.get("nextPage"):
+                    pending[q] = data["nextPage"]
+                else:
+                    del pending[q]
+            if not pending:
+                break
+        return articles
+
+    async def asearch(self, query, max_results: int = 5, language: str = "en") -> list:
+        """search() on the event loop; each round fetches the queries' next pages concurrently."""
+        if max_results <= 0:
+            return []
+        seen = set()
+        articles = []
+        pending = {q: None for q in self._queries(query)}
+        for _ in range(self.max_pages):
+            items = list(pending.items())
+            pages = await asyncio.gather(*(self._apage(q, language, page) for q, page in items))
+            # Merged in query order, so the results match search().
+            for (q, _), data in zip(items, pages):
+                if self._collect(data, seen, articles, max_results):
+                    return articles
+                if data.get("nextPage"):
+                    pending[q] = data["nextPage"]
+                else:
+                    del pending[q]
+            if not pending:
+                break
+        return articles
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_news_client() -> NewsClient:
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = NewsClient()
+    return _default_client
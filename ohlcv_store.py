@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_paths import cache_path
+from tracing import span
+
+# One record per bar; files are raw arrays of these records so they can be memory-mapped.
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),        # bar start, seconds since epoch (UTC)
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+INITIAL_PERIOD = "1y"
+REFRESH_INTERVAL = 60.0  # seconds between tail fetches for the same ticker
+YFINANCE_HOST = "query2.finance.yahoo.com"  # span name for yfinance requests
+
+
+class YFinanceProvider:
+    """Default price source. Any object with the same fetch() signature can replace it."""
+
+    def fetch(self, ticker: str, start: str = None, period: str = None, interval: str = "1d") -> pd.DataFrame:
+        import yfinance as yf
+
+        stock = yf.Ticker(ticker)
+        with span("http", YFINANCE_HOST, path="history", ticker=ticker) as s:
+            if start is not None:
+                df = stock.history(start=start, interval=interval)
+            else:
+                df = stock.history(period=period or INITIAL_PERIOD, interval=interval)
+            s.set(rows=len(df))
+        return df
+
+
+def frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    """Convert a yfinance-style frame (Open/High/Low/Close/Volume, datetime index) to records."""
+    bars = np.zeros(len(df), dtype=BAR_DTYPE)
+    if len(df) == 0:
+        return bars
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    bars["ts"] = index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    for field, column in (("open", "Open"), ("high", "High"), ("low", "Low"), ("close", "Close"), ("volume", "Volume")):
+        bars[field] = df[column].to_numpy(dtype=np.float64)
+    return bars[np.argsort(bars["ts"], kind="stable")]
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"Open": bars["open"], "High": bars["high"], "Low": bars["low"],
+         "Close": bars["close"], "Volume": bars["volume"]},
+        index=pd.to_datetime(bars["ts"], unit="s", utc=True))
+
+
+def aligned_matrix(bars_by_ticker: dict, fields=("close",), last: int = None):
+    """
+    Align per-ticker bars on the union of their timestamps.
+
+    Returns (timestamps, {field: (time x ticker) matrix}, tickers). Gaps inside a column
+    are forward-filled; a ticker with a shorter history keeps leading NaNs.
+    """
+    tickers = [t for t, bars in bars_by_ticker.items() if len(bars)]
+    if not tickers:
+        return np.zeros(0, dtype=np.int64), {field: np.zeros((0, 0)) for field in fields}, []
+    timestamps = np.unique(np.concatenate([bars_by_ticker[t]["ts"] for t in tickers]))
+    if last:
+        timestamps = timestamps[-last:]
+    matrices = {field: np.full((len(timestamps), len(tickers)), np.nan) for field in fields}
+    for j, ticker in enumerate(tickers):
+        bars = bars_by_ticker[ticker]
+        bars = bars[bars["ts"] >= timestamps[0]]
+        rows = np.searchsorted(timestamps, bars["ts"])
+        # Index of the latest available bar at or before each timestamp (forward fill).
+        filled = np.full(len(timestamps), -1)
+        filled[rows] = np.arange(len(rows))
+        filled = np.maximum.accumulate(filled)
+        present = filled >= 0
+        for field in fields:
+            matrices[field][present, j] = bars[field][filled[present]]
+    return timestamps, matrices, tickers
+
+
+class OHLCVStore:
+    """
+    Local per-ticker OHLCV history.
+
+    Bars live in one raw record file per ticker (memory-mapped on read). The first
+    request for a ticker downloads INITIAL_PERIOD of history; after that only the tail
+    since the last stored bar is fetched, at most once per refresh_interval. The last
+    stored bar is re-fetched too and overwritten in place, since it may have been a
+    partial (intraday) bar. Within the refresh interval a query costs no network.
+    """
+
+    def __init__(self, directory: str = None, provider=None, refresh_interval: float = REFRESH_INTERVAL,
+                 interval: str = "1d"):
+        self.directory = directory or os.path.dirname(cache_path("ohlcv", interval, "_"))
+        self.provider = provider or YFinanceProvider()
+        self.refresh_interval = refresh_interval
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self._mapped = {}       # ticker -> memmap of the record file
+        self._checked_at = {}   # ticker -> time of the last provider call
+
+    def set_provider(self, provider):
+        with self._lock:
+            self.provider = provider
+            self._checked_at.clear()
+
+    def bars(self, ticker: str, last: int = None, refresh: bool = True) -> np.ndarray:
+        """Structured array of bars (oldest first); `last` limits it to the most recent N."""
+        ticker = ticker.upper()
+        with self._ticker_lock(ticker):
+            if ticker not in self._checked_at:
+                self._checked_at[ticker] = self._load_checked_at(ticker)
+            if refresh and time.time() - self._checked_at[ticker] >= self.refresh_interval:
+                self._update(ticker)
+            bars = self._map(ticker)
+        if bars is None:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        return bars[-last:] if last else bars
+
+    def frame(self, ticker: str, last: int = None, refresh: bool = True) -> pd.DataFrame:
+        return bars_to_frame(self.bars(ticker, last=last, refresh=refresh))
+
+    def latest(self, ticker: str, refresh: bool = True):
+        bars = self.bars(ticker, last=1, refresh=refresh)
+        return bars[0] if len(bars) else None
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _paths(self, ticker: str):
+        base = os.path.join(self.directory, ticker.replace("/", "_"))
+        return base + ".bars", base + ".json"
+
+    def _load_checked_at(self, ticker: str) -> float:
+        # Lets a restarted process reuse a recent refresh instead of hitting the provider.
+        _, meta_path = self._paths(ticker)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return float(json.load(f)["checked_at"])
+        except (OSError, ValueError, KeyError):
+            return 0.0
+
+    def _map(self, ticker: str):
+        bars = self._mapped.get(ticker)
+        if bars is not None:
+            return bars
+        bars_path, _ = self._paths(ticker)
+        if not os.path.exists(bars_path) or os.path.getsize(bars_path) == 0:
+            return None
+        bars = np.memmap(bars_path, dtype=BAR_DTYPE, mode="r")
+        self._mapped[ticker] = bars
+        return bars
+
+    def _update(self, ticker: str):
+        bars_path, meta_path = self._paths(ticker)
+        stored = self._map(ticker)
+        if stored is None or len(stored) == 0:
+            fresh = frame_to_bars(self.provider.fetch(ticker, period=INITIAL_PERIOD, interval=self.interval))
+            if len(fresh):
+                _atomic_write(bars_path, fresh.tobytes())
+        else:
+            last_ts = int(stored["ts"][-1])
+            start = pd.Timestamp(last_ts, unit="s", tz="UTC").strftime("%Y-%m-%d")
+            fresh = frame_to_bars(self.provider.fetch(ticker, start=start, interval=self.interval))
+            fresh = fresh[fresh["ts"] >= last_ts]
+            if len(fresh):
+                with open(bars_path, "r+b") as f:
+                    if fresh["ts"][0] == last_ts:
+                        # Overwrite the (possibly partial) last bar in place, append the rest.
+                        f.seek((len(stored) - 1) * BAR_DTYPE.itemsize)
+                    else:
+                        f.seek(0, os.SEEK_END)
+                    f.write(fresh.tobytes())
+
+        self._mapped.pop(ticker, None)
+        self._checked_at[ticker] = time.time()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"checked_at": self._checked_at[ticker], "interval": self.interval}, f)
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_ohlcv_store() -> OHLCVStore:
+    """Process-wide daily-bar store shared by the price and indicator tools."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = OHLCVStore()
+    return _default_store
+
+
+def set_price_provider(provider):
+    """Swap the price source (e.g. a fake provider in tests) for the shared store."""
+    get_ohlcv_store().set_provider(provider)
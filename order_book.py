@@ -0,0 +1,386 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import requests
+
+from tracing import span, host_of
+
+logger = logging.getLogger(__name__)
+
+# Local order books kept current from Binance diff-depth streams.
+#
+# A book is seeded from a REST snapshot (lastUpdateId) and then advanced by depth
+# events carrying the update-id range [U, u]. The first event applied must straddle
+# lastUpdateId + 1, every later one must start right after the previous u; anything
+# else means updates were lost, and the book is re-seeded from a fresh snapshot.
+
+BINANCE_API_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.us").rstrip("/")
+BINANCE_WS_URL = os.environ.get("BINANCE_WS_URL", "wss://stream.binance.us:9443/ws").rstrip("/")
+SNAPSHOT_LIMIT = 1000   # levels per side requested when seeding a book
+MAX_LEVELS = 5000       # levels per side kept in memory; diffs far from the touch are dropped
+
+_session = requests.Session()
+
+
+class SequenceGapError(Exception):
+    """A depth event does not continue the book's update-id sequence."""
+
+
+def _levels(levels) -> np.ndarray:
+    """[[price, qty], ...] (strings or numbers) -> (n, 2) float array."""
+    if len(levels) == 0:
+        return np.zeros((0, 2))
+    return np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+
+
+class BookSide:
+    """
+    One side of a book as two parallel arrays ordered best level first.
+
+    Levels are keyed by price for asks and -price for bids, so both sides are ascending
+    in key order. An update batch is merged in one vectorized pass; the (prices, qtys)
+    pair is swapped in as a whole, so readers never see a half-applied update.
+    """
+
+    __slots__ = ("sign", "max_levels", "levels")
+
+    def __init__(self, is_bid: bool, max_levels: int = MAX_LEVELS):
+        self.sign = -1.0 if is_bid else 1.0
+        self.max_levels = max_levels
+        self.levels = (np.zeros(0), np.zeros(0))
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def load(self, levels):
+        data = _levels(levels)
+        data = data[data[:, 1] > 0]
+        order = np.argsort(self.sign * data[:, 0], kind="stable")
+        self.levels = (data[order, 0][:self.max_levels].copy(), data[order, 1][:self.max_levels].copy())
+
+    def apply(self, levels):
+        """Set each (price, qty); a quantity of 0 removes the level. Later duplicates win."""
+        updates = _levels(levels)
+        if len(updates) == 0:
+            return
+        prices, qtys = self.levels
+        # Updates go first, reversed, so np.unique's first occurrence is the latest value.
+        keys = np.concatenate((self.sign * updates[::-1, 0], self.sign * prices))
+        merged_qtys = np.concatenate((updates[::-1, 1], qtys))
+        keys, first = np.unique(keys, return_index=True)
+        merged_qtys = merged_qtys[first]
+        keep = merged_qtys > 0
+        self.levels = ((self.sign * keys[keep])[:self.max_levels], merged_qtys[keep][:self.max_levels])
+
+    def top(self, n: int):
+        prices, qtys = self.levels
+        return prices[:n], qtys[:n]
+
+
+class OrderBook:
+    """A single symbol's book: snapshot seeding plus sequence-checked diff updates."""
+
+    def __init__(self, symbol: str, max_levels: int = MAX_LEVELS):
+        self.symbol = symbol.upper()
+        self.bids = BookSide(is_bid=True, max_levels=max_levels)
+        self.asks = BookSide(is_bid=False, max_levels=max_levels)
+        self.last_update_id = None
+        self.event_time = None      # exchange time (ms) of the last applied event
+        self.updated_at = None      # local time of the last change
+        self.updates = 0
+        self._bridged = False       # whether an event has been applied since the snapshot
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None and self._bridged
+
+    def load_snapshot(self, snapshot: dict):
+        self.bids.load(snapshot.get("bids", []))
+        self.asks.load(snapshot.get("asks", []))
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self.event_time = snapshot.get("E")
+        self.updated_at = time.time()
+        self._bridged = False
+
+    def reset(self):
+        self.last_update_id = None
+        self._bridged = False
+
+    def apply_diff(self, event: dict) -> bool:
+        """
+        Apply one depth event. Returns False for an event already covered by the book
+        and raises SequenceGapError when updates between the book and the event are missing.
+        """
+        if self.last_update_id is None:
+            raise SequenceGapError(f"{self.symbol}: no snapshot loaded")
+        first, final = int(event["U"]), int(event["u"])
+        if final <= self.last_update_id:
+            return False
+        if self._bridged:
+            # Futures streams also carry the previous event's final id as "pu".
+            previous = event.get("pu")
+            expected = self.last_update_id if previous is not None else self.last_update_id + 1
+            if (int(previous) if previous is not None else first) != expected:
+                raise SequenceGapError(f"{self.symbol}: expected update {self.last_update_id + 1}, got {first}")
+        elif not first <= self.last_update_id + 1 <= final:
+            raise SequenceGapError(
+                f"{self.symbol}: event [{first}, {final}] does not follow snapshot {self.last_update_id}")
+
+        self.bids.apply(event.get("b", []))
+        self.asks.apply(event.get("a", []))
+        self.last_update_id = final
+        self.event_time = event.get("E", self.event_time)
+        self.updated_at = time.time()
+        self.updates += 1
+        self._bridged = True
+        return True
+
+    def top(self, n: int = 5):
+        """(bid prices, bid qtys, ask prices, ask qtys) for the best n levels per side."""
+        bid_prices, bid_qtys = self.bids.top(n)
+        ask_prices, ask_qtys = self.asks.top(n)
+        return bid_prices, bid_qtys, ask_prices, ask_qtys
+
+    def to_dict(self, depth: int = 5) -> dict:
+        bid_prices, bid_qtys, ask_prices, ask_qtys = self.top(depth)
+        return {
+            "symbol": self.symbol,
+            "bids": np.column_stack((bid_prices, bid_qtys)).tolist(),
+            "asks": np.column_stack((ask_prices, ask_qtys)).tolist(),
+            "last_update_id": self.last_update_id,
+        }
+
+
+def _snapshot_params(symbol: str, limit: int) -> dict:
+    return {"symbol": symbol.upper(), "limit": max(1, min(int(limit), 5000))}
+
+
+def fetch_snapshot(symbol: str, limit: int = SNAPSHOT_LIMIT) -> dict:
+    """REST depth snapshot: {"lastUpdateId", "bids", "asks"}."""
+    with span("http", host_of(BINANCE_API_URL), path="/api/v3/depth") as s:
+        response = _session.get(f"{BINANCE_API_URL}/api/v3/depth", params=_snapshot_params(symbol, limit), timeout=10)
+        s.set(status=response.status_code, bytes_in=len(response.content))
+        response.raise_for_status()
+    return response.json()
+
+
+_snapshots_in_flight = weakref.WeakKeyDictionary()  # event loop -> {(symbol, limit): task}
+
+
+async def _afetch_snapshot(params: dict) -> dict:
+    from async_http import get_async_http
+
+    response = await get_async_http().get(f"{BINANCE_API_URL}/api/v3/depth", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def _forget_snapshot(in_flight: dict, key: tuple, task: asyncio.Task):
+    in_flight.pop(key, None)
+    if not task.cancelled():
+        task.exception()    # retrieved by the waiters; keeps asyncio from logging it again
+
+
+async def afetch_snapshot(symbol: str, limit: int = SNAPSHOT_LIMIT) -> dict:
+    """
+    fetch_snapshot() on the event loop's shared async HTTP client. Concurrent calls for
+    the same symbol and limit share one request (callers must not modify the result).
+    """
+    params = _snapshot_params(symbol, limit)
+    key = (params["symbol"], params["limit"])
+    in_flight = _snapshots_in_flight.setdefault(asyncio.get_running_loop(), {})
+    task = in_flight.get(key)
+    if task is None:
+        task = in_flight[key] = asyncio.ensure_future(_afetch_snapshot(params))
+        task.add_done_callback(lambda t: _forget_snapshot(in_flight, key, t))
+    # One waiter being cancelled must not cancel the request the others are waiting on.
+    return await asyncio.shield(task)
+
+
+class ReplayFeed:
+    """
+    Stand-in feed that replays recorded depth events (e.g. in tests).
+
+    Records are dicts, or lines of a JSONL file: depth events ({"U", "u", "b", "a", ...})
+    and snapshots ({"lastUpdateId", "bids", "asks"}). Snapshots are not yielded as events;
+    snapshot() hands them out in recording order, one per (re)seed of each symbol.
+    """
+
+    def __init__(self, records):
+        if isinstance(records, str):
+            with open(records, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        self.records = list(records)
+        self._snapshot_at = {}  # symbol -> index of its next snapshot record to hand out
+
+    def _matches(self, record: dict, symbol: str) -> bool:
+        return "s" not in record or record["s"].upper() == symbol
+
+    def snapshot(self, symbol: str) -> dict:
+        """The next recorded snapshot for `symbol`, in recording order."""
+        symbol = symbol.upper()
+        # One cursor per symbol: resyncing one symbol must not skip another's snapshots.
+        for i in range(self._snapshot_at.get(symbol, 0), len(self.records)):
+            record = self.records[i]
+            if "lastUpdateId" in record and self._matches(record, symbol):
+                self._snapshot_at[symbol] = i + 1
+                return record
+        raise SequenceGapError(f"{symbol}: no recorded snapshot left to resync from")
+
+    def events(self, symbol: str):
+        symbol = symbol.upper()
+        for record in self.records:
+            if "lastUpdateId" not in record and self._matches(record, symbol):
+                yield record
+
+
+class BinanceDepthFeed:
+    """Live diff-depth events from the Binance websocket (needs the websocket-client package)."""
+
+    def __init__(self, speed_ms: int = 100, base_url: str = BINANCE_WS_URL):
+        self.speed_ms = speed_ms
+        self.base_url = base_url
+
+    def snapshot(self, symbol: str) -> dict:
+        return fetch_snapshot(symbol)
+
+    def events(self, symbol: str):
+        import websocket
+
+        ws = websocket.create_connection(f"{self.base_url}/{symbol.lower()}@depth@{self.speed_ms}ms", timeout=30)
+        try:
+            while True:
+                message = json.loads(ws.recv())
+                yield message.get("data", message)
+        finally:
+            ws.close()
+
+
+class OrderBookManager:
+    """
+    Order books for many symbols, each advanced by its own feed.
+
+    follow() seeds the book from the feed's snapshot on the first event (so events that
+    arrived while the snapshot was in flight are already queued) and re-seeds after a
+    sequence gap. top() serves a followed symbol from memory and falls back to a one-off
+    REST snapshot for anything else.
+    """
+
+    def __init__(self, max_levels: int = MAX_LEVELS):
+        self.max_levels = max_levels
+        self.books = {}
+        self.resyncs = {}
+        self._threads = {}
+        self._stop = {}
+        self._lock = threading.Lock()
+
+    def book(self, symbol: str):
+        book = self.books.get(symbol.upper())
+        return book if book is not None and book.synced else None
+
+    def is_following(self, symbol: str) -> bool:
+        thread = self._threads.get(symbol.upper())
+        return thread is not None and thread.is_alive()
+
+    def follow(self, symbol: str, feed=None, background: bool = True):
+        """
+        Start maintaining `symbol` from `feed` (live websocket by default). In the
+        background by default; with background=False the feed is consumed here and the
+        finished book returned (replays).
+        """
+        symbol = symbol.upper()
+        feed = feed or BinanceDepthFeed()
+        with self._lock:
+            if self.is_following(symbol):
+                return self.books.get(symbol)
+            self._stop[symbol] = threading.Event()
+            if background:
+                thread = threading.Thread(target=self._run_logged, args=(symbol, feed),
+                                          name=f"order-book-{symbol}", daemon=True)
+                self._threads[symbol] = thread
+                thread.start()
+                return None
+        return self.run(symbol, feed)
+
+    def stop(self, symbol: str = None):
+        for name in ([symbol.upper()] if symbol else list(self._stop)):
+            if name in self._stop:
+                self._stop[name].set()
+
+    def run(self, symbol: str, feed) -> OrderBook:
+        """Consume `feed` until it ends or stop() is called; returns the book."""
+        symbol = symbol.upper()
+        book = OrderBook(symbol, self.max_levels)
+        self.books[symbol] = book
+        self.resyncs.setdefault(symbol, 0)
+        stop = self._stop.setdefault(symbol, threading.Event())
+        for event in feed.events(symbol):
+            if stop.is_set():
+                break
+            if book.last_update_id is None:
+                book.load_snapshot(feed.snapshot(symbol))
+            try:
+                book.apply_diff(event)
+            except SequenceGapError as e:
+                logger.warning("%s; resyncing from a new snapshot", e)
+                self.resyncs[symbol] += 1
+                book.load_snapshot(feed.snapshot(symbol))
+                try:
+                    book.apply_diff(event)
+                except SequenceGapError:
+                    # The snapshot is older than this event: seed again on the next one.
+                    book.reset()
+        return book
+
+    def _run_logged(self, symbol: str, feed):
+        try:
+            self.run(symbol, feed)
+        except Exception:
+            logger.exception("order book feed for %s stopped", symbol)
+
+    def current(self, symbol: str, depth: int = 5):
+        """(book, source): the followed book, else a one-off REST snapshot of `depth` levels."""
+        symbol = symbol.upper()
+        book = self.book(symbol)
+        if book is not None:
+            return book, "local"
+        snapshot = OrderBook(symbol, self.max_levels)
+        snapshot.load_snapshot(fetch_snapshot(symbol, limit=depth))
+        return snapshot, "rest"
+
+    async def acurrent(self, symbol: str, depth: int = 5):
+        """current() with the REST fallback awaited instead of blocking."""
+        symbol = symbol.upper()
+        book = self.book(symbol)
+        if book is not None:
+            return book, "local"
+        snapshot = OrderBook(symbol, self.max_levels)
+        snapshot.load_snapshot(await afetch_snapshot(symbol, limit=depth))
+        return snapshot, "rest"
+
+    def top(self, symbol: str, depth: int = 5) -> dict:
+        book, source = self.current(symbol, depth)
+        result = book.to_dict(depth)
+        result["source"] = source
+        if source == "local":
+            result["age_s"] = round(time.time() - book.updated_at, 3)
+        return result
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_order_book_manager() -> OrderBookManager:
+    global _default_manager
+    if _default_manager is None:
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = OrderBookManager()
+    return _default_manager
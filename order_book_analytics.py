@@ -0,0 +1,152 @@
+import numpy as np
+
+# Microstructure metrics for many order books at once.
+#
+# Books are stacked into (symbol x level) arrays, best level first, padded with NaN
+# prices and zero quantities where a book has fewer levels. Every metric is then a few
+# array operations over the whole stack, and summarize() turns the result into a
+# small per-symbol dict of numbers for the LLM instead of the raw levels.
+
+DEFAULT_BANDS_BPS = (10, 50, 100)
+IMBALANCE_LEVELS = 10
+
+
+def stack_levels(books, depth: int):
+    """
+    books: sequence of (bid prices, bid qtys, ask prices, ask qtys) arrays, best first.
+    Returns a dict of (len(books) x depth) float arrays.
+    """
+    shape = (len(books), depth)
+    out = {"bid_px": np.full(shape, np.nan), "bid_qty": np.zeros(shape),
+           "ask_px": np.full(shape, np.nan), "ask_qty": np.zeros(shape)}
+    for i, levels in enumerate(books):
+        for name, values in zip(("bid_px", "bid_qty", "ask_px", "ask_qty"), levels):
+            values = np.asarray(values, dtype=np.float64)[:depth]
+            out[name][i, :len(values)] = values
+    return out
+
+
+def spread_mid(bid_px, ask_px):
+    """(spread, mid, spread in bps of mid) from the best levels."""
+    best_bid, best_ask = bid_px[:, 0], ask_px[:, 0]
+    spread = best_ask - best_bid
+    mid = (best_ask + best_bid) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread_bps = spread / mid * 1e4
+    return spread, mid, spread_bps
+
+
+def imbalance(bid_qty, ask_qty, levels: int = IMBALANCE_LEVELS):
+    """
+    Depth-weighted imbalance in [-1, 1] over the first `levels` levels, level k weighted
+    1 / (k + 1): positive when resting bids outweigh asks near the touch.
+    """
+    bid_qty, ask_qty = bid_qty[:, :levels], ask_qty[:, :levels]
+    weights = 1.0 / np.arange(1, bid_qty.shape[1] + 1)
+    bids, asks = bid_qty @ weights, ask_qty @ weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (bids - asks) / (bids + asks)
+
+
+def cumulative_depth(px, qty):
+    """Cumulative base quantity and quote notional per level (the depth curve)."""
+    notional = np.where(qty > 0, px * qty, 0.0)
+    return np.cumsum(qty, axis=1), np.cumsum(notional, axis=1)
+
+
+def depth_within(px, qty, mid, bands_bps, is_bid: bool):
+    """Quote notional resting within each band (bps of mid) of the mid: (symbols x bands)."""
+    bands = np.asarray(bands_bps, dtype=np.float64) / 1e4
+    notional = np.where(qty > 0, px * qty, 0.0)
+    if is_bid:
+        limits = mid[:, None] * (1.0 - bands[None, :])
+        inside = px[:, :, None] >= limits[:, None, :]
+    else:
+        limits = mid[:, None] * (1.0 + bands[None, :])
+        inside = px[:, :, None] <= limits[:, None, :]
+    return (notional[:, :, None] * inside).sum(axis=1)
+
+
+def sweep(px, qty, size=None, notional=None):
+    """
+    Walk each book side with a market order of `size` (base) or `notional` (quote).
+    Returns (vwap, base filled, quote spent, fraction of the order filled).
+    """
+    cum_qty, cum_notional = cumulative_depth(px, qty)
+    level_notional = np.where(qty > 0, px * qty, 0.0)
+    if notional is not None:
+        target = np.broadcast_to(np.asarray(notional, dtype=np.float64), (px.shape[0],))
+        spent = np.clip(target[:, None] - (cum_notional - level_notional), 0.0, level_notional)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            filled = np.where(qty > 0, spent / px, 0.0)
+    else:
+        target = np.broadcast_to(np.asarray(size, dtype=np.float64), (px.shape[0],))
+        filled = np.clip(target[:, None] - (cum_qty - qty), 0.0, qty)
+        spent = np.where(filled > 0, filled * px, 0.0)
+    base, quote = filled.sum(axis=1), spent.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = quote / base
+        fraction = (quote if notional is not None else base) / target
+    return vwap, base, quote, np.minimum(fraction, 1.0)
+
+
+def analyze(levels: dict, size=None, notional=None, bands_bps=DEFAULT_BANDS_BPS,
+            imbalance_levels: int = IMBALANCE_LEVELS) -> dict:
+    """All metrics for a stack from stack_levels(), as arrays with one entry per symbol."""
+    bid_px, bid_qty, ask_px, ask_qty = levels["bid_px"], levels["bid_qty"], levels["ask_px"], levels["ask_qty"]
+    spread, mid, spread_bps = spread_mid(bid_px, ask_px)
+    out = {
+        "best_bid": bid_px[:, 0],
+        "best_ask": ask_px[:, 0],
+        "mid": mid,
+        "spread": spread,
+        "spread_bps": spread_bps,
+        "imbalance_top": imbalance(bid_qty, ask_qty, 1),
+        "imbalance_weighted": imbalance(bid_qty, ask_qty, imbalance_levels),
+        "bid_depth": depth_within(bid_px, bid_qty, mid, bands_bps, is_bid=True),
+        "ask_depth": depth_within(ask_px, ask_qty, mid, bands_bps, is_bid=False),
+    }
+    if size is not None or notional is not None:
+        buy_vwap, buy_base, buy_quote, buy_filled = sweep(ask_px, ask_qty, size, notional)
+        sell_vwap, sell_base, sell_quote, sell_filled = sweep(bid_px, bid_qty, size, notional)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["buy_slippage_bps"] = (buy_vwap / mid - 1.0) * 1e4
+            out["sell_slippage_bps"] = (1.0 - sell_vwap / mid) * 1e4
+        out.update(buy_vwap=buy_vwap, buy_filled=buy_filled, buy_base=buy_base, buy_quote=buy_quote,
+                   sell_vwap=sell_vwap, sell_filled=sell_filled, sell_base=sell_base, sell_quote=sell_quote)
+    return out
+
+
+def _num(x, digits: int = 10):
+    x = float(x)
+    return None if np.isnan(x) else float(f"{x:.{digits}g}")
+
+
+def summarize(symbols, metrics: dict, bands_bps=DEFAULT_BANDS_BPS) -> dict:
+    """Compact per-symbol dict of the analyze() output."""
+    results = {}
+    for i, symbol in enumerate(symbols):
+        summary = {
+            "best_bid": _num(metrics["best_bid"][i]),
+            "best_ask": _num(metrics["best_ask"][i]),
+            "mid": _num(metrics["mid"][i]),
+            "spread": _num(metrics["spread"][i]),
+            "spread_bps": _num(metrics["spread_bps"][i], 4),
+            "imbalance_top": _num(metrics["imbalance_top"][i], 4),
+            "imbalance_weighted": _num(metrics["imbalance_weighted"][i], 4),
+            "depth_quote_within_bps": {
+                str(band): {"bid": _num(metrics["bid_depth"][i, j], 6), "ask": _num(metrics["ask_depth"][i, j], 6)}
+                for j, band in enumerate(bands_bps)
+            },
+        }
+        if "buy_vwap" in metrics:
+            for side in ("buy", "sell"):
+                summary[side] = {
+                    "vwap": _num(metrics[f"{side}_vwap"][i]),
+                    "slippage_bps": _num(metrics[f"{side}_slippage_bps"][i], 4),
+                    "base": _num(metrics[f"{side}_base"][i], 8),
+                    "quote": _num(metrics[f"{side}_quote"][i], 8),
+                    "filled": _num(metrics[f"{side}_filled"][i], 4),
+                }
+        results[symbol] = summary
+    return results
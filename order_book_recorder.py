@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from cache_paths import cache_path
+
+# Append-only binary log of order-book snapshots.
+#
+# The file is a 64-byte header followed by fixed-size records (timestamp, symbol id,
+# update id and `depth` price/qty levels per side), so it can be memory-mapped as one
+# structured array: reading a record is an index into the map, no parsing. Symbol
+# names live in a small JSON sidecar; the per-symbol time index (record positions and
+# timestamps) is built from the mapped columns on first use and extended as the log grows.
+
+MAGIC = b"OBLOG\x00\x00\x01"
+HEADER_SIZE = 64
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("depth", "<u4"), ("record_size", "<u4")])
+VERSION = 1
+RECORD_DEPTH = 20
+RECORDING_ENABLED = os.environ.get("ORDER_BOOK_RECORD", "0") == "1"   # opt-in; per call with record=true
+
+
+def record_dtype(depth: int) -> np.dtype:
+    return np.dtype([
+        ("ts", "<i8"),                  # milliseconds since epoch (UTC)
+        ("last_update_id", "<i8"),
+        ("symbol", "<u4"),              # index into the symbol table
+        ("n_bids", "<u2"),              # levels actually present (the rest are NaN/0)
+        ("n_asks", "<u2"),
+        ("bid_px", "<f8", (depth,)),
+        ("bid_qty", "<f8", (depth,)),
+        ("ask_px", "<f8", (depth,)),
+        ("ask_qty", "<f8", (depth,)),
+    ])
+
+
+def record_levels(record):
+    """(bid prices, bid qtys, ask prices, ask qtys) of one record, trimmed to the levels present."""
+    n_bids, n_asks = int(record["n_bids"]), int(record["n_asks"])
+    return record["bid_px"][:n_bids], record["bid_qty"][:n_bids], record["ask_px"][:n_asks], record["ask_qty"][:n_asks]
+
+
+class OrderBookLog:
+    """
+    Recorder and replay for one log file.
+
+    append() writes a record at the end of the file; records(), seek(), at() and
+    replay() read through a memory map of the file that is refreshed when it has grown.
+    """
+
+    def __init__(self, path: str = None, depth: int = RECORD_DEPTH):
+        self.path = path or cache_path("order_books", "books.oblog")
+        self._lock = threading.Lock()
+        self._file = None
+        self._mapped = None
+        self._index = {}        # symbol id -> (positions, timestamps)
+        self._indexed = 0       # records covered by _index
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER_SIZE:
+            header = np.fromfile(self.path, dtype=HEADER_DTYPE, count=1)[0]
+            if header["magic"] != MAGIC:
+                raise ValueError(f"{self.path} is not an order book log")
+            depth = int(header["depth"])
+        else:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header[0] = (MAGIC, VERSION, depth, record_dtype(depth).itemsize)
+            with open(self.path, "wb") as f:
+                f.write(header.tobytes().ljust(HEADER_SIZE, b"\x00"))
+        self.depth = depth
+        self.dtype = record_dtype(depth)
+        self.symbols = self._load_symbols()
+        self._symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    # -- recording ---------------------------------------------------------------
+
+    def _symbols_path(self) -> str:
+        return self.path + ".symbols.json"
+
+    def _load_symbols(self) -> list:
+        try:
+            with open(self._symbols_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _symbol_id(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self._symbol_ids[symbol] = symbol_id
+            tmp_path = self._symbols_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.symbols, f)
+            os.replace(tmp_path, self._symbols_path())
+        return symbol_id
+
+    def append(self, symbol: str, bid_px, bid_qty, ask_px, ask_qty, ts: int = None, last_update_id: int = 0):
+        """Record the best `depth` levels of a book; ts defaults to now (ms)."""
+        record = np.zeros(1, dtype=self.dtype)[0]
+        record["ts"] = int(time.time() * 1000) if ts is None else int(ts)
+        record["last_update_id"] = last_update_id or 0
+        for side, px, qty in (("bid", bid_px, bid_qty), ("ask", ask_px, ask_qty)):
+            px = np.asarray(px, dtype=np.float64)[:self.depth]
+            qty = np.asarray(qty, dtype=np.float64)[:self.depth]
+            record[f"{side}_px"][:] = np.nan
+            record[f"{side}_px"][:len(px)] = px
+            record[f"{side}_qty"][:len(qty)] = qty
+            record[f"n_{side}s"] = len(px)
+        with self._lock:
+            record["symbol"] = self._symbol_id(symbol.upper())
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(record.tobytes())
+            self._file.flush()
+
+    def append_book(self, book, ts: int = None):
+        """Record an order_book.OrderBook at its exchange event time (or now)."""
+        bid_px, bid_qty, ask_px, ask_qty = book.top(self.depth)
+        self.append(book.symbol, bid_px, bid_qty, ask_px, ask_qty,
+                    ts=ts if ts is not None else book.event_time, last_update_id=book.last_update_id)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # -- replay ------------------------------------------------------------------
+
+    def __len__(self):
+        return max(0, (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize)
+
+    def records(self) -> np.ndarray:
+        """Every record, as a read-only memory-mapped structured array."""
+        count = len(self)
+        if self._mapped is None or len(self._mapped) != count:
+            if count == 0:
+                return np.zeros(0, dtype=self.dtype)
+            self._mapped = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        return self._mapped
+
+    def _symbol_index(self, symbol: str):
+        """(record positions, timestamps) of `symbol`, ordered by time."""
+        records = self.records()
+        symbol_id = self._symbol_ids.get(symbol.upper())
+        if symbol_id is None:
+            # Possibly recorded by another process since the table was read.
+            self.symbols = self._load_symbols()
+            self._symbol_ids = {name: i for i, name in enumerate(self.symbols)}
+            symbol_id = self._symbol_ids.get(symbol.upper())
+        if symbol_id is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        with self._lock:
+            self._extend_index(records)
+        return self._index.get(symbol_id, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)))
+
+    def _extend_index(self, records):
+        if self._indexed < len(records):
+            new = records[self._indexed:]
+            ids, ts = np.asarray(new["symbol"]), np.asarray(new["ts"])
+            # Group the new rows by symbol in one stable sort (file order kept within a symbol).
+            order = np.argsort(ids, kind="stable")
+            symbol_ids, starts = np.unique(ids[order], return_index=True)
+            for sid, rows in zip(symbol_ids.tolist(), np.split(order, starts[1:])):
+                positions, times = self._index.get(sid, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)))
+                positions = np.concatenate((positions, rows + self._indexed))
+                times = np.concatenate((times, ts[rows]))
+                if len(times) > 1 and (np.diff(times) < 0).any():
+                    order_by_time = np.argsort(times, kind="stable")
+                    positions, times = positions[order_by_time], times[order_by_time]
+                self._index[sid] = (positions, times)
+            self._indexed = len(records)
+
+    def times(self, symbol: str) -> np.ndarray:
+        return self._symbol_index(symbol)[1]
+
+    def seek(self, symbol: str, ts: int) -> int:
+        """Position in `symbol`'s time index of the first record at or after ts (ms)."""
+        return int(np.searchsorted(self._symbol_index(symbol)[1], ts, side="left"))
+
+    def at(self, symbol: str, ts: int):
+        """The book of `symbol` as it was at ts: the latest record at or before it, or None."""
+        positions, times = self._symbol_index(symbol)
+        i = int(np.searchsorted(times, ts, side="right")) - 1
+        return self.records()[positions[i]] if i >= 0 else None
+
+    def replay(self, symbol: str = None, start: int = None, end: int = None):
+        """
+        Iterate records (views into the map) with start <= ts < end, in time order; all
+        symbols interleaved in file order when `symbol` is None.
+        """
+        records = self.records()
+        if symbol is None:
+            ts = records["ts"]
+            mask = np.ones(len(records), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts < end
+            positions = np.flatnonzero(mask)
+        else:
+            positions, times = self._symbol_index(symbol)
+            lo = np.searchsorted(times, start, side="left") if start is not None else 0
+            hi = np.searchsorted(times, end, side="left") if end is not None else len(times)
+            positions = positions[lo:hi]
+        for position in positions.tolist():
+            yield records[position]
+
+    def symbol_of(self, record) -> str:
+        return self.symbols[int(record["symbol"])]
+
+
+_default_log = None
+_default_log_lock = threading.Lock()
+
+
+def get_order_book_log() -> OrderBookLog:
+    global _default_log
+    if _default_log is None:
+        with _default_log_lock:
+            if _default_log is None:
+                _default_log = OrderBookLog()
+    return _default_log
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from cache_paths import cache_path
+from edgar_client import get_edgar_client, SEC_WWW_URL
+
+COMPANY_TICKERS_URL = f"{SEC_WWW_URL}/files/company_tickers.json"
+INDEX_TTL_SECONDS = 24 * 60 * 60
+
+
+class TickerIndex:
+    """
+    On-disk ticker <-> CIK <-> company name index built from SEC's company_tickers.json.
+
+    The index is loaded lazily on the first lookup and kept in dictionaries, so every
+    lookup after that is O(1). Once the TTL expires the file is revalidated with a
+    conditional GET (ETag / Last-Modified); an unchanged file costs a 304 and no download.
+    """
+
+    def __init__(self, path: str = None, ttl: float = INDEX_TTL_SECONDS, url: str = COMPANY_TICKERS_URL):
+        self.path = path or cache_path("sec", "company_tickers_index.json")
+        self.ttl = ttl
+        self.url = url
+        self._lock = threading.Lock()
+        self._meta = None
+        self._by_ticker = {}
+        self._by_cik = {}
+
+    def cik_for_ticker(self, ticker: str):
+        """Return the zero-padded 10 digit CIK for a ticker, or None if unknown."""
+        self._ensure_loaded()
+        entry = self._by_ticker.get(_normalize_ticker(ticker))
+        return entry[0] if entry else None
+
+    def ticker_for_cik(self, cik):
+        """Return the primary ticker registered for a CIK, or None if unknown."""
+        self._ensure_loaded()
+        entry = self._by_cik.get(str(cik).zfill(10))
+        return entry[0] if entry else None
+
+    def tickers_for_cik(self, cik) -> list:
+        """Return every ticker registered for a CIK (share classes share one CIK)."""
+        self._ensure_loaded()
+        entry = self._by_cik.get(str(cik).zfill(10))
+        return list(entry[2]) if entry else []
+
+    def name_for(self, ticker_or_cik: str):
+        """Return the company name for a ticker or CIK, or None if unknown."""
+        self._ensure_loaded()
+        key = str(ticker_or_cik)
+        if key.isdigit():
+            entry = self._by_cik.get(key.zfill(10))
+        else:
+            entry = self._by_ticker.get(_normalize_ticker(key))
+        return entry[1] if entry else None
+
+    def resolve_cik(self, ticker_or_cik: str):
+        """Accept either a ticker or a CIK and return the zero-padded CIK, or None."""
+        key = str(ticker_or_cik).strip()
+        if key.isdigit():
+            return key.zfill(10)
+        return self.cik_for_ticker(key)
+
+    def refresh(self, force: bool = False):
+        """Revalidate the index against sec.gov; a no-op while the TTL has not expired."""
+        with self._lock:
+            if self._meta is None:
+                self._load_from_disk()
+            if not force and self._meta is not None and time.time() - self._meta["fetched_at"] < self.ttl:
+                return
+            self._download()
+
+    @property
+    def stale(self) -> bool:
+        """True while the next lookup would have to load or revalidate the index."""
+        return self._meta is None or time.time() - self._meta["fetched_at"] >= self.ttl
+
+    def _ensure_loaded(self):
+        if not self.stale:
+            return
+        try:
+            self.refresh()
+        except requests.RequestException:
+            # Serve a stale index rather than failing lookups when sec.gov is unreachable.
+            if self._meta is None:
+                raise
+
+    def _load_from_disk(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._build(stored["tickers"])
+        self._meta = stored["meta"]
+
+    def _download(self):
+        headers = {}
+        if self._meta is not None:
+            if self._meta.get("etag"):
+                headers["If-None-Match"] = self._meta["etag"]
+            if self._meta.get("last_modified"):
+                headers["If-Modified-Since"] = self._meta["last_modified"]
+
+        response = get_edgar_client().send(self.url, headers=headers)
+        if response.status_code == 304 and self._meta is not None:
+            self._meta["fetched_at"] = time.time()
+            self._save(self._compact())
+            return
+        response.raise_for_status()
+
+        tickers = {}
+        for entry in response.json().values():
+            tickers[_normalize_ticker(entry["ticker"])] = [str(entry["cik_str"]).zfill(10), entry["title"]]
+        self._build(tickers)
+        self._meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        self._save(tickers)
+
+    def _build(self, tickers: dict):
+        by_cik = {}
+        # company_tickers.json lists the primary share class first, so keep the first ticker seen.
+        for ticker, (cik, name) in tickers.items():
+            entry = by_cik.get(cik)
+            if entry is None:
+                by_cik[cik] = (ticker, name, [ticker])
+            else:
+                entry[2].append(ticker)
+        self._by_ticker = {ticker: (cik, name) for ticker, (cik, name) in tickers.items()}
+        self._by_cik = by_cik
+
+    def _compact(self) -> dict:
+        return {ticker: [cik, name] for ticker, (cik, name) in self._by_ticker.items()}
+
+    def _save(self, tickers: dict):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"meta": self._meta, "tickers": tickers}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def _normalize_ticker(ticker: str) -> str:
+    # SEC lists share classes as "BRK-B"; users often type "BRK.B".
+    return ticker.strip().upper().replace(".", "-")
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_ticker_index() -> TickerIndex:
+    """Process-wide TickerIndex shared by every tool that needs a CIK."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = TickerIndex()
+    return _default_index
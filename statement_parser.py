@@ -0,0 +1,187 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Parses the newline-separated table text produced by the EDGAR locators
+# (one text cell per line) into a DataFrame of line items x fiscal years.
+
+_VALUE = re.compile(r"^(?P<open>\()?\s*\$?\s*(?P<open2>\()?\s*(?P<num>\d[\d,]*(?:\.\d+)?)\s*(?P<close>\))?\s*%?$")
+_DASHES = {"—", "–", "-", "—%", "– %", "— %", "-%"}
+MISSING_VALUE = "n/a"   # a cell with no reported value (not a zero); parsed as NaN
+_MISSING = {MISSING_VALUE, "n/m", "nm"}
+_YEAR = re.compile(r"^(19[5-9]\d|20\d\d)$")
+_YEAR_IN_TEXT = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+_SCALE = re.compile(r"in (thousands|millions|billions)", re.IGNORECASE)
+_SCALES = {"thousands": 1e3, "millions": 1e6, "billions": 1e9}
+_SKIP_TOKENS = {"$", "%", "", "usd"}
+
+CONFIDENCE_THRESHOLD = 0.8
+
+
+class ParsedStatement:
+    """Result of a rule-based parse: the table plus how much of it parsed cleanly."""
+
+    def __init__(self, frame: pd.DataFrame, scale: float, confidence: float, issues: list):
+        self.frame = frame
+        self.scale = scale
+        self.confidence = confidence
+        self.issues = issues
+
+    @property
+    def years(self) -> list:
+        return list(self.frame.columns)
+
+    def __repr__(self):
+        return f"ParsedStatement(rows={len(self.frame)}, years={self.years}, scale={self.scale:g}, confidence={self.confidence:.2f})"
+
+
+def _parse_value(token: str):
+    """Return the value of a numeric cell, or None for text."""
+    if token in _DASHES:
+        return 0.0
+    if token.lower() in _MISSING:
+        return float("nan")
+    m = _VALUE.match(token)
+    if not m:
+        return None
+    value = float(m.group("num").replace(",", ""))
+    # "(565" is negative whether its ")" is in the same cell or the next one.
+    return -value if m.group("open") or m.group("open2") else value
+
+
+def _is_per_share_or_count(label: str, section: str) -> bool:
+    text = f"{section} {label}".lower()
+    return "per share" in text or "per-share" in text or "per common share" in text or "shares" in text
+
+
+def parse_statement_table(raw_text: str, apply_scale: bool = True) -> ParsedStatement:
+    """
+    Rule-based parser for an EDGAR statement table.
+
+    Handles "$" cells, parenthesized negatives (also when the ")" is its own cell),
+    em/en-dash zeros, "n/a" (missing, NaN) cells, "%" suffixes, "(In millions ...)" scale footers and section
+    headings ending in ":" ("Net sales:" -> "Net sales - Products"). Per-share and
+    share-count rows are left unscaled.
+    """
+    lines = [line.strip().replace("\xa0", " ") for line in raw_text.splitlines()]
+    lines = [line for line in lines if line]
+
+    scale_match = _SCALE.search(raw_text)
+    scale = _SCALES[scale_match.group(1).lower()] if scale_match and apply_scale else 1.0
+
+    years = []
+    labels = []          # label lines seen since the last emitted row
+    section = ""
+    row_label = None
+    values = []
+    rows = []            # (label, section, values)
+    in_header = True
+    issues = []
+
+    def emit():
+        nonlocal row_label, values, section
+        if row_label is not None and values:
+            rows.append((row_label, section, values))
+            if row_label.lower().startswith("total"):
+                section = ""
+        row_label, values = None, []
+
+    for line in lines:
+        if line.lower() in _SKIP_TOKENS:
+            continue
+        if line == ")":
+            continue  # closing half of a "(565" cell
+
+        if in_header and _YEAR.match(line):
+            if line not in years:
+                years.append(line)
+            continue
+
+        parsed = _parse_value(line)
+        if parsed is None:
+            # A label. If a row is complete (or has any values) the label starts a new row.
+            if values:
+                if years and len(values) != len(years):
+                    issues.append(f"'{row_label}': {len(values)} values for {len(years)} years")
+                emit()
+            labels.append(line)
+            continue
+
+        if in_header:
+            in_header = False
+            if not years:
+                # Fall back to years mentioned anywhere in the header text ("Fiscal 2024").
+                header_text = " ".join(labels)
+                for year in _YEAR_IN_TEXT.findall(header_text):
+                    if year not in years:
+                        years.append(year)
+            labels = labels[-2:] if len(labels) >= 2 and labels[-2].endswith(":") else labels[-1:]
+
+        if years and len(values) == len(years):
+            issues.append(f"'{row_label}': more values than years, extra {line!r} ignored")
+            continue
+
+        if row_label is None:
+            if not labels:
+                issues.append(f"value {line!r} without a label")
+                continue
+            if len(labels) >= 2 and labels[-2].endswith(":"):
+                section = labels[-2].rstrip(":").strip()
+                label = labels[-1]
+            elif labels[-1].endswith(":") and len(labels) == 1:
+                label = labels[-1].rstrip(":").strip()
+            else:
+                if labels[0].endswith(":"):
+                    section = labels[0].rstrip(":").strip()
+                    labels = labels[1:]
+                label = " ".join(labels)  # a label wrapped over several cells
+            row_label = label
+            labels = []
+
+        values.append(parsed)
+
+    if values:
+        if years and len(values) != len(years):
+            issues.append(f"'{row_label}': {len(values)} values for {len(years)} years")
+        emit()
+
+    return _build_frame(rows, years, scale, issues)
+
+
+def _build_frame(rows, years, scale, issues) -> ParsedStatement:
+    width = len(years) or (max(len(v) for _, _, v in rows) if rows else 0)
+    columns = years or [f"col_{i + 1}" for i in range(width)]
+    index = []
+    data = np.full((len(rows), width), np.nan)
+    complete = 0
+    seen = {}
+    for i, (label, section, values) in enumerate(rows):
+        name = label
+        if section and not label.lower().startswith("total"):
+            name = f"{section} - {label}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name} ({seen[name]})"
+        else:
+            seen[name] = 1
+        index.append(name)
+        n = min(len(values), width)
+        data[i, :n] = values[:n]
+        if not _is_per_share_or_count(label, section):
+            data[i, :n] *= scale
+        if len(values) == width:
+            complete += 1
+
+    frame = pd.DataFrame(data, index=pd.Index(index, name="Line Item"), columns=columns)
+    if not rows:
+        confidence = 0.0
+    else:
+        confidence = complete / len(rows)
+        if not years:
+            confidence *= 0.5
+        if len(rows) < 3:
+            confidence *= 0.5
+    frame.attrs["scale"] = scale
+    frame.attrs["confidence"] = confidence
+    return ParsedStatement(frame, scale, confidence, issues)
@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_right
+
+from bs4.element import NavigableString, PreformattedString, Tag
+
+# Heading patterns per statement, matched against lowercased, whitespace-collapsed text.
+# Add an entry here to make a new statement locatable by both the streaming and the
+# BeautifulSoup paths.
+STATEMENT_PATTERNS = {
+    "income_statement": [
+        r"consolidated statements? of operations",
+        r"consolidated statements? of income",
+        r"consolidated statements? of earnings",
+    ],
+    "balance_sheet": [
+        r"consolidated balance sheets?",
+        r"consolidated statements? of financial (?:position|condition)",
+    ],
+    "cash_flow": [
+        r"consolidated statements? of cash flows?",
+    ],
+}
+
+# Tags that start a new line of text; a heading never spans one of these.
+BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "br", "li", "tr", "td", "th", "table", "center", "title"}
+
+# A heading is a short line that is mostly the statement's name ("Apple Inc. CONSOLIDATED
+# STATEMENTS OF OPERATIONS"); MD&A prose also names the statements ("... as reported in the
+# Consolidated Statements of Operations included in Part II, Item 8 ...") and must not count.
+MAX_HEADING_CHARS = 120
+HEADING_COVERAGE = 0.5      # share of a heading line the name covers when it does not start the line
+MAX_PREAMBLE_CHARS = 300    # text between a heading and its table; a longer block is prose
+
+_NUMBER = re.compile(r"\d[\d,]*")
+_WHITESPACE = re.compile(r"\s+")
+_SKIP_WORDS = ("page", "index")  # table-of-contents lines
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.replace("\xa0", " ")).strip().lower()
+
+
+def count_numbers(texts) -> int:
+    return sum(len(_NUMBER.findall(text)) for text in texts)
+
+
+class SectionMatcher:
+    """One compiled alternation over every statement heading, with a named group per statement."""
+
+    def __init__(self, statements=None, patterns: dict = None):
+        patterns = patterns or STATEMENT_PATTERNS
+        statements = list(statements or patterns)
+        unknown = [s for s in statements if s not in patterns]
+        if unknown:
+            raise ValueError(f"Unknown statement(s): {unknown}. Known: {sorted(patterns)}")
+        self.statements = statements
+        self.regex = re.compile("|".join(
+            f"(?P<{name}>{'|'.join(patterns[name])})" for name in statements))
+
+    def match_line(self, line: str):
+        """Return the statement a normalized heading line names, or None for prose and ToC/page references."""
+        line = line.strip()
+        if len(line) > MAX_HEADING_CHARS or any(word in line for word in _SKIP_WORDS):
+            return None
+        m = self.regex.search(line)
+        if m is None or (m.start() > 0 and m.end() - m.start() < HEADING_COVERAGE * len(line)):
+            return None
+        return m.lastgroup
+
+    def finditer(self, text: str):
+        """Yield (statement, start, end) for every heading in a normalized, newline-separated text."""
+        for m in self.regex.finditer(text):
+            yield m.lastgroup, m.start(), m.end()
+
+
+class HeadingIndex:
+    """
+    Single pass over a BeautifulSoup tree.
+
+    Text outside tables is concatenated into one normalized string (one line per block
+    element) and the offset of every top-level <table> in that string is recorded, so
+    a heading match resolves to "the next table" with a bisect instead of a tree walk.
+    Table contents are not indexed, which keeps table-of-contents entries out of it.
+    """
+
+    def __init__(self, soup):
+        self.tables = []
+        self.table_offsets = []
+        parts = []
+        length = 0
+        stack = [iter(soup.contents)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            if isinstance(node, Tag):
+                if node.name == "table":
+                    self.table_offsets.append(length)
+                    self.tables.append(node)
+                    continue
+                if node.name in BLOCK_TAGS:
+                    parts.append("\n")
+                    length += 1
+                stack.append(iter(node.contents))
+            elif isinstance(node, NavigableString) and not isinstance(node, PreformattedString):
+                text = normalize_text(node)
+                if text:
+                    parts.append(text + " ")
+                    length += len(text) + 1
+        self.text = "".join(parts)
+
+    def table_after(self, offset: int, min_numbers: int = 4, max_tables: int = 3,
+                    max_preamble: int = MAX_PREAMBLE_CHARS):
+        """
+        Text of the first numeric table after `offset`, skipping a few layout tables.
+        Short text between the heading and the table (the "(in millions ...)" subtitle)
+        is kept as the first line.
+        """
+        start = bisect_right(self.table_offsets, offset)
+        for i, table in enumerate(self.tables[start:start + max_tables], start):
+            texts = list(table.stripped_strings)
+            if count_numbers(texts) >= min_numbers:
+                preamble = self.text[offset:self.table_offsets[i]].strip()
+                if preamble and len(preamble) <= max_preamble:
+                    texts.insert(0, " ".join(preamble.split()))
+                return "\n".join(texts)
+        return None
+
+    def locate(self, matcher: SectionMatcher) -> dict:
+        """Map each statement to the text of its table; the first heading-shaped match with a table wins."""
+        found = {}
+        for statement, start, end in matcher.finditer(self.text):
+            if statement in found:
+                continue
+            line_start = self.text.rfind("\n", 0, start) + 1
+            line_end = self.text.find("\n", end)
+            line = self.text[line_start:line_end if line_end != -1 else len(self.text)]
+            if matcher.match_line(line) is None:
+                continue
+            table_text = self.table_after(end)
+            if table_text:
+                found[statement] = table_text
+                if len(found) == len(matcher.statements):
+                    break
+        return found
+
+
+def locate_statement_tables(soup, statements=("income_statement",)) -> dict:
+    """Locate several statements in one pass over a parsed filing."""
+    return HeadingIndex(soup).locate(SectionMatcher(statements))
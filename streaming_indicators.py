@@ -0,0 +1,286 @@
+import json
+import math
+import os
+
+from cache_paths import cache_path
+
+# O(1)-per-bar indicator state for live monitoring loops.
+#
+# Each class applies exactly the recurrence used by the batch functions in indicators
+# (same operations in the same order), so feeding a series bar by bar gives the same
+# floats as the batch computation over that series. State is a handful of floats plus,
+# for windowed indicators, a ring buffer of the last n inputs; to_dict()/from_dict()
+# round-trip it through JSON so a restarted process resumes without replaying history.
+
+NAN = float("nan")
+
+
+class StreamingSMA:
+    __slots__ = ("n", "buf", "idx", "count", "s")
+
+    def __init__(self, n: int = 20):
+        self.n = n
+        self.buf = [0.0] * n
+        self.idx = 0
+        self.count = 0
+        self.s = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count >= self.n:
+            self.s = self.s - self.buf[self.idx]
+        self.buf[self.idx] = x
+        self.s = self.s + x
+        self.idx = (self.idx + 1) % self.n
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.s / self.n if self.count >= self.n else NAN
+
+
+class StreamingVariance:
+    """Rolling variance over the last n values from running sums (ddof=0 or 1)."""
+    __slots__ = ("n", "ddof", "buf", "idx", "count", "s", "q")
+
+    def __init__(self, n: int = 20, ddof: int = 0):
+        self.n = n
+        self.ddof = ddof
+        self.buf = [0.0] * n
+        self.idx = 0
+        self.count = 0
+        self.s = 0.0
+        self.q = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count >= self.n:
+            old = self.buf[self.idx]
+            self.s = self.s - old
+            self.q = self.q - old * old
+        self.buf[self.idx] = x
+        self.s = self.s + x
+        self.q = self.q + x * x
+        self.idx = (self.idx + 1) % self.n
+        self.count += 1
+        return self.value
+
+    @property
+    def mean(self) -> float:
+        return self.s / self.n if self.count >= self.n else NAN
+
+    @property
+    def value(self) -> float:
+        if self.count < self.n:
+            return NAN
+        if self.ddof == 0:
+            mean = self.s / self.n
+            var = self.q / self.n - mean * mean
+        else:
+            var = (self.q - self.s * self.s / self.n) / (self.n - self.ddof)
+        return max(var, 0.0)
+
+
+class StreamingEMA:
+    __slots__ = ("n", "alpha", "count", "seed", "e")
+
+    def __init__(self, n: int = 20):
+        self.n = n
+        self.alpha = 2.0 / (n + 1)
+        self.count = 0
+        self.seed = 0.0
+        self.e = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count < self.n:
+            self.seed = self.seed + x
+            self.count += 1
+            if self.count == self.n:
+                self.e = self.seed / self.n
+        else:
+            self.e = self.e + self.alpha * (x - self.e)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.e if self.count >= self.n else NAN
+
+
+class StreamingWilder:
+    """Wilder smoothing: mean of the first n values, then m = (m * (n - 1) + x) / n."""
+    __slots__ = ("n", "count", "m")
+
+    def __init__(self, n: int = 14):
+        self.n = n
+        self.count = 0
+        self.m = 0.0
+
+    def update(self, x: float) -> float:
+        if self.count < self.n:
+            self.m = self.m + x
+            self.count += 1
+            if self.count == self.n:
+                self.m = self.m / self.n
+        else:
+            self.m = (self.m * (self.n - 1) + x) / self.n
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.m if self.count >= self.n else NAN
+
+
+class StreamingRSI:
+    __slots__ = ("n", "prev", "gain", "loss")
+
+    def __init__(self, n: int = 14):
+        self.n = n
+        self.prev = None
+        self.gain = StreamingWilder(n)
+        self.loss = StreamingWilder(n)
+
+    def update(self, x: float) -> float:
+        if self.prev is not None:
+            d = x - self.prev
+            self.gain.update(max(d, 0.0))
+            self.loss.update(max(-d, 0.0))
+        self.prev = x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        avg_gain, avg_loss = self.gain.value, self.loss.value
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return 50.0 if avg_gain == 0 else 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class StreamingMACD:
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, x: float):
+        line = self.fast.update(x) - self.slow.update(x)
+        if not math.isnan(line):
+            self.signal.update(line)
+        return self.value
+
+    @property
+    def value(self):
+        """(macd line, signal line, histogram)."""
+        line = self.fast.value - self.slow.value
+        sig = self.signal.value
+        return line, sig, line - sig
+
+
+_CLASSES = {cls.__name__: cls for cls in (
+    StreamingSMA, StreamingVariance, StreamingEMA, StreamingWilder, StreamingRSI, StreamingMACD)}
+
+
+def to_dict(indicator) -> dict:
+    """Serialize an indicator (nested indicators included) to JSON-compatible data."""
+    state = {"type": type(indicator).__name__}
+    for slot in type(indicator).__slots__:
+        value = getattr(indicator, slot)
+        state[slot] = to_dict(value) if type(value).__name__ in _CLASSES else value
+    return state
+
+
+def from_dict(state: dict):
+    cls = _CLASSES[state["type"]]
+    indicator = cls.__new__(cls)
+    for slot in cls.__slots__:
+        value = state[slot]
+        setattr(indicator, slot, from_dict(value) if isinstance(value, dict) and "type" in value else value)
+    return indicator
+
+
+class LiveIndicators:
+    """
+    The indicator set reported by get_technical_indicators, for one ticker.
+
+    update() commits a finished bar; preview() returns the values as if one more
+    (possibly still forming) bar were appended, without changing the state.
+    """
+    __slots__ = ("ticker", "last_ts", "sma_20", "ema_20", "rsi_14", "macd", "var_20")
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.last_ts = None
+        self.sma_20 = StreamingSMA(20)
+        self.ema_20 = StreamingEMA(20)
+        self.rsi_14 = StreamingRSI(14)
+        self.macd = StreamingMACD()
+        self.var_20 = StreamingVariance(20)
+
+    def update(self, ts: int, close: float):
+        self.sma_20.update(close)
+        self.ema_20.update(close)
+        self.rsi_14.update(close)
+        self.macd.update(close)
+        self.var_20.update(close)
+        self.last_ts = ts
+
+    def values(self) -> dict:
+        macd_line, macd_signal, macd_hist = self.macd.value
+        mid, std = self.var_20.mean, math.sqrt(self.var_20.value)
+        return {
+            "SMA_20": self.sma_20.value,
+            "EMA_20": self.ema_20.value,
+            "RSI_14": self.rsi_14.value,
+            "MACD": macd_line,
+            "MACD_signal": macd_signal,
+            "MACD_hist": macd_hist,
+            "BB_upper": mid + 2.0 * std,
+            "BB_lower": mid - 2.0 * std,
+        }
+
+    def preview(self, ts: int, close: float) -> dict:
+        tentative = LiveIndicators.from_dict(self.to_dict())
+        tentative.update(ts, close)
+        return tentative.values()
+
+    def seed(self, bars):
+        """Feed committed bars (records with "ts" and "close") newer than last_ts."""
+        for ts, close in zip(bars["ts"].tolist(), bars["close"].tolist()):
+            if self.last_ts is None or ts > self.last_ts:
+                self.update(ts, close)
+
+    def to_dict(self) -> dict:
+        state = {"type": "LiveIndicators", "ticker": self.ticker, "last_ts": self.last_ts}
+        for slot in ("sma_20", "ema_20", "rsi_14", "macd", "var_20"):
+            state[slot] = to_dict(getattr(self, slot))
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        live = cls.__new__(cls)
+        live.ticker = state["ticker"]
+        live.last_ts = state["last_ts"]
+        for slot in ("sma_20", "ema_20", "rsi_14", "macd", "var_20"):
+            setattr(live, slot, from_dict(state[slot]))
+        return live
+
+    def save(self, path: str = None):
+        path = path or state_path(self.ticker)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, ticker: str, path: str = None):
+        try:
+            with open(path or state_path(ticker), "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def state_path(ticker: str) -> str:
+    return cache_path("indicator_state", f"{ticker.upper().replace('/', '_')}.json")
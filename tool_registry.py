@@ -0,0 +1,50 @@
+import importlib
+import threading
+from collections.abc import Mapping
+
+# Tools registered by name as "module:function" and imported on first use.
+#
+# The tool modules pull in pandas, yfinance, BeautifulSoup, PIL, pyautogui and the
+# OpenAI client; importing them only when the agent first calls one of their tools
+# keeps startup to what the graph itself needs, and a module whose dependency is
+# missing (pyautogui on a headless server) only fails the tool that needs it.
+
+
+class LazyTools(Mapping):
+    """Read-only name -> callable mapping that imports each tool's module when it is first looked up."""
+
+    def __init__(self, specs: dict):
+        self._specs = dict(specs)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str):
+        tool = self._loaded.get(name)
+        if tool is None:
+            spec = self._specs[name]
+            module_name, _, attr = spec.partition(":")
+            with self._lock:
+                tool = self._loaded.get(name)
+                if tool is None:
+                    tool = self._loaded[name] = getattr(importlib.import_module(module_name), attr)
+        return tool
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __contains__(self, name) -> bool:
+        return name in self._specs
+
+    def spec(self, name: str) -> str:
+        return self._specs[name]
+
+    def preload(self):
+        """Import every tool now (long-running servers that want no first-call latency)."""
+        for name in self._specs:
+            self[name]
+
+    def loaded(self) -> list:
+        return list(self._loaded)
@@ -0,0 +1,273 @@
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Spans for graph nodes, tool calls, HTTP requests and LLM calls.
+#
+# Every span is aggregated per (kind, name) into counts, errors, a latency histogram
+# and sums of its byte/token attributes; that is what the summary table and the
+# OpenMetrics text are built from. With AGENT_TRACE_FILE set, each span is also
+# written as one JSON line (with its parent, so a request can be followed through
+# node -> tool -> HTTP). AGENT_TRACE=0 turns spans into no-ops.
+#
+#   with span("http", "api.binance.us", url=url) as s:
+#       response = ...
+#       s.set(status=response.status_code, bytes_in=len(response.content))
+
+TRACE_ENABLED = os.environ.get("AGENT_TRACE", "1") != "0"
+TRACE_FILE = os.environ.get("AGENT_TRACE_FILE")
+BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SUMMED = ("bytes_in", "bytes_out", "tokens_in", "tokens_out")
+RECENT = 1024       # durations kept per (kind, name) for the percentiles in the summary
+
+_current = contextvars.ContextVar("tracing_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("kind", "name", "attrs", "id", "parent", "trace", "start", "duration", "error", "_t0", "_token")
+
+    def __init__(self, kind: str, name: str, attrs: dict):
+        self.kind, self.name, self.attrs = kind, name, attrs
+        self.duration, self.error = 0.0, None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error: str):
+        """Mark the span as failed without raising (tools report errors as {"error": ...})."""
+        self.error = error
+
+    def __enter__(self):
+        parent = _current.get()
+        self.id = next(_ids)
+        self.parent = parent.id if parent is not None else None
+        self.trace = parent.trace if parent is not None else self.id
+        self._token = _current.set(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        _current.reset(self._token)
+        if exc_type is not None and self.error is None:
+            self.error = exc_type.__name__
+        get_tracer().finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {"trace": self.trace, "span": self.id, "parent": self.parent, "kind": self.kind, "name": self.name,
+                "start": round(self.start, 6), "duration_ms": round(self.duration * 1000, 3),
+                "error": self.error, **self.attrs}
+
+
+class _NoSpan:
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error: str):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(kind: str, name: str, **attrs):
+    return Span(kind, name, attrs) if TRACE_ENABLED else _NO_SPAN
+
+
+def annotate(**attrs):
+    """Add attributes to the innermost open span (e.g. token usage known deep inside a call)."""
+    current = _current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc or url
+
+
+def traced(kind: str, name: str = None):
+    """Decorator: run a function (sync or async) inside a span."""
+    def decorate(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(kind, span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Series:
+    __slots__ = ("count", "errors", "total", "max", "buckets", "sums", "cache_hits", "recent")
+
+    def __init__(self):
+        self.count = self.errors = self.cache_hits = 0
+        self.total = self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_S)
+        self.sums = dict.fromkeys(SUMMED, 0)
+        self.recent = deque(maxlen=RECENT)
+
+
+class Tracer:
+    def __init__(self, path: str = TRACE_FILE):
+        self._series = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def finish(self, s: Span):
+        line = json.dumps(s.to_dict(), default=str) if self._file else None
+        with self._lock:
+            series = self._series.get((s.kind, s.name))
+            if series is None:
+                series = self._series[(s.kind, s.name)] = _Series()
+            series.count += 1
+            series.total += s.duration
+            series.max = max(series.max, s.duration)
+            series.recent.append(s.duration)
+            for i, bound in enumerate(BUCKETS_S):
+                if s.duration <= bound:
+                    series.buckets[i] += 1
+                    break
+            if s.error is not None:
+                series.errors += 1
+            if s.attrs.get("cache_hit"):
+                series.cache_hits += 1
+            for key in SUMMED:
+                value = s.attrs.get(key)
+                if value:
+                    series.sums[key] += value
+            if line is not None:
+                self._file.write(line + "\n")
+
+    def record(self, kind: str, name: str, duration: float = 0.0, error: str = None, **attrs):
+        """A span measured elsewhere (e.g. a cache hit that never reached the network)."""
+        if not TRACE_ENABLED:
+            return
+        s = Span(kind, name, attrs)
+        parent = _current.get()
+        s.id, s.parent = next(_ids), parent.id if parent is not None else None
+        s.trace = parent.trace if parent is not None else s.id
+        s.start, s.duration, s.error = time.time() - duration, duration, error
+        self.finish(s)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: {"count": v.count, "errors": v.errors, "total_s": v.total, "max_s": v.max,
+                          "buckets": list(v.buckets), "sums": dict(v.sums), "cache_hits": v.cache_hits,
+                          "recent": sorted(v.recent)}
+                    for key, v in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def summary(self) -> str:
+        """Plain-text table of every (kind, name), slowest total first."""
+        rows = sorted(self.snapshot().items(), key=lambda kv: -kv[1]["total_s"])
+        header = (f"{'kind':<6} {'name':<32} {'count':>6} {'err':>4} {'total s':>9} {'mean ms':>9} "
+                  f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'hits':>5} {'KB in':>8} {'tok in':>8} {'tok out':>8}")
+        lines = [header, "-" * len(header)]
+        for (kind, name), v in rows:
+            recent = v["recent"]
+            p50 = recent[len(recent) // 2] if recent else 0.0
+            p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+            lines.append(
+                f"{kind:<6} {name[:32]:<32} {v['count']:>6} {v['errors']:>4} {v['total_s']:>9.3f} "
+                f"{v['total_s'] / v['count'] * 1000:>9.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+                f"{v['max_s'] * 1000:>8.1f} {v['cache_hits']:>5} {v['sums']['bytes_in'] / 1024:>8.1f} "
+                f"{v['sums']['tokens_in']:>8} {v['sums']['tokens_out']:>8}")
+        return "\n".join(lines)
+
+    def openmetrics(self) -> str:
+        """The aggregates in OpenMetrics text format."""
+        snapshot = self.snapshot()
+        lines = ["# TYPE agent_span_duration_seconds histogram",
+                 "# UNIT agent_span_duration_seconds seconds",
+                 "# HELP agent_span_duration_seconds Duration of graph nodes, tool calls, HTTP and LLM requests."]
+        for (kind, name), v in snapshot.items():
+            labels = f'kind="{kind}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS_S, v["buckets"]):
+                cumulative += n
+                lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {v["count"]}')
+            lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {v['total_s']:.6f}")
+            lines.append(f"agent_span_duration_seconds_count{{{labels}}} {v['count']}")
+        counters = [("errors", "Spans that ended in an error.", lambda v: v["errors"]),
+                    ("cache_hits", "Spans served from a cache.", lambda v: v["cache_hits"])]
+        counters += [(key, f"Sum of {key} over spans.", lambda v, key=key: v["sums"][key]) for key in SUMMED]
+        for metric, help_text, value in counters:
+            lines += [f"# TYPE agent_span_{metric} counter", f"# HELP agent_span_{metric} {help_text}"]
+            for (kind, name), v in snapshot.items():
+                lines.append(f'agent_span_{metric}_total{{kind="{kind}",name="{_escape(name)}"}} {value(v)}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics (OpenMetrics text) from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = get_tracer().openmetrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _default_tracer
+    if _default_tracer is None:
+        with _default_tracer_lock:
+            if _default_tracer is None:
+                _default_tracer = Tracer()
+    return _default_tracer
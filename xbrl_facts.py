@@ -0,0 +1,310 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_paths import cache_path
+from edgar_client import get_async_edgar_client, get_edgar_client, SEC_DATA_URL
+from statement_parser import MISSING_VALUE
+
+COMPANYFACTS_MAX_AGE = 12 * 60 * 60  # serve the local store without revalidating for this long
+
+# Income statement line items -> us-gaap concepts, in order of preference. The first
+# concept that reports a value for a given fiscal year wins.
+INCOME_STATEMENT_CONCEPTS = [
+    ("Revenue", ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax",
+                 "RevenueFromContractWithCustomerIncludingAssessedTax", "SalesRevenueNet"]),
+    ("Cost of Revenue", ["CostOfRevenue", "CostOfGoodsAndServicesSold", "CostOfGoodsSold"]),
+    ("Gross Profit", ["GrossProfit"]),
+    ("Research and Development", ["ResearchAndDevelopmentExpense"]),
+    ("Selling, General and Administrative", ["SellingGeneralAndAdministrativeExpense"]),
+    ("Total Operating Expenses", ["OperatingExpenses", "CostsAndExpenses"]),
+    ("Operating Income", ["OperatingIncomeLoss"]),
+    ("Other Income (Expense), Net", ["NonoperatingIncomeExpense", "OtherNonoperatingIncomeExpense"]),
+    ("Income Before Income Taxes", [
+        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest",
+        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments"]),
+    ("Income Tax Expense", ["IncomeTaxExpenseBenefit"]),
+    ("Net Income", ["NetIncomeLoss", "ProfitLoss", "NetIncomeLossAvailableToCommonStockholdersBasic"]),
+    ("Earnings Per Share - Basic", ["EarningsPerShareBasic"]),
+    ("Earnings Per Share - Diluted", ["EarningsPerShareDiluted"]),
+    ("Weighted Average Shares - Basic", ["WeightedAverageNumberOfSharesOutstandingBasic"]),
+    ("Weighted Average Shares - Diluted", ["WeightedAverageNumberOfDilutedSharesOutstanding"]),
+]
+
+# Line items that must be present for the XBRL answer to be used instead of the HTML path.
+REQUIRED_LINE_ITEMS = ("Revenue", "Net Income")
+
+_FORMS = ["10-K", "10-K/A", "10-Q", "10-Q/A", "20-F", "40-F", "8-K", "other"]
+_FISCAL_PERIODS = ["FY", "Q1", "Q2", "Q3", "Q4", "H1", "H2", "other"]
+_ANNUAL_FORMS = (_FORMS.index("10-K"), _FORMS.index("10-K/A"), _FORMS.index("20-F"), _FORMS.index("40-F"))
+
+
+class CompanyFacts:
+    """
+    Columnar view of one company's companyfacts: one row per reported us-gaap value,
+    with the concept stored as an integer id into `concepts`.
+    """
+
+    COLUMNS = ("concept", "unit", "start", "end", "value", "fy", "fp", "form", "filed")
+
+    def __init__(self, cik: str, entity_name: str, concepts: list, units: list, arrays: dict, meta: dict = None):
+        self.cik = cik
+        self.entity_name = entity_name
+        self.concepts = list(concepts)
+        self.units = list(units)
+        self._concept_ids = {name: i for i, name in enumerate(self.concepts)}
+        for column in self.COLUMNS:
+            setattr(self, column, arrays[column])
+        self.meta = meta or {}
+        self._annual = None
+
+    def __len__(self):
+        return len(self.value)
+
+    def has(self, concept: str) -> bool:
+        return concept in self._concept_ids
+
+    def _annual_mask(self) -> np.ndarray:
+        # Roughly one-year durations reported in annual forms; computed once per company.
+        if self._annual is None:
+            duration = (self.end - self.start).astype("timedelta64[D]").astype("float64")
+            self._annual = np.isin(self.form, _ANNUAL_FORMS) & (duration >= 350) & (duration <= 380)
+        return self._annual
+
+    def annual_values(self, concept: str) -> pd.Series:
+        """
+        Fiscal-year values of a duration concept from annual reports, indexed by period
+        end date. When a year is restated the most recently filed value wins.
+        """
+        concept_id = self._concept_ids.get(concept)
+        if concept_id is None:
+            return pd.Series(dtype="float64")
+        mask = (self.concept == concept_id) & self._annual_mask()
+        if not mask.any():
+            return pd.Series(dtype="float64")
+        idx = np.flatnonzero(mask)
+        # Sort by (end, filed) so the last row per end date is the latest filing.
+        order = np.lexsort((self.filed[idx], self.end[idx]))
+        idx = idx[order]
+        ends = self.end[idx]
+        last = np.append(ends[1:] != ends[:-1], True)
+        idx = idx[last]
+        return pd.Series(self.value[idx], index=pd.DatetimeIndex(self.end[idx]), name=concept)
+
+    def income_statement(self, years: int = 3, concepts=INCOME_STATEMENT_CONCEPTS) -> pd.DataFrame:
+        """DataFrame of line items x fiscal years (most recent first), in USD / shares."""
+        rows = {}
+        for line_item, candidates in concepts:
+            merged = pd.Series(dtype="float64")
+            for concept in candidates:
+                series = self.annual_values(concept)
+                if not series.empty:
+                    merged = series if merged.empty else merged.combine_first(series)
+            if not merged.empty:
+                rows[line_item] = merged
+        if not rows:
+            return pd.DataFrame()
+
+        anchor = next((rows[item] for item in REQUIRED_LINE_ITEMS if item in rows), next(iter(rows.values())))
+        period_ends = anchor.index.sort_values(ascending=False)[:years]
+        frame = pd.DataFrame({item: series.reindex(period_ends) for item, series in rows.items()}).T
+        frame.columns = [str(end.year) for end in period_ends]
+        frame.index.name = "Line Item"
+        frame.attrs["period_ends"] = [str(end.date()) for end in period_ends]
+        return frame
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path,
+                 concepts=np.array(self.concepts, dtype=str),
+                 units=np.array(self.units, dtype=str),
+                 meta=np.array(json.dumps(dict(self.meta, cik=self.cik, entity_name=self.entity_name))),
+                 **{column: getattr(self, column) for column in self.COLUMNS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {column: data[column] for column in cls.COLUMNS}
+            return cls(meta.pop("cik"), meta.pop("entity_name"),
+                       data["concepts"].tolist(), data["units"].tolist(), arrays, meta)
+
+    @classmethod
+    def from_json(cls, data: dict, meta: dict = None):
+        """Flatten a companyfacts JSON document (us-gaap taxonomy) into columns."""
+        concepts, units = [], []
+        unit_ids = {}
+        columns = {column: [] for column in cls.COLUMNS}
+        for concept, body in data.get("facts", {}).get("us-gaap", {}).items():
+            concept_id = len(concepts)
+            concepts.append(concept)
+            for unit, facts in body.get("units", {}).items():
+                unit_id = unit_ids.setdefault(unit, len(units))
+                if unit_id == len(units):
+                    units.append(unit)
+                for fact in facts:
+                    columns["concept"].append(concept_id)
+                    columns["unit"].append(unit_id)
+                    columns["start"].append(fact.get("start", "NaT"))
+                    columns["end"].append(fact["end"])
+                    columns["value"].append(fact["val"])
+                    columns["fy"].append(fact.get("fy") or 0)
+                    columns["fp"].append(_code(_FISCAL_PERIODS, fact.get("fp")))
+                    columns["form"].append(_code(_FORMS, fact.get("form")))
+                    columns["filed"].append(fact.get("filed", "NaT"))
+
+        arrays = {
+            "concept": np.array(columns["concept"], dtype=np.int32),
+            "unit": np.array(columns["unit"], dtype=np.int16),
+            "start": np.array(columns["start"], dtype="datetime64[D]"),
+            "end": np.array(columns["end"], dtype="datetime64[D]"),
+            "value": np.array(columns["value"], dtype=np.float64),
+            "fy": np.array(columns["fy"], dtype=np.int16),
+            "fp": np.array(columns["fp"], dtype=np.int8),
+            "form": np.array(columns["form"], dtype=np.int8),
+            "filed": np.array(columns["filed"], dtype="datetime64[D]"),
+        }
+        cik = str(data.get("cik", "")).zfill(10)
+        return cls(cik, data.get("entityName", ""), concepts, units, arrays, meta)
+
+
+def _code(values: list, value) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        return len(values) - 1
+
+
+class FactStore:
+    """
+    Local store of companyfacts, one .npz of columns per CIK.
+
+    A store younger than max_age is answered from disk (and then from memory) without
+    any network traffic; after that the companyfacts JSON is revalidated with its ETag /
+    Last-Modified and only re-ingested when SEC actually returns a new document.
+    """
+
+    def __init__(self, directory: str = None, max_age: float = COMPANYFACTS_MAX_AGE, base_url: str = None):
+        self.directory = directory or os.path.dirname(cache_path("xbrl", "_"))
+        self.max_age = max_age
+        self.base_url = (base_url or SEC_DATA_URL).rstrip("/")
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, cik: str) -> str:
+        return os.path.join(self.directory, f"CIK{str(cik).zfill(10)}.npz")
+
+    def facts(self, cik: str, refresh: bool = True) -> CompanyFacts:
+        cik = str(cik).zfill(10)
+        facts, fresh = self._stored(cik, refresh)
+        return facts if fresh else self._fetch(cik, facts)
+
+    async def afacts(self, cik: str, refresh: bool = True) -> CompanyFacts:
+        """facts() for the async tool paths: revalidates on the async EDGAR client."""
+        cik = str(cik).zfill(10)
+        facts, fresh = self._stored(cik, refresh)
+        return facts if fresh else await self._afetch(cik, facts)
+
+    def _stored(self, cik: str, refresh: bool):
+        """Return (facts or None, whether they can be served without revalidating)."""
+        facts = self._loaded.get(cik)
+        if facts is None and os.path.exists(self.path_for(cik)):
+            facts = CompanyFacts.load(self.path_for(cik))
+        if facts is not None and (not refresh or time.time() - facts.meta.get("checked_at", 0) < self.max_age):
+            self._loaded[cik] = facts
+            return facts, True
+        return facts, False
+
+    def ingest(self, data: dict, validators: dict = None) -> CompanyFacts:
+        """Ingest an already-downloaded companyfacts document (e.g. a saved fixture)."""
+        meta = dict(validators or {}, checked_at=time.time())
+        facts = CompanyFacts.from_json(data, meta)
+        with self._lock:
+            facts.save(self.path_for(facts.cik))
+            self._loaded[facts.cik] = facts
+        return facts
+
+    def ingest_file(self, path: str) -> CompanyFacts:
+        with open(path, "r", encoding="utf-8") as f:
+            return self.ingest(json.load(f))
+
+    def _fetch(self, cik: str, current: CompanyFacts = None) -> CompanyFacts:
+        # Bypass the client's response cache: the columnar store is the cache here.
+        response = get_edgar_client().send(self._url(cik), headers=self._validators(current))
+        if response.status_code == 304 and current is not None:
+            return self._revalidated(cik, current)
+        response.raise_for_status()
+        return self._ingest_response(response)
+
+    async def _afetch(self, cik: str, current: CompanyFacts = None) -> CompanyFacts:
+        response = await get_async_edgar_client().send(self._url(cik), headers=self._validators(current))
+        if response.status_code == 304 and current is not None:
+            return self._revalidated(cik, current)
+        response.raise_for_status()
+        # Decoding and columnizing a large companyfacts document would stall the event loop.
+        return await asyncio.to_thread(self._ingest_response, response)
+
+    def _url(self, cik: str) -> str:
+        return f"{self.base_url}/api/xbrl/companyfacts/CIK{cik}.json"
+
+    @staticmethod
+    def _validators(current: CompanyFacts = None) -> dict:
+        headers = {}
+        if current is not None:
+            if current.meta.get("etag"):
+                headers["If-None-Match"] = current.meta["etag"]
+            if current.meta.get("last_modified"):
+                headers["If-Modified-Since"] = current.meta["last_modified"]
+        return headers
+
+    def _revalidated(self, cik: str, current: CompanyFacts) -> CompanyFacts:
+        current.meta["checked_at"] = time.time()
+        with self._lock:
+            current.save(self.path_for(cik))
+            self._loaded[cik] = current
+        return current
+
+    def _ingest_response(self, response) -> CompanyFacts:
+        return self.ingest(response.json(), {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        })
+
+
+def income_statement_text(frame: pd.DataFrame) -> str:
+    """
+    Render an XBRL income statement in the same newline-separated shape as the HTML
+    table text, so parse_income_statement handles both sources. Values are written
+    as reported (USD, USD per share, shares), so no scale note is needed.
+    """
+    lines = list(frame.columns)
+    for line_item, row in frame.iterrows():
+        lines.append(line_item)
+        for value in row:
+            if pd.isna(value):
+                # Not reported: a dash would read as zero.
+                lines.append(MISSING_VALUE)
+            elif float(value).is_integer():
+                lines.append(f"({abs(value):,.0f})" if value < 0 else f"{value:,.0f}")
+            else:
+                lines.append(f"({abs(value):,.2f})" if value < 0 else f"{value:,.2f}")
+    return "\n".join(lines)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_fact_store() -> FactStore:
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = FactStore()
+    return _default_store